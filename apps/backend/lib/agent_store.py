@@ -1,11 +1,19 @@
 """Agent store — PostgreSQL-backed registration storage."""
 
+import os
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional
 
 from lib.database import get_pool
 
+# API-key → agent resolution cache (see AgentKeyCache)
+AGENT_CACHE_SIZE = int(os.environ.get("AGENT_CACHE_SIZE", "10000"))
+AGENT_CACHE_TTL = float(os.environ.get("AGENT_CACHE_TTL", "60"))
+AGENT_CACHE_NEGATIVE_TTL = float(os.environ.get("AGENT_CACHE_NEGATIVE_TTL", "10"))
+
 
 @dataclass
 class Agent:
@@ -23,6 +31,59 @@ class Agent:
     auto_freemonies: bool = False
     freemonies_max_markets: int = 2
     freemonies_amount_per_market: float = 2.0
+    owner_id: Optional[str] = None
+
+
+class AgentKeyCache:
+    """In-process LRU of api_key_hash → Agent, with TTL and negative caching.
+
+    Unknown keys are cached as None for AGENT_CACHE_NEGATIVE_TTL so a client
+    hammering with a bad key doesn't reach the DB each time. Entries are
+    dropped on flag/owner changes in this process; other processes pick the
+    change up within AGENT_CACHE_TTL.
+    """
+
+    _MISS = object()
+
+    def __init__(self, max_size: int = AGENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Optional[Agent]]] = OrderedDict()
+        self._by_agent: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_hash: str):
+        """Cached Agent (or None for a known-bad key), or AgentKeyCache._MISS."""
+        entry = self._entries.get(key_hash)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return self._MISS
+        self._entries.move_to_end(key_hash)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key_hash: str, agent: Optional[Agent]) -> None:
+        ttl = AGENT_CACHE_TTL if agent else AGENT_CACHE_NEGATIVE_TTL
+        self._entries[key_hash] = (time.monotonic() + ttl, agent)
+        self._entries.move_to_end(key_hash)
+        if agent:
+            self._by_agent[agent.agent_id] = key_hash
+        while len(self._entries) > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            if evicted:
+                self._by_agent.pop(evicted.agent_id, None)
+
+    def invalidate_agent(self, agent_id: str) -> None:
+        key_hash = self._by_agent.pop(agent_id, None)
+        if key_hash:
+            self._entries.pop(key_hash, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_agent.clear()
+
+
+agent_cache = AgentKeyCache()
 
 
 class AgentStore:
@@ -109,6 +170,7 @@ class AgentStore:
                 "UPDATE agents SET freemonies_amount_per_market = $1 WHERE agent_id = $2",
                 freemonies_amount_per_market, agent_id,
             )
+        agent_cache.invalidate_agent(agent_id)
 
     async def get_agent(self, agent_id: str) -> Optional[Agent]:
         """Lookup agent by ID."""
@@ -117,10 +179,21 @@ class AgentStore:
         return self._row_to_agent(row) if row else None
 
     async def get_agent_by_key_hash(self, api_key_hash: str) -> Optional[Agent]:
-        """Lookup agent by hashed API key."""
+        """Lookup agent by hashed API key (served from agent_cache when warm)."""
+        cached = agent_cache.get(api_key_hash)
+        if cached is not AgentKeyCache._MISS:
+            return cached
         pool = get_pool()
         row = await pool.fetchrow("SELECT * FROM agents WHERE api_key_hash = $1", api_key_hash)
-        return self._row_to_agent(row) if row else None
+        agent = self._row_to_agent(row) if row else None
+        agent_cache.put(api_key_hash, agent)
+        return agent
+
+    async def list_by_owner(self, owner_id: str) -> list[Agent]:
+        """Agents linked to a user, newest first."""
+        pool = get_pool()
+        rows = await pool.fetch("SELECT * FROM agents WHERE owner_id = $1 ORDER BY created_at DESC", owner_id)
+        return [self._row_to_agent(r) for r in rows]
 
     async def list_agents(self) -> list[Agent]:
         """Return all registered agents."""
@@ -143,4 +216,5 @@ class AgentStore:
             auto_freemonies=bool(row.get("auto_freemonies", False)),
             freemonies_max_markets=int(row.get("freemonies_max_markets") or 2),
             freemonies_amount_per_market=float(row.get("freemonies_amount_per_market") or 2.0),
+            owner_id=row.get("owner_id"),
         )
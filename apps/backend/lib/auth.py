@@ -8,7 +8,9 @@ from typing import Optional
 
 from eth_account.messages import encode_defunct
 from web3 import Web3
-from fastapi import Header, HTTPException, Depends
+from fastapi import Header, HTTPException, Depends, Request
+
+from lib.agent_store import Agent, AgentStore
 
 
 API_KEY_PREFIX = "epk_"
@@ -48,3 +50,38 @@ async def require_api_key(x_api_key: str = Header(..., alias="x-api-key")) -> st
     if not x_api_key or not x_api_key.startswith(API_KEY_PREFIX):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
     return x_api_key
+
+
+def api_key_from_request(request: Request) -> Optional[str]:
+    """Raw API key from x-api-key or an `Authorization: Bearer` header."""
+    return (
+        request.headers.get("X-API-Key")
+        or request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        or None
+    )
+
+
+async def resolve_agent(request: Request) -> Optional[Agent]:
+    """Resolve the calling agent once per request and keep it on request.state.
+
+    AgentLogMiddleware calls this before the route runs, so route dependencies
+    read the memoized result; the lookup itself goes through agent_cache, so a
+    warm key costs no DB round-trip at all.
+    """
+    if hasattr(request.state, "agent"):
+        return request.state.agent
+
+    agent = None
+    api_key = api_key_from_request(request)
+    if api_key and api_key.startswith(API_KEY_PREFIX):
+        agent = await AgentStore().get_agent_by_key_hash(hash_api_key(api_key))
+    request.state.agent = agent
+    return agent
+
+
+async def current_agent(request: Request, api_key: str = Depends(require_api_key)) -> Optional[Agent]:
+    """FastAPI dependency — agent behind a valid-looking x-api-key, or None if unknown.
+
+    Route handlers still check the agent matches the resource they serve.
+    """
+    return await resolve_agent(request)
@@ -0,0 +1,193 @@
+"""
+Balance watcher — drops cached balances the moment USDC moves.
+
+lib/balances.py serves wallet balances from memory. On its own it can only
+let them expire on a timer. This module follows the USDC Transfer logs of
+every agent address instead, so a deposit, withdrawal, trade or redemption
+clears the affected snapshots within a block or two.
+
+One loop per EVM chain (Polygon USDC.e, Base USDC), every
+BALANCE_WATCH_INTERVAL_SECONDS:
+
+  1. eth_blockNumber. Nothing to do until a new block arrives
+  2. eth_getLogs for the token's Transfer events over the new blocks (at
+     most BALANCE_WATCH_MAX_BLOCKS per round), filtered by topic to the
+     watched addresses: one filter with them as `from`, one as `to`,
+     BALANCE_WATCH_ADDRESSES_PER_FILTER addresses each. Every filter goes
+     out in a single JSON-RPC batch request
+  3. Invalidates the snapshot of every watched address a log touches
+
+Watched addresses are every agent's EOA and Polymarket Safe on Polygon and
+its EOA on Base, reloaded from Postgres every BALANCE_WATCH_RELOAD_SECONDS.
+While a chain's watcher is caught up, lib/balances.py keeps those snapshots
+for BALANCE_WATCHED_TTL. After an RPC error, or while catching up on a
+backlog, the chain falls back to BALANCE_TTL until the watcher is at the
+head again.
+
+Native (POL / ETH) balances have no Transfer event. They mostly move by the
+gas our own transactions spend, and are at most BALANCE_WATCHED_TTL old.
+A reorg that moves a Transfer into an already-scanned block is missed in
+the same way.
+
+Env vars:
+  BALANCE_WATCH_INTERVAL_SECONDS      Poll interval, about one block (default: 2)
+  BALANCE_WATCH_MAX_BLOCKS            Blocks per eth_getLogs range (default: 500)
+  BALANCE_WATCH_ADDRESSES_PER_FILTER  Address topics per filter (default: 500)
+  BALANCE_WATCH_RELOAD_SECONDS        Watched-address reload interval (default: 60)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import httpx
+from web3 import Web3
+
+from lib.balances import _EVM_CHAINS, BASE, POLYGON, BalanceService, balances
+from lib.contracts import derive_polymarket_safe
+from lib.database import bind_pool, get_pool
+
+log = logging.getLogger("balance_watcher")
+
+WATCH_INTERVAL = float(os.environ.get("BALANCE_WATCH_INTERVAL_SECONDS", "2"))
+WATCH_MAX_BLOCKS = int(os.environ.get("BALANCE_WATCH_MAX_BLOCKS", "500"))
+WATCH_ADDRESSES_PER_FILTER = int(os.environ.get("BALANCE_WATCH_ADDRESSES_PER_FILTER", "500"))
+WATCH_RELOAD = float(os.environ.get("BALANCE_WATCH_RELOAD_SECONDS", "60"))
+
+TRANSFER_TOPIC = "0x" + Web3.keccak(text="Transfer(address,address,uint256)").hex().removeprefix("0x")
+
+
+def _topic(address: str) -> str:
+    return "0x" + "00" * 12 + address.lower().removeprefix("0x")
+
+
+class TransferWatcher:
+    """Follows one token's Transfer logs on one chain for a set of addresses."""
+
+    def __init__(self, chain: str, rpc_url: str, token: str, service: BalanceService = balances):
+        self.chain = chain
+        self.rpc_url = rpc_url
+        self.token = token.lower()
+        self.service = service
+        self.addresses: frozenset[str] = frozenset()
+        self._topics: list[str] = []
+        self.last_block: Optional[int] = None
+        self._client = httpx.AsyncClient(timeout=15)
+
+    def set_addresses(self, addresses) -> None:
+        """Takes effect from the next poll."""
+        self.addresses = frozenset(a.lower() for a in addresses if a)
+        self._topics = [_topic(a) for a in sorted(self.addresses)]
+
+    async def _rpc(self, calls: list[tuple[str, list]]) -> list:
+        """One JSON-RPC batch request. Results in call order; raises on any error."""
+        batch = [{"jsonrpc": "2.0", "id": i, "method": m, "params": p} for i, (m, p) in enumerate(calls)]
+        resp = await self._client.post(self.rpc_url, json=batch)
+        resp.raise_for_status()
+        by_id = {r.get("id"): r for r in resp.json()}
+        out = []
+        for i, (method, _) in enumerate(calls):
+            r = by_id.get(i) or {"error": {"message": "missing response"}}
+            if "error" in r:
+                raise RuntimeError(f"{method}: {r['error'].get('message')}")
+            out.append(r["result"])
+        return out
+
+    async def poll(self) -> tuple[int, bool]:
+        """Scan the blocks since the last poll. Returns (addresses invalidated, caught up)."""
+        [head] = await self._rpc([("eth_blockNumber", [])])
+        head = int(head, 16)
+        if self.last_block is None:
+            # Nothing cached so far was served under the long TTL: start at the head
+            self.last_block = head
+        if head > self.last_block and self.addresses:
+            to_block = min(head, self.last_block + WATCH_MAX_BLOCKS)
+            topics = self._topics
+            span = {"fromBlock": hex(self.last_block + 1), "toBlock": hex(to_block), "address": self.token}
+            calls = []
+            for i in range(0, len(topics), WATCH_ADDRESSES_PER_FILTER):
+                chunk = topics[i:i + WATCH_ADDRESSES_PER_FILTER]
+                calls.append(("eth_getLogs", [{**span, "topics": [TRANSFER_TOPIC, chunk]}]))
+                calls.append(("eth_getLogs", [{**span, "topics": [TRANSFER_TOPIC, None, chunk]}]))
+            moved = {
+                "0x" + t[-40:].lower()
+                for logs in await self._rpc(calls)
+                for entry in logs
+                for t in entry["topics"][1:3]
+            } & self.addresses
+            for address in moved:
+                self.service.invalidate(self.chain, address)
+            self.last_block = to_block
+        else:
+            moved = set()
+            self.last_block = max(self.last_block, head)
+
+        caught_up = self.last_block >= head
+        if caught_up:
+            self.service.watch(self.chain, self.addresses)
+        else:
+            self.service.unwatch(self.chain)
+        return len(moved), caught_up
+
+
+_ADDRESSES_SQL = "SELECT wallet_address, polygon_safe FROM agents WHERE wallet_address IS NOT NULL"
+
+
+async def load_watched_addresses() -> dict[str, set[str]]:
+    """chain → agent addresses whose USDC balance is shown (EOA + Safe on Polygon, EOA on Base)."""
+    rows = await get_pool().fetch(_ADDRESSES_SQL)
+    polygon, base = set(), set()
+    for r in rows:
+        eoa = r["wallet_address"]
+        polygon.add(eoa)
+        polygon.add(r["polygon_safe"] or derive_polymarket_safe(eoa))
+        base.add(eoa)
+    return {POLYGON: polygon, BASE: base}
+
+
+def build_watchers() -> list[TransferWatcher]:
+    """One watcher per EVM chain with an RPC configured."""
+    watchers = []
+    for chain, (env, default_rpc, usdc) in _EVM_CHAINS.items():
+        rpc_url = os.environ.get(env, default_rpc)
+        if rpc_url:
+            watchers.append(TransferWatcher(chain, rpc_url, usdc))
+    return watchers
+
+
+async def _watch_chain(watcher: TransferWatcher, ready: asyncio.Event) -> None:
+    await ready.wait()
+    while True:
+        try:
+            moved, caught_up = await watcher.poll()
+            if moved:
+                log.debug(f"[balances] {watcher.chain}: {moved} address(es) invalidated up to block {watcher.last_block}")
+            if not caught_up:
+                continue    # backlog: next range right away
+        except Exception as e:
+            watcher.service.unwatch(watcher.chain)
+            log.warning(f"[balances] {watcher.chain} transfer watch error: {e}")
+        await asyncio.sleep(WATCH_INTERVAL)
+
+
+async def start_balance_watcher() -> None:
+    """Background loop: one Transfer poller per chain, watched addresses reloaded every BALANCE_WATCH_RELOAD_SECONDS."""
+    bind_pool("background")
+    watchers = build_watchers()
+    if not watchers:
+        log.info("[balances] transfer watcher disabled — no EVM RPC configured")
+        return
+    log.info(f"[balances] transfer watcher started — {', '.join(w.chain for w in watchers)} every {WATCH_INTERVAL:.0f}s")
+    ready = asyncio.Event()
+    for watcher in watchers:
+        asyncio.create_task(_watch_chain(watcher, ready))
+    while True:
+        try:
+            addresses = await load_watched_addresses()
+            for watcher in watchers:
+                watcher.set_addresses(addresses[watcher.chain])
+            ready.set()
+        except Exception as e:
+            log.error(f"[balances] watched-address reload error: {e}")
+        await asyncio.sleep(WATCH_RELOAD)
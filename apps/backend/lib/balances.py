@@ -0,0 +1,290 @@
+"""
+Balance snapshots for agent wallets on Polygon, Base and Solana.
+
+GET /balance/{agent_id} and GET /user/balances read from here instead of
+making RPC calls on every request. Each (chain, address) has a (native, usdc)
+snapshot that is served from memory for BALANCE_TTL seconds. Misses are
+filled per chain in one go, so a dashboard with many agents costs about one
+request per chain rather than one per agent and chain:
+
+  - EVM (Polygon, Base): Multicall3.getEthBalance and the chain's USDC
+    balanceOf for every missed address, packed into aggregate3 eth_calls
+    (lib/multicall.py). The Web3 provider is kept per RPC URL
+  - Solana: one getMultipleAccounts over every missed wallet (lamports) and
+    its USDC associated token account (token amount; a missing account is
+    0). Wallets beyond the RPC's 100-accounts limit are split into further
+    getMultipleAccounts calls, sent in the same JSON-RPC batch request
+
+Concurrent lookups of the same address share one fetch (single-flight).
+Failed reads come back as zero and are not cached, so the next request
+retries them.
+
+EVM addresses covered by lib/balance_watcher.py are dropped from the cache
+as soon as a USDC Transfer touches them, so their snapshots are kept for
+BALANCE_WATCHED_TTL instead. A fill that started before such an
+invalidation is returned to its caller but not cached.
+
+Env vars:
+  BALANCE_TTL          Seconds a balance snapshot is served from memory (default: 15)
+  BALANCE_WATCHED_TTL  Same, for addresses the Transfer watcher covers (default: 600)
+  BASE_RPC_URL     Base RPC (default: https://mainnet.base.org)
+  SOLANA_RPC_URL   Solana RPC (default: https://api.mainnet-beta.solana.com)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from eth_abi import decode as abi_decode
+from web3 import Web3
+
+from lib.contracts import CONTRACTS, ERC20_ABI, MULTICALL3_ABI
+from lib.multicall import aggregate
+
+log = logging.getLogger("balances")
+
+BALANCE_TTL = float(os.environ.get("BALANCE_TTL", "15"))
+BALANCE_WATCHED_TTL = float(os.environ.get("BALANCE_WATCHED_TTL", "600"))
+
+POLYGON, BASE, SOLANA = "polygon", "base", "solana"
+
+BASE_USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+SOLANA_USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+_SPL_TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+_ASSOCIATED_TOKEN_PROGRAM = "ATokenGPvbdGVxo1b2hRfnEBqA6oSYNPZbSH8fZA2Ynh"
+
+# getMultipleAccounts accepts at most 100 accounts: 50 wallets + their token accounts
+_SOLANA_WALLETS_PER_CALL = 50
+
+# chain → (RPC env var, default RPC, USDC contract); both native tokens have 18 decimals
+_EVM_CHAINS = {
+    POLYGON: ("CHAINSTACK_NODE", "", CONTRACTS["USDC_E"]),
+    BASE: ("BASE_RPC_URL", "https://mainnet.base.org", BASE_USDC),
+}
+
+
+@dataclass
+class Balance:
+    native: float
+    usdc: float
+    ok: bool = True      # False when the read failed (zeros, not cached)
+
+
+_FAILED = Balance(0.0, 0.0, ok=False)
+
+
+def _key(chain: str, address: str) -> tuple[str, str]:
+    """EVM addresses are case-insensitive; Solana base58 is not."""
+    return (chain, address if chain == SOLANA else address.lower())
+
+
+# ── Chain reads ───────────────────────────────────────────────────────────────
+
+
+def read_evm_balances(w3: Web3, usdc: str, addresses: list[str]) -> list[Optional[Balance]]:
+    """(native, USDC) per address via Multicall3 (blocking). None where a sub-call reverted."""
+    multicall = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["MULTICALL3"]), abi=MULTICALL3_ABI)
+    token = w3.eth.contract(address=Web3.to_checksum_address(usdc), abi=ERC20_ABI)
+    calls = []
+    for address in addresses:
+        cs = Web3.to_checksum_address(address)
+        calls += [
+            (CONTRACTS["MULTICALL3"], bytes.fromhex(multicall.encode_abi("getEthBalance", args=[cs])[2:])),
+            (usdc, bytes.fromhex(token.encode_abi("balanceOf", args=[cs])[2:])),
+        ]
+    results = aggregate(w3, calls)
+
+    out: list[Optional[Balance]] = []
+    for native, usdc_raw in zip(results[::2], results[1::2]):
+        if native is None or usdc_raw is None:
+            out.append(None)
+        else:
+            out.append(Balance(abi_decode(["uint256"], native)[0] / 1e18, abi_decode(["uint256"], usdc_raw)[0] / 1e6))
+    return out
+
+
+@lru_cache(maxsize=4096)
+def usdc_token_account(owner: str) -> str:
+    """The owner's USDC associated token account (PDA of owner, SPL token program, mint)."""
+    from solders.pubkey import Pubkey
+
+    ata, _ = Pubkey.find_program_address(
+        [
+            bytes(Pubkey.from_string(owner)),
+            bytes(Pubkey.from_string(_SPL_TOKEN_PROGRAM)),
+            bytes(Pubkey.from_string(SOLANA_USDC_MINT)),
+        ],
+        Pubkey.from_string(_ASSOCIATED_TOKEN_PROGRAM),
+    )
+    return str(ata)
+
+
+def _token_amount(account: Optional[dict]) -> float:
+    if not account:
+        return 0.0
+    data = account.get("data")
+    if not isinstance(data, dict):
+        return 0.0
+    return float(data["parsed"]["info"]["tokenAmount"]["uiAmount"] or 0)
+
+
+async def read_solana_balances(addresses: list[str]) -> list[Optional[Balance]]:
+    """(SOL, USDC) per address via getMultipleAccounts (one HTTP request). None where unreadable."""
+    rpc = os.environ.get("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
+    token_accounts: list[Optional[str]] = []
+    for address in addresses:
+        try:
+            token_accounts.append(usdc_token_account(address))
+        except ValueError:
+            token_accounts.append(None)     # not a valid public key
+    valid = [i for i, t in enumerate(token_accounts) if t]
+    chunks = [valid[k:k + _SOLANA_WALLETS_PER_CALL] for k in range(0, len(valid), _SOLANA_WALLETS_PER_CALL)]
+    batch = [
+        {
+            "jsonrpc": "2.0", "id": n, "method": "getMultipleAccounts",
+            "params": [
+                [addresses[i] for i in chunk] + [token_accounts[i] for i in chunk],
+                {"encoding": "jsonParsed"},
+            ],
+        }
+        for n, chunk in enumerate(chunks)
+    ]
+    out: list[Optional[Balance]] = [None] * len(addresses)
+    if not batch:
+        return out
+    async with httpx.AsyncClient(timeout=10) as client:
+        resp = await client.post(rpc, json=batch)
+        resp.raise_for_status()
+    by_id = {r.get("id"): r for r in resp.json()}
+
+    for n, chunk in enumerate(chunks):
+        accounts = by_id.get(n, {}).get("result", {}).get("value")
+        if accounts is None:
+            continue
+        wallets, tokens = accounts[:len(chunk)], accounts[len(chunk):]
+        for i, wallet, token in zip(chunk, wallets, tokens):
+            out[i] = Balance((wallet or {}).get("lamports", 0) / 1e9, _token_amount(token))
+    return out
+
+
+# ── Snapshot cache ────────────────────────────────────────────────────────────
+
+
+class BalanceService:
+    """(chain, address) → Balance snapshots with TTL, per-chain batched refills and single-flight."""
+
+    def __init__(self, ttl: float = None, watched_ttl: float = None):
+        self.ttl = BALANCE_TTL if ttl is None else ttl
+        self.watched_ttl = BALANCE_WATCHED_TTL if watched_ttl is None else watched_ttl
+        self._snapshots: dict[tuple[str, str], tuple[Balance, float]] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self._epochs: dict[tuple[str, str], int] = {}   # bumped by invalidate()
+        self._watched: dict[str, frozenset[str]] = {}   # chain → addresses kept fresh by Transfer logs
+        self._web3: dict[str, Web3] = {}
+
+    def peek(self, chain: str, address: str) -> Optional[Balance]:
+        """Cached balance regardless of age."""
+        entry = self._snapshots.get(_key(chain, address))
+        return entry[0] if entry else None
+
+    def put(self, chain: str, address: str, balance: Balance) -> None:
+        self._snapshots[_key(chain, address)] = (balance, time.monotonic())
+
+    def invalidate(self, chain: str, address: str) -> None:
+        key = _key(chain, address)
+        self._snapshots.pop(key, None)
+        self._epochs[key] = self._epochs.get(key, 0) + 1
+
+    def watch(self, chain: str, addresses) -> None:
+        """Serve `addresses` on `chain` for watched_ttl: the caller invalidates them when funds move."""
+        watched = frozenset(_key(chain, a)[1] for a in addresses)
+        # A snapshot taken before its address was watched may predate a Transfer nobody saw
+        for address in watched - self._watched.get(chain, frozenset()):
+            self._snapshots.pop((chain, address), None)
+        self._watched[chain] = watched
+
+    def unwatch(self, chain: str) -> None:
+        """Back to the short TTL for `chain` (its watcher stopped or fell behind)."""
+        self._watched.pop(chain, None)
+
+    def _ttl(self, key: tuple[str, str]) -> float:
+        return self.watched_ttl if key[1] in self._watched.get(key[0], ()) else self.ttl
+
+    async def get_many(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], Balance]:
+        """Balances for (chain, address) keys, keyed as given. Fresh snapshots are served from memory."""
+        now = time.monotonic()
+        found: dict[tuple[str, str], Balance] = {}
+        waits: dict[tuple[str, str], asyncio.Future] = {}
+        misses: list[tuple[str, str]] = []
+        for key in dict.fromkeys(_key(c, a) for c, a in keys):
+            entry = self._snapshots.get(key)
+            if entry and now - entry[1] < self._ttl(key):
+                found[key] = entry[0]
+            elif key in self._inflight:
+                waits[key] = self._inflight[key]
+            else:
+                misses.append(key)
+
+        if misses:
+            loop = asyncio.get_running_loop()
+            epochs = {key: self._epochs.get(key, 0) for key in misses}
+            for key in misses:
+                self._inflight[key] = loop.create_future()
+            fetched: dict[tuple[str, str], Balance] = {}
+            try:
+                fetched = await self._fetch(misses)
+            finally:
+                for key in misses:
+                    balance = fetched.get(key, _FAILED)
+                    # Not cached if funds moved while the read was in flight
+                    if balance.ok and self._epochs.get(key, 0) == epochs[key]:
+                        self.put(*key, balance)
+                    self._inflight.pop(key).set_result(balance)
+            found.update(fetched)
+        for key, fut in waits.items():
+            # shield: a cancelled waiter must not cancel the shared fetch
+            found[key] = await asyncio.shield(fut)
+
+        return {(c, a): found.get(_key(c, a), _FAILED) for c, a in keys}
+
+    def _w3(self, rpc_url: str) -> Web3:
+        w3 = self._web3.get(rpc_url)
+        if w3 is None:
+            w3 = self._web3[rpc_url] = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 15}))
+        return w3
+
+    async def _fetch(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], Balance]:
+        """One batched read per chain for `keys`. Missing entries failed."""
+        by_chain: dict[str, list[str]] = defaultdict(list)
+        for chain, address in keys:
+            by_chain[chain].append(address)
+
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for chain, addresses in by_chain.items():
+            if chain == SOLANA:
+                jobs.append(read_solana_balances(addresses))
+                continue
+            env, default_rpc, usdc = _EVM_CHAINS[chain]
+            rpc_url = os.environ.get(env, default_rpc)
+            if not rpc_url:
+                jobs.append(asyncio.sleep(0, result=[None] * len(addresses)))
+                continue
+            jobs.append(loop.run_in_executor(None, read_evm_balances, self._w3(rpc_url), usdc, addresses))
+
+        out: dict[tuple[str, str], Balance] = {}
+        for (chain, addresses), result in zip(by_chain.items(), await asyncio.gather(*jobs, return_exceptions=True)):
+            if isinstance(result, Exception):
+                log.warning(f"[balances] {chain} read for {len(addresses)} address(es) failed: {result}")
+                continue
+            out.update(((chain, a), b) for a, b in zip(addresses, result) if b is not None)
+        return out
+
+
+balances = BalanceService()
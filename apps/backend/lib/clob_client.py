@@ -1,132 +1,528 @@
 """CLOB trading client wrapper.
 
-Wraps py-clob-client for order execution with proxy support.
-Includes retry logic for Cloudflare blocks when using rotating proxies.
+Async client for Polymarket's CLOB with proxy support. Orders are signed
+locally with py-clob-client's OrderBuilder and posted over pooled HTTP/2
+connections shared by every agent (see lib/proxy_pool.py). L2 API credentials are cached per
+signer (in memory, and Fernet-encrypted in Postgres) and market metadata
+(tick size, neg-risk, fee rate) is cached per token, so a warm order post
+is a single request.
+
+Includes retry logic for Cloudflare blocks: each retry goes out through the
+next-best proxy exit while the blocked one sits in quarantine.
 """
 
+import asyncio
+import json
 import os
 import time
-from typing import Optional
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 
 import httpx
 
+from lib.crypto import decrypt_private_key, encrypt_private_key
+from lib.orderbook import order_books, quote_fok_sell
+from lib.proxy_pool import proxy_pool
+
+CLOB_HOST = "https://clob.polymarket.com"
+
 # Max retries for Cloudflare blocks (with rotating proxy, each retry gets new IP)
 CLOB_MAX_RETRIES = int(os.environ.get("CLOB_MAX_RETRIES", "5"))
 
+# Tick size / neg-risk / fee rate barely change — refetch after this many seconds
+CLOB_MARKET_META_TTL = float(os.environ.get("CLOB_MARKET_META_TTL", "300"))
+
+# POST /orders accepts at most this many orders per request
+CLOB_BATCH_SIZE = int(os.environ.get("CLOB_BATCH_SIZE", "15"))
+
+# Max CLOB order requests in flight per client (stays under the CLOB's burst limits)
+CLOB_MAX_CONCURRENCY = int(os.environ.get("CLOB_MAX_CONCURRENCY", "5"))
+
+# token_id → (fetched_at, tick_size, neg_risk, fee_rate_bps)
+_market_meta: dict[str, tuple[float, str, bool, int]] = {}
+
+
+async def close_transport() -> None:
+    """Close the pooled clients (app shutdown)."""
+    await proxy_pool.aclose()
+
+
+class ClobCredentialCache:
+    """Per-signer CLOB L2 API credentials.
+
+    Lookups hit memory first, then the clob_credentials table (encrypted with
+    lib/crypto), and only derive new creds from the CLOB on a full miss.
+    Without a DB pool or master key (e.g. CLI runs) it degrades to memory only.
+    """
+
+    def __init__(self):
+        self._mem: dict = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, address: str, derive: Callable[[], Awaitable]):
+        """Return cached creds for `address`, deriving them once on a miss."""
+        key = address.lower()
+        creds = self._mem.get(key)
+        if creds is not None:
+            return creds
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            creds = self._mem.get(key)
+            if creds is None:
+                creds = await self._load(key)
+            if creds is None:
+                creds = await derive()
+                await self._store(key, creds)
+            self._mem[key] = creds
+            return creds
+
+    async def invalidate(self, address: str) -> None:
+        """Forget creds for `address` (e.g. after the CLOB rejects them with 401)."""
+        key = address.lower()
+        self._mem.pop(key, None)
+        try:
+            from lib.database import get_pool
+            await get_pool().execute("DELETE FROM clob_credentials WHERE signer_address = $1", key)
+        except RuntimeError:
+            pass    # no DB pool — the in-memory entry was all there was
+        except Exception as e:
+            print(f"[CLOB] Could not drop cached creds for {key}: {e}")
+
+    async def _load(self, key: str):
+        from py_clob_client.clob_types import ApiCreds
+
+        try:
+            from lib.database import get_pool
+            row = await get_pool().fetchrow(
+                "SELECT creds_encrypted FROM clob_credentials WHERE signer_address = $1", key
+            )
+            if not row:
+                return None
+            return ApiCreds(**json.loads(decrypt_private_key(row["creds_encrypted"])))
+        except (RuntimeError, ValueError) as e:
+            # No DB pool / master key, or a blob we can no longer decrypt — derive fresh
+            if not isinstance(e, RuntimeError):
+                print(f"[CLOB] Could not load cached creds for {key}: {e}")
+            return None
+        except Exception as e:
+            print(f"[CLOB] Could not load cached creds for {key}: {e}")
+            return None
+
+    async def _store(self, key: str, creds) -> None:
+        try:
+            from lib.database import get_pool
+            blob = encrypt_private_key(json.dumps({
+                "api_key": creds.api_key,
+                "api_secret": creds.api_secret,
+                "api_passphrase": creds.api_passphrase,
+            }))
+            await get_pool().execute(
+                """
+                INSERT INTO clob_credentials (signer_address, creds_encrypted, updated_at)
+                VALUES ($1, $2, NOW())
+                ON CONFLICT (signer_address)
+                DO UPDATE SET creds_encrypted = EXCLUDED.creds_encrypted, updated_at = NOW()
+                """,
+                key,
+                blob,
+            )
+        except RuntimeError:
+            pass    # no DB pool / master key — creds are re-derived next time
+        except Exception as e:
+            print(f"[CLOB] Could not cache creds for {key}: {e}")
+
+
+clob_creds = ClobCredentialCache()
+
+
+@dataclass
+class SellFill:
+    """Expected (book VWAP) vs realized (matched amounts) price of a FOK sell."""
+
+    expected_price: Optional[float] = None
+    limit_price: Optional[float] = None
+    realized_price: Optional[float] = None
+    realized_size: Optional[float] = None
+
+    def record(self, result: dict) -> None:
+        """Read matched amounts off a POST /order response (SELL: making = shares, taking = USDC)."""
+        try:
+            shares = float(result.get("makingAmount") or 0)
+            usdc = float(result.get("takingAmount") or 0)
+        except (TypeError, ValueError):
+            return
+        if shares > 0:
+            self.realized_size = shares
+            self.realized_price = usdc / shares
+
+
+@dataclass
+class OrderRequest:
+    """One order in a batch submission."""
+
+    token_id: str
+    side: str            # "BUY" or "SELL"
+    price: float
+    size: float          # shares
+    order_type: str = "FOK"
+
+
+@dataclass
+class OrderOutcome:
+    """Per-order result of a batch submission."""
+
+    request: OrderRequest
+    order_id: Optional[str] = None
+    success: bool = False
+    status: Optional[str] = None    # CLOB status: matched / live / delayed / unmatched
+    error: Optional[str] = None
+    fill: Optional[SellFill] = None
+
+
+def _apply_order_result(outcome: OrderOutcome, result: dict) -> None:
+    """Fill an OrderOutcome from one POST /order(s) response entry."""
+    if not isinstance(result, dict):
+        outcome.error = str(result)[:200]
+        return
+    outcome.order_id = result.get("orderID") or None
+    outcome.status = result.get("status")
+    outcome.success = bool(result.get("success")) and not result.get("errorMsg")
+    if not outcome.success:
+        outcome.error = result.get("errorMsg") or f"order {outcome.status or 'rejected'}"
+    if outcome.request.side == "SELL":
+        outcome.fill = SellFill(limit_price=outcome.request.price)
+        outcome.fill.record(result)
+
 
 class ClobClientWrapper:
-    """Wrapper around py-clob-client for trading."""
+    """Async py-clob-client replacement for trading."""
 
     def __init__(self, private_key: str, address: str, safe_address: str = None):
         self.private_key = private_key
         self.address = address
         self.safe_address = safe_address or address  # Safe as funder, EOA as signer
-        self._client = None
-        self._creds = None
-
-    def _refresh_http_client(self):
-        """Create a fresh HTTP client (for IP rotation with proxies)."""
-        import py_clob_client.http_helpers.helpers as clob_helpers
-
-        proxy = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-        if proxy:
-            # Close old client if exists
-            if hasattr(clob_helpers, '_http_client') and clob_helpers._http_client:
-                try:
-                    clob_helpers._http_client.close()
-                except Exception:
-                    pass
-            # Create fresh client (gets new IP with rotating proxies)
-            clob_helpers._http_client = httpx.Client(
-                http2=True, proxy=proxy, timeout=30.0
-            )
+        self._signer = None
+        self._builder = None
 
-    def _init_client(self):
-        """Initialize CLOB client with optional proxy support."""
+    def _init_signing(self):
+        """Build the local order signer — EOA signs, Safe holds funds."""
         try:
-            from py_clob_client.client import ClobClient
-            import py_clob_client.http_helpers.helpers as clob_helpers
+            from py_clob_client.signer import Signer
+            from py_clob_client.order_builder.builder import OrderBuilder
         except ImportError:
             raise ImportError(
                 "py-clob-client not installed. Run: pip install py-clob-client"
             )
 
-        # Configure proxy if available
-        proxy = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
-        if proxy:
-            clob_helpers._http_client = httpx.Client(
-                http2=True, proxy=proxy, timeout=30.0
-            )
-
-        # Initialize client — EOA signs, Safe holds funds
-        self._client = ClobClient(
-            "https://clob.polymarket.com",
-            key=self.private_key,
-            chain_id=137,
-            signature_type=0,  # EOA signature
+        self._signer = Signer(self.private_key, 137)
+        self._builder = OrderBuilder(
+            self._signer,
+            sig_type=0,  # EOA signature
             funder=self.safe_address,  # Safe wallet holds the funds
         )
 
-        # Set up API credentials
-        self._creds = self._client.create_or_derive_api_creds()
-        self._client.set_api_creds(self._creds)
+    @property
+    def signer(self):
+        if self._signer is None:
+            self._init_signing()
+        return self._signer
 
     @property
-    def client(self):
-        """Get or initialize CLOB client."""
-        if self._client is None:
-            self._init_client()
-        return self._client
+    def builder(self):
+        if self._builder is None:
+            self._init_signing()
+        return self._builder
+
+    async def _request(self, method: str, path: str, headers: dict = None, body: str = None, params: dict = None):
+        """Send one request on the shared transport. Raises PolyApiException on non-200."""
+        from py_clob_client.exceptions import PolyApiException
+
+        try:
+            resp = await proxy_pool.request(
+                method,
+                f"{CLOB_HOST}{path}",
+                headers=headers,
+                content=body.encode("utf-8") if body is not None else None,
+                params=params,
+            )
+        except httpx.RequestError as e:
+            raise PolyApiException(error_msg=f"Request exception: {e}")
+
+        if resp.status_code != 200:
+            raise PolyApiException(resp)
+        try:
+            return resp.json()
+        except ValueError:
+            return resp.text
+
+    async def _derive_creds(self):
+        """Create (or re-derive) this signer's L2 API key — one signed L1 round-trip."""
+        from py_clob_client.clob_types import ApiCreds
+        from py_clob_client.endpoints import CREATE_API_KEY, DERIVE_API_KEY
+        from py_clob_client.headers.headers import create_level_1_headers
+
+        try:
+            raw = await self._request("POST", CREATE_API_KEY, create_level_1_headers(self.signer))
+        except Exception:
+            raw = await self._request("GET", DERIVE_API_KEY, create_level_1_headers(self.signer))
+        return ApiCreds(
+            api_key=raw["apiKey"],
+            api_secret=raw["secret"],
+            api_passphrase=raw["passphrase"],
+        )
+
+    async def _l2_request(self, method: str, path: str, body=None, params: dict = None):
+        """L2-authenticated request. Stale creds (401) are dropped and re-derived once."""
+        from py_clob_client.clob_types import RequestArgs
+        from py_clob_client.exceptions import PolyApiException
+        from py_clob_client.headers.headers import create_level_2_headers
+
+        for attempt in range(2):
+            creds = await clob_creds.get(self.address, self._derive_creds)
+            payload = body(creds) if callable(body) else body
+            serialized = (
+                json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+                if payload is not None else None
+            )
+            headers = create_level_2_headers(
+                self.signer,
+                creds,
+                RequestArgs(method=method, request_path=path, body=payload, serialized_body=serialized),
+            )
+            try:
+                return await self._request(method, path, headers, serialized, params)
+            except PolyApiException as e:
+                if e.status_code == 401 and attempt == 0:
+                    await clob_creds.invalidate(self.address)
+                    continue
+                raise
+
+    async def _get_market_meta(self, token_id: str) -> tuple[str, bool, int]:
+        """(tick_size, neg_risk, fee_rate_bps) for a token, cached for CLOB_MARKET_META_TTL."""
+        from py_clob_client.endpoints import GET_FEE_RATE, GET_NEG_RISK, GET_TICK_SIZE
+
+        cached = _market_meta.get(token_id)
+        if cached and time.monotonic() - cached[0] < CLOB_MARKET_META_TTL:
+            return cached[1:]
+
+        params = {"token_id": token_id}
+        tick, neg, fee = await asyncio.gather(
+            self._request("GET", GET_TICK_SIZE, params=params),
+            self._request("GET", GET_NEG_RISK, params=params),
+            self._request("GET", GET_FEE_RATE, params=params),
+        )
+        meta = (str(tick["minimum_tick_size"]), bool(neg["neg_risk"]), int(fee.get("base_fee") or 0))
+        _market_meta[token_id] = (time.monotonic(), *meta)
+        return meta
+
+    def _sign_order(self, token_id: str, price: float, size: float, side: str, meta: tuple[str, bool, int]):
+        """Sign a limit order locally (CPU only — safe to run in a worker thread)."""
+        from py_clob_client.clob_types import CreateOrderOptions, OrderArgs
+        from py_clob_client.utilities import price_valid
+
+        tick_size, neg_risk, fee_rate_bps = meta
+        if not price_valid(price, tick_size):
+            raise Exception(f"price ({price}), min: {tick_size} - max: {1 - float(tick_size)}")
+
+        return self.builder.create_order(
+            OrderArgs(
+                token_id=token_id,
+                price=price,
+                size=size,
+                side=side,
+                fee_rate_bps=fee_rate_bps,
+            ),
+            CreateOrderOptions(tick_size=tick_size, neg_risk=neg_risk),
+        )
+
+    async def _create_order(self, token_id: str, price: float, size: float, side: str):
+        """Sign a limit order locally."""
+        meta = await self._get_market_meta(token_id)
+        return self._sign_order(token_id, price, size, side, meta)
+
+    async def _post_order(self, order, order_type) -> dict:
+        from py_clob_client.endpoints import POST_ORDER
+        from py_clob_client.utilities import order_to_json
+
+        return await self._l2_request(
+            "POST", POST_ORDER, body=lambda creds: order_to_json(order, creds.api_key, order_type)
+        )
+
+    async def post_orders(self, requests: list[OrderRequest]) -> list[OrderOutcome]:
+        """Sign and submit many orders at once; results come back in request order.
+
+        Market metadata is fetched once per distinct token, orders are signed
+        in worker threads, and the signed orders go out through POST /orders in
+        chunks of CLOB_BATCH_SIZE sent concurrently (at most
+        CLOB_MAX_CONCURRENCY in flight). A 20-order unwind is two parallel
+        requests, i.e. about one round-trip.
+        """
+        from py_clob_client.endpoints import POST_ORDERS
+        from py_clob_client.utilities import order_to_json
+
+        outcomes = [OrderOutcome(request=r) for r in requests]
+        if not requests:
+            return outcomes
+
+        tokens = list({r.token_id for r in requests})
+        metas = await asyncio.gather(*[self._get_market_meta(t) for t in tokens], return_exceptions=True)
+        meta_by_token = dict(zip(tokens, metas))
+
+        async def _sign(i: int, r: OrderRequest):
+            try:
+                meta = meta_by_token[r.token_id]
+                if isinstance(meta, Exception):
+                    raise meta
+                return i, await asyncio.to_thread(self._sign_order, r.token_id, r.price, r.size, r.side, meta)
+            except Exception as e:
+                outcomes[i].error = f"Signing failed: {e}"
+                return None
+
+        signed = [s for s in await asyncio.gather(*[_sign(i, r) for i, r in enumerate(requests)]) if s]
+
+        sem = asyncio.Semaphore(CLOB_MAX_CONCURRENCY)
+
+        async def _submit(chunk: list[tuple[int, object]]):
+            async with sem:
+                try:
+                    results = await self._l2_request(
+                        "POST",
+                        POST_ORDERS,
+                        body=lambda creds: [
+                            order_to_json(order, creds.api_key, requests[i].order_type) for i, order in chunk
+                        ],
+                    )
+                except Exception as e:
+                    for i, _ in chunk:
+                        outcomes[i].error = str(e)
+                    return
+            if not isinstance(results, list):
+                results = []
+                error = "unexpected batch response"
+            else:
+                error = "missing from batch response"
+            for k, (i, _) in enumerate(chunk):
+                if k < len(results):
+                    _apply_order_result(outcomes[i], results[k])
+                else:
+                    outcomes[i].error = error
+
+        chunks = [signed[k:k + CLOB_BATCH_SIZE] for k in range(0, len(signed), CLOB_BATCH_SIZE)]
+        await asyncio.gather(*[_submit(c) for c in chunks])
+
+        for r in requests:
+            order_books.invalidate(r.token_id)
+        return outcomes
+
+    async def sell_many(
+        self,
+        legs: list[tuple[str, float, float]],
+        max_slippage: float = None,
+    ) -> list[tuple[Optional[str], bool, Optional[str], SellFill]]:
+        """
+        FOK-sell several (token_id, amount, reference_price) legs in one batch.
+
+        Each leg is priced off the order book like sell_fok; legs that fail
+        the depth/slippage check are not submitted.
+
+        Returns:
+            Per leg, the same (order_id, filled, error_message, fill) as sell_fok
+        """
+        from py_clob_client.order_builder.constants import SELL
+
+        quotes = await asyncio.gather(
+            *[self.quote_sell(t, amount, price, max_slippage) for t, amount, price in legs],
+            return_exceptions=True,
+        )
+
+        results: list = [None] * len(legs)
+        batch, batch_idx = [], []
+        for i, ((token_id, amount, _), quote) in enumerate(zip(legs, quotes)):
+            if isinstance(quote, Exception):
+                results[i] = (None, False, str(quote), SellFill())
+                continue
+            estimate, quote_error = quote
+            fill = SellFill(expected_price=estimate.vwap, limit_price=estimate.limit_price)
+            if quote_error:
+                results[i] = (None, False, f"{quote_error} - tokens kept, sell manually", fill)
+                continue
+            batch.append(OrderRequest(token_id, SELL, estimate.limit_price, amount, "FOK"))
+            batch_idx.append((i, fill))
+
+        for (i, fill), outcome in zip(batch_idx, await self.post_orders(batch)):
+            if outcome.fill:
+                fill.realized_price = outcome.fill.realized_price
+                fill.realized_size = outcome.fill.realized_size
+            results[i] = (outcome.order_id, outcome.success, outcome.error, fill)
+        return results
 
     def _is_cloudflare_block(self, error_msg: str) -> bool:
         """Check if error is a Cloudflare block."""
         return "403" in error_msg and ("cloudflare" in error_msg.lower() or "blocked" in error_msg.lower())
 
-    def sell_fok(
+    async def _fetch_raw_book(self, token_id: str) -> dict:
+        from py_clob_client.endpoints import GET_ORDER_BOOK
+
+        return await self._request("GET", GET_ORDER_BOOK, params={"token_id": token_id})
+
+    async def quote_sell(self, token_id: str, amount: float, price: float, max_slippage: float = None):
+        """Walk the cached bids for a FOK sell of `amount` shares.
+
+        Returns:
+            Tuple of (FillEstimate, error_message)
+        """
+        book = await order_books.get(token_id, self._fetch_raw_book)
+        return quote_fok_sell(book, amount, price, max_slippage)
+
+    async def sell_fok(
         self,
         token_id: str,
         amount: float,
         price: float,
-    ) -> tuple[Optional[str], bool, Optional[str]]:
+        max_slippage: float = None,
+    ) -> tuple[Optional[str], bool, Optional[str], SellFill]:
         """
         Sell tokens via CLOB using FOK (Fill or Kill) order.
 
+        The limit is the worst bid level the order book says is needed to
+        fill `amount`, refused if that is more than `max_slippage`
+        (default CLOB_MAX_SLIPPAGE) below `price`.
+
         Args:
             token_id: Token ID to sell
             amount: Amount of tokens to sell
-            price: Current market price (will sell 10% below)
+            price: Reference market price (Gamma outcome price)
+            max_slippage: Max fractional drop below `price` to accept
 
         Returns:
-            Tuple of (order_id, filled, error_message)
+            Tuple of (order_id, filled, error_message, fill)
         """
-        from py_clob_client.clob_types import OrderArgs, OrderType
+        from py_clob_client.clob_types import OrderType
         from py_clob_client.order_builder.constants import SELL
 
-        # Set low price to match any buy orders (market sell)
-        sell_price = round(max(price * 0.90, 0.01), 2)
-
+        fill = SellFill()
         last_error = None
-        proxy = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
+        proxy = proxy_pool.proxied
 
         for attempt in range(CLOB_MAX_RETRIES):
             try:
-                # Refresh HTTP client for new IP (only if using proxy and retrying)
+                # The pool already quarantined the blocked exit — retry goes out another one
                 if attempt > 0 and proxy:
                     print(f"  Retrying CLOB sell (attempt {attempt + 1}/{CLOB_MAX_RETRIES})...")
-                    self._refresh_http_client()
-                    time.sleep(1)  # Brief pause between retries
-
-                order = self.client.create_order(
-                    OrderArgs(
-                        token_id=token_id,
-                        price=sell_price,
-                        size=amount,
-                        side=SELL,
-                    )
-                )
-                result = self.client.post_order(order, OrderType.FOK)
+
+                estimate, quote_error = await self.quote_sell(token_id, amount, price, max_slippage)
+                fill.expected_price = estimate.vwap
+                fill.limit_price = estimate.limit_price
+                if quote_error:
+                    return None, False, f"{quote_error} - tokens kept, sell manually", fill
+
+                order = await self._create_order(token_id, estimate.limit_price, amount, SELL)
+                result = await self._post_order(order, OrderType.FOK)
+                order_books.invalidate(token_id)  # our fill consumed liquidity
+                fill.record(result)
                 order_id = result.get("orderID", str(result)[:40])
-                return order_id, True, None
+                return order_id, True, None, fill
 
             except Exception as e:
                 last_error = str(e)
@@ -145,19 +541,21 @@ class ClobClientWrapper:
                 "Sell manually at polymarket.com or try with HTTPS_PROXY env var."
             )
         elif "no match" in last_error.lower() or "insufficient" in last_error.lower():
-            error_msg = f"No liquidity at ${sell_price:.2f} - tokens kept, sell manually"
+            order_books.invalidate(token_id)  # book moved since the snapshot
+            limit = f"${fill.limit_price:.3f}" if fill.limit_price else "the quoted price"
+            error_msg = f"No liquidity at {limit} - tokens kept, sell manually"
         else:
             error_msg = last_error
 
-        return None, False, error_msg
+        return None, False, error_msg, fill
 
-    def buy_market(
+    async def buy_market(
         self,
         token_id: str,
         amount: float,
     ) -> tuple[Optional[str], Optional[str]]:
         """
-        Place a market buy order using MarketOrderArgs (recommended by Polymarket).
+        Place a market buy order (FOK at the price that fills `amount` dollars).
 
         Args:
             token_id: Token ID to buy
@@ -167,23 +565,33 @@ class ClobClientWrapper:
             Tuple of (order_id, error_message)
         """
         try:
-            from py_clob_client.clob_types import MarketOrderArgs, OrderType
+            from py_clob_client.clob_types import MarketOrderArgs, CreateOrderOptions, OrderType
             from py_clob_client.order_builder.constants import BUY
 
-            mo = MarketOrderArgs(
-                token_id=token_id,
-                amount=amount,
-                side=BUY,
+            book, (tick_size, neg_risk, fee_rate_bps) = await asyncio.gather(
+                self.get_order_book(token_id),
+                self._get_market_meta(token_id),
             )
-            signed = self.client.create_market_order(mo)
-            result = self.client.post_order(signed, OrderType.FOK)
+            price = self.builder.calculate_buy_market_price(book.asks, amount, OrderType.FOK)
+
+            signed = self.builder.create_market_order(
+                MarketOrderArgs(
+                    token_id=token_id,
+                    amount=amount,
+                    side=BUY,
+                    price=price,
+                    fee_rate_bps=fee_rate_bps,
+                ),
+                CreateOrderOptions(tick_size=tick_size, neg_risk=neg_risk),
+            )
+            result = await self._post_order(signed, OrderType.FOK)
             order_id = result.get("orderID", str(result)[:40])
             return order_id, None
 
         except Exception as e:
             return None, str(e)
 
-    def buy_gtc(
+    async def buy_gtc(
         self,
         token_id: str,
         amount: float,
@@ -201,36 +609,69 @@ class ClobClientWrapper:
             Tuple of (order_id, error_message)
         """
         try:
-            from py_clob_client.clob_types import OrderArgs, OrderType
+            from py_clob_client.clob_types import OrderType
             from py_clob_client.order_builder.constants import BUY
 
-            order = self.client.create_order(
-                OrderArgs(
-                    token_id=token_id,
-                    price=round(price, 2),
-                    size=amount,
-                    side=BUY,
-                )
-            )
-            result = self.client.post_order(order, OrderType.GTC)
+            order = await self._create_order(token_id, round(price, 2), amount, BUY)
+            result = await self._post_order(order, OrderType.GTC)
             order_id = result.get("orderID", str(result)[:40])
             return order_id, None
 
         except Exception as e:
             return None, str(e)
 
-    def get_order_book(self, token_id: str) -> dict:
-        """Get order book for a token."""
-        return self.client.get_order_book(token_id)
+    async def get_order_book(self, token_id: str):
+        """Get order book for a token (also refreshes the shared book cache)."""
+        from py_clob_client.utilities import parse_raw_orderbook_summary
+
+        raw = await self._fetch_raw_book(token_id)
+        order_books.apply_snapshot(raw)
+        return parse_raw_orderbook_summary(raw)
 
-    def get_orders(self) -> list:
+    async def get_orders(self) -> list:
         """Get all open orders."""
-        return self.client.get_orders()
+        from py_clob_client.endpoints import ORDERS
+
+        results, cursor = [], "MA=="
+        while cursor != "LTE=":
+            page = await self._l2_request("GET", ORDERS, params={"next_cursor": cursor})
+            results += page["data"]
+            cursor = page["next_cursor"]
+        return results
+
+    async def get_trades(self, after: int = None) -> list:
+        """Get this key's trades (fills), optionally only those after a unix timestamp."""
+        from py_clob_client.endpoints import TRADES
+
+        results, cursor = [], "MA=="
+        while cursor != "LTE=":
+            params = {"next_cursor": cursor}
+            if after:
+                params["after"] = after
+            page = await self._l2_request("GET", TRADES, params=params)
+            results += page["data"]
+            cursor = page["next_cursor"]
+        return results
+
+    async def cancel_orders(self, order_ids: list[str]) -> tuple[list[str], dict]:
+        """Cancel many orders in one request.
 
-    def cancel_order(self, order_id: str) -> bool:
+        Returns:
+            Tuple of (cancelled_ids, {order_id: reason} for those not cancelled)
+        """
+        from py_clob_client.endpoints import CANCEL_ORDERS
+
+        if not order_ids:
+            return [], {}
+        result = await self._l2_request("DELETE", CANCEL_ORDERS, body=list(order_ids))
+        return list(result.get("canceled") or []), dict(result.get("not_canceled") or {})
+
+    async def cancel_order(self, order_id: str) -> bool:
         """Cancel an order."""
+        from py_clob_client.endpoints import CANCEL
+
         try:
-            self.client.cancel(order_id)
+            await self._l2_request("DELETE", CANCEL, body={"orderID": order_id})
             return True
         except Exception:
             return False
@@ -11,6 +11,8 @@ CONTRACTS = {
     "NEG_RISK_ADAPTER": "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296",
     "SAFE_PROXY_FACTORY": "0xaacfeea03eb1561c4e67d661e40682bd20e3541b",
     "PROXY_WALLET_FACTORY": "0xaB45c5A4B0c941a2F231C04C3f49182e1A254052",
+    "MULTICALL3": "0xcA11bde05977b3631167028862bE2a173976CA11",  # same address on every EVM chain
+    "MULTISEND_CALL_ONLY": "0x40A2aCCbd92BCA938b02010E17A5b8929b49130D",  # Safe v1.3.0, delegatecalled
 }
 
 # Polygon chain ID
@@ -110,6 +112,15 @@ CTF_ABI = [
         "outputs": [{"name": "", "type": "uint256"}],
         "type": "function",
     },
+    {
+        "inputs": [
+            {"name": "_owners", "type": "address[]"},
+            {"name": "_ids", "type": "uint256[]"},
+        ],
+        "name": "balanceOfBatch",
+        "outputs": [{"name": "", "type": "uint256[]"}],
+        "type": "function",
+    },
     {
         "inputs": [
             {"name": "collateralToken", "type": "address"},
@@ -122,4 +133,99 @@ CTF_ABI = [
         "outputs": [],
         "type": "function",
     },
+    {
+        "inputs": [
+            {"name": "collateralToken", "type": "address"},
+            {"name": "parentCollectionId", "type": "bytes32"},
+            {"name": "conditionId", "type": "bytes32"},
+            {"name": "indexSets", "type": "uint256[]"},
+        ],
+        "name": "redeemPositions",
+        "outputs": [],
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [{"name": "", "type": "bytes32"}],
+        "name": "payoutDenominator",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function",
+    },
+    {
+        "constant": True,
+        "inputs": [
+            {"name": "", "type": "bytes32"},
+            {"name": "", "type": "uint256"},
+        ],
+        "name": "payoutNumerators",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "type": "function",
+    },
+]
+
+NEG_RISK_ADAPTER_ABI = [
+    {
+        "inputs": [
+            {"name": "_conditionId", "type": "bytes32"},
+            {"name": "_amount", "type": "uint256"},
+        ],
+        "name": "mergePositions",
+        "outputs": [],
+        "type": "function",
+    },
+    {
+        "inputs": [
+            {"name": "_conditionId", "type": "bytes32"},
+            {"name": "_amounts", "type": "uint256[]"},
+        ],
+        "name": "redeemPositions",
+        "outputs": [],
+        "type": "function",
+    },
+]
+
+MULTISEND_ABI = [
+    {
+        "inputs": [{"name": "transactions", "type": "bytes"}],
+        "name": "multiSend",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+]
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+                "name": "calls",
+                "type": "tuple[]",
+            },
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+                "name": "returnData",
+                "type": "tuple[]",
+            },
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+    {
+        "inputs": [{"name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function",
+    },
 ]
@@ -1,194 +1,196 @@
-"""Database connection pool and schema management using asyncpg."""
+"""Database connection pools and schema management using asyncpg.
 
-import os
-from contextlib import asynccontextmanager
+Three named pools keep traffic classes from starving each other:
 
-import asyncpg
+  request     API route handlers (the default)
+  background  crons and reconcilers — rebalance, freemonies, order reconciler,
+              log maintenance, and migrations
+  logging     the buffered agent_logs writer
 
+Code picks a pool by name with get_pool("background"). More commonly a
+background loop calls bind_pool("background") once at startup, and every
+get_pool() inside that task (and the tasks it spawns) resolves to it. Shared
+helpers like AgentStore therefore need no pool parameter.
 
-_pool: asyncpg.Pool | None = None
-
-
-SCHEMA_SQL = """
--- Users (Google OAuth accounts)
-CREATE TABLE IF NOT EXISTS users (
-    user_id TEXT PRIMARY KEY,
-    email TEXT UNIQUE NOT NULL,
-    name TEXT DEFAULT '',
-    avatar_url TEXT DEFAULT '',
-    google_sub TEXT UNIQUE,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Registered agents
-CREATE TABLE IF NOT EXISTS agents (
-    agent_id TEXT PRIMARY KEY,
-    wallet_address TEXT NOT NULL,
-    api_key_hash TEXT UNIQUE NOT NULL,
-    wallet_index INTEGER DEFAULT 0,
-    polygon_safe TEXT DEFAULT '',
-    solana_wallet TEXT DEFAULT '',
-    scopes TEXT[] DEFAULT ARRAY['trade','balance','markets'],
-    owner_id TEXT REFERENCES users(user_id),
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Device codes (agent claim flow)
-CREATE TABLE IF NOT EXISTS device_codes (
-    device_code TEXT PRIMARY KEY,
-    user_code TEXT UNIQUE NOT NULL,
-    agent_id TEXT REFERENCES agents(agent_id),
-    status TEXT DEFAULT 'pending',
-    user_id TEXT REFERENCES users(user_id),
-    expires_at TIMESTAMPTZ NOT NULL,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Trade executions
-CREATE TABLE IF NOT EXISTS trades (
-    trade_id TEXT PRIMARY KEY,
-    agent_id TEXT REFERENCES agents(agent_id),
-    market_id TEXT NOT NULL,
-    question TEXT,
-    side TEXT NOT NULL,
-    amount_usd DOUBLE PRECISION NOT NULL,
-    entry_price DOUBLE PRECISION,
-    split_tx TEXT,
-    clob_order_id TEXT,
-    clob_filled BOOLEAN DEFAULT FALSE,
-    status TEXT DEFAULT 'executed',
-    error TEXT,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Open positions
-CREATE TABLE IF NOT EXISTS positions (
-    position_id TEXT PRIMARY KEY,
-    agent_id TEXT REFERENCES agents(agent_id),
-    market_id TEXT NOT NULL,
-    question TEXT,
-    position TEXT NOT NULL,
-    token_id TEXT,
-    entry_amount DOUBLE PRECISION,
-    entry_price DOUBLE PRECISION,
-    split_tx TEXT,
-    clob_order_id TEXT,
-    clob_filled BOOLEAN DEFAULT FALSE,
-    status TEXT DEFAULT 'open',
-    notes TEXT,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Agent API request logs (every route hit via API key)
-CREATE TABLE IF NOT EXISTS agent_logs (
-    log_id TEXT PRIMARY KEY,
-    agent_id TEXT REFERENCES agents(agent_id),
-    method TEXT NOT NULL,
-    path TEXT NOT NULL,
-    status_code INTEGER,
-    duration_ms INTEGER,
-    ip_address TEXT,
-    body_snippet TEXT,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
--- Indexes
-CREATE INDEX IF NOT EXISTS idx_agents_api_key_hash ON agents(api_key_hash);
-CREATE INDEX IF NOT EXISTS idx_agents_wallet ON agents(wallet_address);
-CREATE INDEX IF NOT EXISTS idx_agents_owner ON agents(owner_id);
-CREATE INDEX IF NOT EXISTS idx_trades_agent ON trades(agent_id);
-CREATE INDEX IF NOT EXISTS idx_trades_market ON trades(market_id);
-CREATE INDEX IF NOT EXISTS idx_positions_agent ON positions(agent_id);
-CREATE INDEX IF NOT EXISTS idx_positions_market ON positions(market_id);
-CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
-CREATE INDEX IF NOT EXISTS idx_agent_logs_agent ON agent_logs(agent_id);
-CREATE INDEX IF NOT EXISTS idx_agent_logs_created ON agent_logs(created_at DESC);
-CREATE INDEX IF NOT EXISTS idx_device_codes_user_code ON device_codes(user_code);
-CREATE INDEX IF NOT EXISTS idx_device_codes_agent ON device_codes(agent_id);
-
--- agent feature flags (idempotent migration)
-ALTER TABLE agents ADD COLUMN IF NOT EXISTS auto_rebalance BOOLEAN DEFAULT FALSE;
-ALTER TABLE agents ADD COLUMN IF NOT EXISTS auto_freemonies BOOLEAN DEFAULT FALSE;
-ALTER TABLE agents ADD COLUMN IF NOT EXISTS freemonies_max_markets INTEGER DEFAULT 2;
-ALTER TABLE agents ADD COLUMN IF NOT EXISTS freemonies_amount_per_market FLOAT DEFAULT 2.0;
-DO $$ BEGIN
-  IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='agents' AND column_name='solana_vault') THEN
-    ALTER TABLE agents RENAME COLUMN solana_vault TO solana_wallet;
-  END IF;
-END $$;
-
-CREATE TABLE IF NOT EXISTS vault_positions (
-    position_id TEXT PRIMARY KEY,
-    agent_id TEXT REFERENCES agents(agent_id),
-    protocol TEXT NOT NULL,
-    protocol_name TEXT NOT NULL,
-    pool_id TEXT NOT NULL,
-    amount_usdc FLOAT NOT NULL,
-    shares_held TEXT NOT NULL DEFAULT '0',
-    apy_at_entry FLOAT NOT NULL,
-    status TEXT DEFAULT 'active',
-    deposited_at TIMESTAMPTZ DEFAULT NOW(),
-    withdrawn_at TIMESTAMPTZ,
-    deposit_tx TEXT,
-    withdraw_tx TEXT
-);
-
-CREATE TABLE IF NOT EXISTS vault_logs (
-    log_id TEXT PRIMARY KEY,
-    agent_id TEXT REFERENCES agents(agent_id),
-    action TEXT NOT NULL,
-    from_protocol TEXT,
-    from_pool_id TEXT,
-    to_protocol TEXT,
-    to_pool_id TEXT,
-    amount_usdc FLOAT,
-    apy FLOAT,
-    shares TEXT,
-    tx_hash TEXT,
-    reason TEXT,
-    error TEXT,
-    created_at TIMESTAMPTZ DEFAULT NOW()
-);
-
-CREATE INDEX IF NOT EXISTS idx_vault_positions_agent ON vault_positions(agent_id);
-CREATE INDEX IF NOT EXISTS idx_vault_positions_status ON vault_positions(status);
-CREATE INDEX IF NOT EXISTS idx_vault_logs_agent ON vault_logs(agent_id);
-CREATE INDEX IF NOT EXISTS idx_vault_logs_created ON vault_logs(created_at DESC);
+Each pool is sized from the environment (DB_POOL_<NAME>_MIN / _MAX /
+_TIMEOUT / _ACQUIRE_TIMEOUT) and records acquire wait times and
+utilization. pool_metrics() feeds GET /health/db.
 """
 
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
 
-async def init_db() -> asyncpg.Pool:
-    """Create connection pool and run schema migration."""
-    global _pool
+import asyncpg
 
+from lib.migrate import migrate
+
+
+@dataclass
+class PoolConfig:
+    """Sizing and timeouts for one named pool."""
+
+    name: str
+    min_size: int
+    max_size: int
+    command_timeout: float    # per-statement timeout (seconds)
+    acquire_timeout: float    # max wait for a free connection (seconds, 0 = wait forever)
+
+    @classmethod
+    def from_env(cls, name: str, min_size: int, max_size: int, command_timeout: float, acquire_timeout: float) -> "PoolConfig":
+        prefix = f"DB_POOL_{name.upper()}_"
+        return cls(
+            name=name,
+            min_size=int(os.environ.get(prefix + "MIN", min_size)),
+            max_size=int(os.environ.get(prefix + "MAX", max_size)),
+            command_timeout=float(os.environ.get(prefix + "TIMEOUT", command_timeout)),
+            acquire_timeout=float(os.environ.get(prefix + "ACQUIRE_TIMEOUT", acquire_timeout)),
+        )
+
+
+POOL_CONFIGS = {
+    "request": PoolConfig.from_env("request", min_size=2, max_size=10, command_timeout=30, acquire_timeout=10),
+    "background": PoolConfig.from_env("background", min_size=1, max_size=5, command_timeout=120, acquire_timeout=0),
+    "logging": PoolConfig.from_env("logging", min_size=1, max_size=2, command_timeout=30, acquire_timeout=0),
+}
+
+# Acquire waits kept per pool for the wait-time percentiles
+_WAIT_SAMPLES = 1000
+
+
+class InstrumentedPool:
+    """asyncpg.Pool wrapper that times every connection acquire.
+
+    Exposes the subset of the Pool API the codebase uses (acquire, execute,
+    executemany, fetch, fetchrow, fetchval, close). Every call waits for a
+    connection through acquire(), so wait times cover all traffic.
+    """
+
+    def __init__(self, config: PoolConfig, pool: asyncpg.Pool):
+        self.config = config
+        self._pool = pool
+        self._waits_ms: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.acquires = 0
+        self.timeouts = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def acquire(self, timeout: float = None):
+        timeout = timeout if timeout is not None else (self.config.acquire_timeout or None)
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            conn = await self._pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.acquires += 1
+        self._waits_ms.append((time.perf_counter() - start) * 1000)
+        try:
+            yield conn
+        finally:
+            await self._pool.release(conn)
+
+    async def execute(self, query: str, *args, timeout: float = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: float = None) -> None:
+        async with self.acquire() as conn:
+            return await conn.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: float = None) -> list:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: float = None):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: float = None):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    def metrics(self) -> dict:
+        size = self._pool.get_size()
+        in_use = size - self._pool.get_idle_size()
+        waits = sorted(self._waits_ms)
+        return {
+            "size": size,
+            "in_use": in_use,
+            "max_size": self.config.max_size,
+            "utilization": round(in_use / self.config.max_size, 3) if self.config.max_size else None,
+            "waiting": self.waiting,
+            "acquires": self.acquires,
+            "acquire_timeouts": self.timeouts,
+            "wait_ms_p50": round(waits[len(waits) // 2], 2) if waits else None,
+            "wait_ms_p99": round(waits[int(len(waits) * 0.99) - 1], 2) if waits else None,
+            "wait_ms_max": round(waits[-1], 2) if waits else None,
+        }
+
+
+_pools: dict[str, InstrumentedPool] = {}
+
+# Pool get_pool() returns when no name is given — set per task by bind_pool()
+_current_pool: ContextVar[str] = ContextVar("db_pool", default="request")
+
+
+async def init_db() -> dict[str, InstrumentedPool]:
+    """Create the named pools and apply pending schema migrations (lib/migrate.py)."""
     database_url = os.environ.get("DATABASE_URL", "")
     if not database_url:
         raise ValueError("DATABASE_URL environment variable is required")
 
-    _pool = await asyncpg.create_pool(
-        database_url,
-        min_size=2,
-        max_size=10,
-        command_timeout=30,
-    )
+    for name, config in POOL_CONFIGS.items():
+        pool = await asyncpg.create_pool(
+            database_url,
+            min_size=config.min_size,
+            max_size=config.max_size,
+            command_timeout=config.command_timeout,
+        )
+        _pools[name] = InstrumentedPool(config, pool)
 
-    # Run schema migration
-    async with _pool.acquire() as conn:
-        await conn.execute(SCHEMA_SQL)
+    # One SELECT when the schema is current; otherwise migrate under an advisory lock
+    async with _pools["background"].acquire() as conn:
+        applied = await migrate(conn)
+    if applied:
+        print(f"[DB] Applied migrations: {', '.join(applied)}")
 
-    return _pool
+    return _pools
 
 
 async def close_db() -> None:
-    """Close the connection pool."""
-    global _pool
-    if _pool:
-        await _pool.close()
-        _pool = None
+    """Close all connection pools."""
+    for pool in _pools.values():
+        await pool.close()
+    _pools.clear()
+
+
+def bind_pool(name: str) -> None:
+    """Make `name` the default pool for the current task and tasks it spawns."""
+    if name not in POOL_CONFIGS:
+        raise ValueError(f"Unknown pool: {name}")
+    _current_pool.set(name)
 
 
-def get_pool() -> asyncpg.Pool:
-    """Get the active connection pool. Raises if not initialized."""
-    if _pool is None:
+def get_pool(name: Optional[str] = None) -> InstrumentedPool:
+    """Get a named pool (default: the one bound to this task, else "request"). Raises if not initialized."""
+    pool = _pools.get(name or _current_pool.get())
+    if pool is None:
         raise RuntimeError("Database not initialized. Call init_db() first.")
-    return _pool
+    return pool
+
+
+def pool_metrics() -> dict:
+    """Per-pool utilization and acquire wait times for /health/db."""
+    return {name: pool.metrics() for name, pool in _pools.items()}
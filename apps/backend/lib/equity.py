@@ -0,0 +1,269 @@
+"""
+Per-agent equity history: snapshots plus 1m → 1h → 1d downsampling.
+
+Every EQUITY_SNAPSHOT_SECONDS the snapshotter writes one row per agent into
+agent_equity_1m. Each row holds the agent's three balances:
+  - safe_usdc      USDC.e held by the Polymarket Safe on Polygon
+  - vault_usdc     live value of active Base yield-vault positions
+  - positions_usd  marked value of open Polymarket positions, read from the
+                   in-memory P&L engine
+pnl_usd is stored alongside them.
+
+Safe balances come from lib/balances.py: snapshots the balance watcher
+keeps current are served from memory, and the rest are read in one
+Multicall3 batch per cycle.
+
+Vault reads need several Base RPC calls per position, so vault values are
+cached and refreshed every EQUITY_VAULT_REFRESH_SECONDS. Between refreshes,
+agents whose vault positions changed fall back to their recorded USDC
+amount.
+
+Downsampling keeps the last sample of each bucket, because equity is a
+level. Every cycle rewrites the current and the previous hour/day, so the
+coarse tiers follow the fine tier while a bucket is still filling:
+  agent_equity_1m  → kept EQUITY_1M_RETENTION_HOURS
+  agent_equity_1h  → kept EQUITY_1H_RETENTION_DAYS
+  agent_equity_1d  → kept forever
+
+fetch_equity() serves a range from one tier only. With resolution="auto"
+it picks the finest tier that still covers the range start without
+exceeding EQUITY_MAX_POINTS points.
+
+Env vars:
+  EQUITY_SNAPSHOT_SECONDS        Snapshot interval (default: 60)
+  EQUITY_VAULT_REFRESH_SECONDS   Live vault revaluation interval (default: 900)
+  EQUITY_RPC_CONCURRENCY         Parallel vault value reads (default: 8)
+  EQUITY_1M_RETENTION_HOURS      Minute tier retention (default: 48)
+  EQUITY_1H_RETENTION_DAYS       Hour tier retention (default: 90)
+  EQUITY_MAX_POINTS              Max points for resolution=auto (default: 1500)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+
+from lib.balances import POLYGON, balances
+from lib.contracts import derive_polymarket_safe
+from lib.database import bind_pool, get_pool
+from lib.pnl_engine import pnl_engine
+
+log = logging.getLogger("equity")
+
+SNAPSHOT_INTERVAL = int(os.environ.get("EQUITY_SNAPSHOT_SECONDS", "60"))
+VAULT_REFRESH = int(os.environ.get("EQUITY_VAULT_REFRESH_SECONDS", "900"))
+RPC_CONCURRENCY = int(os.environ.get("EQUITY_RPC_CONCURRENCY", "8"))
+RETENTION_1M_HOURS = int(os.environ.get("EQUITY_1M_RETENTION_HOURS", "48"))
+RETENTION_1H_DAYS = int(os.environ.get("EQUITY_1H_RETENTION_DAYS", "90"))
+MAX_POINTS = int(os.environ.get("EQUITY_MAX_POINTS", "1500"))
+
+# resolution → (table, bucket width, retention; None = forever)
+TIERS = {
+    "1m": ("agent_equity_1m", timedelta(minutes=1), timedelta(hours=RETENTION_1M_HOURS)),
+    "1h": ("agent_equity_1h", timedelta(hours=1), timedelta(days=RETENTION_1H_DAYS)),
+    "1d": ("agent_equity_1d", timedelta(days=1), None),
+}
+
+_COLUMNS = ("safe_usdc", "vault_usdc", "positions_usd", "pnl_usd")
+
+
+# ── Inputs ────────────────────────────────────────────────────────────────────
+
+
+async def _safe_balances(safes: dict[str, str]) -> dict[str, Optional[float]]:
+    """agent_id → Safe USDC.e (None when unreadable or no Polygon RPC is configured)."""
+    got = await balances.get_many([(POLYGON, safe) for safe in safes.values()])
+    out = {}
+    for agent_id, safe in safes.items():
+        b = got[(POLYGON, safe)]
+        out[agent_id] = b.usdc if b.ok else None
+    return out
+
+
+class VaultValues:
+    """Live vault value per agent, revalued on chain at most every VAULT_REFRESH seconds."""
+
+    def __init__(self):
+        self._values: dict[str, float] = {}
+        self._positions: dict[str, frozenset] = {}
+        self._refreshed_at = 0.0
+
+    async def get(self) -> dict[str, float]:
+        rows = await get_pool().fetch(
+            "SELECT position_id, agent_id, protocol, pool_id, amount_usdc, shares_held "
+            "FROM vault_positions WHERE status = 'active'"
+        )
+        by_agent: dict[str, list[dict]] = {}
+        for r in rows:
+            by_agent.setdefault(r["agent_id"], []).append(dict(r))
+
+        if time.monotonic() - self._refreshed_at >= VAULT_REFRESH:
+            from lib.rebalance import get_position_current_value
+
+            sem = asyncio.Semaphore(RPC_CONCURRENCY)
+
+            async def value(p: dict) -> float:
+                async with sem:
+                    return await get_position_current_value(p)
+
+            positions = [p for ps in by_agent.values() for p in ps]
+            live = await asyncio.gather(*[value(p) for p in positions])
+            live_by_id = {p["position_id"]: v for p, v in zip(positions, live)}
+            self._values = {a: sum(live_by_id[p["position_id"]] for p in ps) for a, ps in by_agent.items()}
+            self._positions = {a: frozenset(p["position_id"] for p in ps) for a, ps in by_agent.items()}
+            self._refreshed_at = time.monotonic()
+
+        out = {}
+        for agent_id, ps in by_agent.items():
+            if self._positions.get(agent_id) == frozenset(p["position_id"] for p in ps):
+                out[agent_id] = self._values[agent_id]
+            else:
+                out[agent_id] = sum(float(p["amount_usdc"]) for p in ps)
+        return out
+
+
+vault_values = VaultValues()
+
+
+# ── Snapshot + downsampling ───────────────────────────────────────────────────
+
+
+async def snapshot_equity() -> int:
+    """Write one agent_equity_1m row per agent for the current minute. Returns rows written."""
+    pool = get_pool()
+    agents = await pool.fetch("SELECT agent_id, wallet_address, polygon_safe FROM agents")
+    if not agents:
+        return 0
+    safes = {a["agent_id"]: a["polygon_safe"] or derive_polymarket_safe(a["wallet_address"]) for a in agents}
+    safe_usdc, vaults = await asyncio.gather(_safe_balances(safes), vault_values.get())
+
+    ts = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    rows = [
+        (
+            agent_id,
+            ts,
+            safe_usdc.get(agent_id),
+            vaults.get(agent_id, 0.0),
+            pnl_engine.open_value(agent_id),
+            pnl_engine.agent_totals(agent_id)["total_pnl_usd"],
+        )
+        for agent_id in safes
+    ]
+    await pool.executemany(
+        """INSERT INTO agent_equity_1m (agent_id, ts, safe_usdc, vault_usdc, positions_usd, pnl_usd)
+           VALUES ($1, $2, $3, $4, $5, $6)
+           ON CONFLICT (agent_id, ts) DO UPDATE SET
+               safe_usdc = EXCLUDED.safe_usdc,
+               vault_usdc = EXCLUDED.vault_usdc,
+               positions_usd = EXCLUDED.positions_usd,
+               pnl_usd = EXCLUDED.pnl_usd""",
+        rows,
+    )
+    return len(rows)
+
+
+async def _downsample(source: str, target: str, unit: str) -> int:
+    """Copy the last `source` sample of the current and previous `unit` into `target`."""
+    cols = ", ".join(_COLUMNS)
+    result = await get_pool().execute(
+        f"""INSERT INTO {target} (agent_id, ts, {cols})
+            SELECT DISTINCT ON (agent_id, date_trunc('{unit}', ts))
+                   agent_id, date_trunc('{unit}', ts), {cols}
+            FROM {source}
+            WHERE ts >= date_trunc('{unit}', NOW()) - interval '1 {unit}'
+            ORDER BY agent_id, date_trunc('{unit}', ts), ts DESC
+            ON CONFLICT (agent_id, ts) DO UPDATE SET
+                {", ".join(f"{c} = EXCLUDED.{c}" for c in _COLUMNS)}""",
+    )
+    return int(result.split()[-1])
+
+
+async def downsample_equity() -> None:
+    """Roll 1m into 1h and 1h into 1d, then prune the tiers past their retention."""
+    await _downsample("agent_equity_1m", "agent_equity_1h", "hour")
+    await _downsample("agent_equity_1h", "agent_equity_1d", "day")
+    pool = get_pool()
+    for table, _, retention in TIERS.values():
+        if retention is not None:
+            await pool.execute(f"DELETE FROM {table} WHERE ts < $1", datetime.now(timezone.utc) - retention)
+
+
+async def start_equity_snapshotter() -> None:
+    """Background loop. Waits for the P&L engine's first build so position values are real."""
+    bind_pool("background")
+    while not pnl_engine.ready:
+        await asyncio.sleep(5)
+    log.info(f"[equity] snapshotter started — interval: {SNAPSHOT_INTERVAL}s")
+    while True:
+        try:
+            await snapshot_equity()
+            await downsample_equity()
+        except Exception as e:
+            log.error(f"[equity] snapshot error: {e}")
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """Finest tier that still holds `start` and fits the range in MAX_POINTS."""
+    now = datetime.now(timezone.utc)
+    for name, (_, step, retention) in TIERS.items():
+        if retention is not None and start < now - retention:
+            continue
+        if (end - start) / step <= MAX_POINTS:
+            return name
+    return "1d"
+
+
+async def fetch_equity(agent_ids: list[str], start: datetime, end: datetime, resolution: str = "auto") -> dict:
+    """Equity series summed over `agent_ids`, read from a single tier."""
+    if resolution == "auto":
+        resolution = pick_resolution(start, end)
+    table = TIERS[resolution][0]
+    rows = await get_pool().fetch(
+        f"""SELECT ts,
+                   SUM(safe_usdc) AS safe_usdc,
+                   SUM(vault_usdc) AS vault_usdc,
+                   SUM(positions_usd) AS positions_usd,
+                   SUM(pnl_usd) AS pnl_usd
+            FROM {table}
+            WHERE agent_id = ANY($1) AND ts >= $2 AND ts <= $3
+            GROUP BY ts
+            ORDER BY ts""",
+        agent_ids, start, end,
+    )
+    return {
+        "resolution": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "series": [
+            {
+                "t": r["ts"].isoformat(),
+                "safeUsdc": round(r["safe_usdc"], 2) if r["safe_usdc"] is not None else None,
+                "vaultUsdc": round(r["vault_usdc"], 2),
+                "positionsUsd": round(r["positions_usd"], 2),
+                "equityUsd": round((r["safe_usdc"] or 0) + r["vault_usdc"] + r["positions_usd"], 2),
+                "pnlUsd": round(r["pnl_usd"], 2),
+            }
+            for r in rows
+        ],
+    }
+
+
+def equity_range(start: Optional[datetime], end: Optional[datetime]) -> tuple[datetime, datetime]:
+    """Default to the last 24h; naive datetimes are taken as UTC. Raises 400 on an empty range."""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
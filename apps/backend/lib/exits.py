@@ -0,0 +1,303 @@
+"""
+Position exits — turn open positions back into USDC.e.
+
+Used by POST /positions/{id}/exit and POST /positions/exit (routes/trade.py).
+Each position takes the cheapest route out:
+
+  - merge: the Safe also holds the opposite outcome token and no other
+    position claims it, typically because the CLOB sell of a split failed.
+    mergePositions turns every YES+NO pair back into $1 of USDC.e for gas
+    only (on the CTF for standard markets, the NegRiskAdapter for neg-risk
+    ones). All merges of a request go out in one Safe transaction, packed
+    into a MultiSend when there are several (see lib/redemption.py)
+  - sell: otherwise the tokens are FOK-sold on the CLOB. ClobClientWrapper
+    .sell_many walks the order book for each leg and refuses legs that would
+    fill more than max_slippage below the Gamma price. The remaining legs
+    are submitted together in one batch
+
+Sizes come from the chain, not the database. One balanceOfBatch multicall
+reads both outcome tokens of every market involved
+(lib/position_reconciler.py). A balance shared by several of the agent's
+positions is split pro rata, as the reconciler does.
+
+Positions are claimed (status 'closing') before anything is sent. Two
+concurrent exits therefore cannot sell the same tokens, and the
+reconciler and resolution watcher skip them. A successful exit stores
+status 'closed', shares, payout_usd (USDC.e received) and close_tx (the
+merge tx hash or CLOB order id). Realized P&L is payout_usd minus the net
+cost of the shares exited (lib.pnl.cost_basis).
+A failed exit goes back to 'open'. So does a claim whose request never
+finished: the reconciler reopens it once closing_at is older than
+POSITION_CLOSING_TIMEOUT_SECONDS.
+
+Env vars:
+  EXIT_MAX_POSITIONS  Positions per batch exit request (default: 50)
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from web3 import Web3
+
+from lib.clob_client import ClobClientWrapper
+from lib.contracts import CONTRACTS, CTF_ABI, NEG_RISK_ADAPTER_ABI
+from lib.database import get_pool
+from lib.gamma_client import GammaClient, Market
+from lib.pnl import cost_basis
+from lib.pnl_engine import pnl_engine
+from lib.position_reconciler import CTF_DECIMALS, allocate_shares, read_ctf_balances
+from lib.redemption import encode_multisend
+from lib.wallet_manager import WalletManager
+
+log = logging.getLogger("exits")
+
+EXIT_MAX_POSITIONS = int(os.environ.get("EXIT_MAX_POSITIONS", "50"))
+
+# execTransaction gas: fixed overhead plus one mergePositions per position
+_GAS_BASE = 100_000
+_GAS_PER_MERGE = 150_000
+
+NOT_OPEN = "Position not found or not open"
+
+_POSITION_COLUMNS = "position_id, market_id, token_id, entry_amount, entry_price, shares"
+
+
+@dataclass
+class ExitPlan:
+    """How one claimed position leaves the book."""
+
+    position_id: str
+    route: str                                   # "merge" or "sell"
+    token_id: str
+    shares: float
+    price: float                                 # Gamma reference price for sells, 1.0 for merges
+    call: Optional[tuple[str, bytes]] = None     # (target, calldata) for merges
+
+
+@dataclass
+class ExitResult:
+    position_id: str
+    status: str                                  # "closed" or "failed"
+    route: Optional[str] = None
+    shares: float = 0.0
+    payout_usd: Optional[float] = None
+    pnl_usd: Optional[float] = None
+    close_tx: Optional[str] = None
+    error: Optional[str] = None
+
+
+# ── Chain ─────────────────────────────────────────────────────────────────────
+
+
+def merge_call(market: Market, amount_raw: int) -> tuple[str, bytes]:
+    """(target, calldata) merging `amount_raw` YES+NO pairs of one market back into USDC.e."""
+    cond = bytes.fromhex(market.condition_id.removeprefix("0x"))
+    if market.neg_risk:
+        adapter = Web3().eth.contract(
+            address=Web3.to_checksum_address(CONTRACTS["NEG_RISK_ADAPTER"]), abi=NEG_RISK_ADAPTER_ABI
+        )
+        data = adapter.encode_abi("mergePositions", args=[cond, amount_raw])
+        return CONTRACTS["NEG_RISK_ADAPTER"], bytes.fromhex(data[2:])
+    ctf = Web3().eth.contract(address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI)
+    data = ctf.encode_abi(
+        "mergePositions",
+        args=[Web3.to_checksum_address(CONTRACTS["USDC_E"]), bytes(32), cond, [1, 2], amount_raw],
+    )
+    return CONTRACTS["CTF"], bytes.fromhex(data[2:])
+
+
+def execute_merges(wallet: WalletManager, safe: str, calls: list[tuple[str, bytes]]) -> str:
+    """Send one Safe transaction for all merge `calls` (MultiSend when more than one). Returns tx hash."""
+    gas = _GAS_BASE + _GAS_PER_MERGE * len(calls)
+    if len(calls) == 1:
+        target, data = calls[0]
+        return wallet.safe_exec(safe, target, data, gas=gas)
+    return wallet.safe_exec(
+        safe, CONTRACTS["MULTISEND_CALL_ONLY"], encode_multisend(calls), gas=gas, operation=1
+    )
+
+
+# ── Planning ──────────────────────────────────────────────────────────────────
+
+
+def plan_exits(
+    rows: list[dict],
+    holders: list[dict],
+    markets: dict[str, Market],
+    balances: dict[tuple[str, str], int],
+    safe: str,
+) -> tuple[list[ExitPlan], list[ExitResult]]:
+    """Route every claimed position to a merge or a CLOB sell.
+
+    rows are the claimed positions; holders are all of the agent's positions
+    in the same markets that hold (or are about to hold) tokens, claimed
+    ones included. An opposite-leg balance only counts as mergeable when no
+    holder claims that token.
+    """
+    by_token: dict[str, list[dict]] = defaultdict(list)
+    for h in holders:
+        by_token[h["token_id"]].append(h)
+    held: dict[str, int] = {}
+    for token_id, token_rows in by_token.items():
+        raw = balances.get((safe, token_id))
+        if raw is not None:
+            for r, shares in zip(token_rows, allocate_shares(token_rows, raw)):
+                held[r["position_id"]] = int(shares * CTF_DECIMALS)
+
+    spare: dict[str, int] = {}
+    plans: list[ExitPlan] = []
+    failed: list[ExitResult] = []
+    for r in rows:
+        pid = r["position_id"]
+        market = markets.get(r["market_id"])
+        if market is None or r["token_id"] not in (market.yes_token_id, market.no_token_id):
+            failed.append(ExitResult(pid, "failed", error=f"Market not found: {r['market_id']}"))
+            continue
+        units = held.get(pid)
+        if units is None:
+            failed.append(ExitResult(pid, "failed", error="Could not read on-chain balance"))
+            continue
+        if units == 0:
+            failed.append(ExitResult(pid, "failed", error="No tokens held on chain"))
+            continue
+
+        is_yes = r["token_id"] == market.yes_token_id
+        other = market.no_token_id if is_yes else market.yes_token_id
+        if other and other not in spare:
+            spare[other] = 0 if by_token.get(other) else balances.get((safe, other), 0)
+        if other and spare[other] >= units:
+            spare[other] -= units
+            plans.append(ExitPlan(pid, "merge", r["token_id"], units / CTF_DECIMALS, 1.0, merge_call(market, units)))
+        elif market.closed or market.resolved:
+            failed.append(ExitResult(pid, "failed", error="Market is closed — position is redeemed once it resolves"))
+        else:
+            price = market.yes_price if is_yes else market.no_price
+            plans.append(ExitPlan(pid, "sell", r["token_id"], units / CTF_DECIMALS, price))
+    return plans, failed
+
+
+# ── Execution ─────────────────────────────────────────────────────────────────
+
+
+async def _run_exits(
+    wallet: WalletManager, safe: str, agent_id: str, rows: list[dict], max_slippage: Optional[float]
+) -> list[ExitResult]:
+    pool = get_pool()
+    market_ids = list({r["market_id"] for r in rows})
+    claimed_ids = [r["position_id"] for r in rows]
+    holders, markets = await asyncio.gather(
+        pool.fetch(
+            f"""
+            SELECT {_POSITION_COLUMNS} FROM positions
+            WHERE agent_id = $1 AND market_id = ANY($2) AND token_id IS NOT NULL
+              AND (position_id = ANY($3)
+                   OR (status IN ('open', 'closing') AND (split_tx IS NOT NULL OR clob_filled)))
+            """,
+            agent_id, market_ids, claimed_ids,
+        ),
+        GammaClient().get_markets(market_ids),
+    )
+    markets = {m.id: m for m in markets}
+
+    loop = asyncio.get_running_loop()
+    w3 = Web3(Web3.HTTPProvider(wallet.rpc_url, request_kwargs={"timeout": 30}))
+    pairs = sorted({(safe, t) for m in markets.values() for t in (m.yes_token_id, m.no_token_id) if t})
+    balances = await loop.run_in_executor(None, read_ctf_balances, w3, pairs)
+
+    plans, results = plan_exits(rows, [dict(h) for h in holders], markets, balances, safe)
+    merges = [p for p in plans if p.route == "merge"]
+    sells = [p for p in plans if p.route == "sell"]
+
+    async def _merge() -> list[ExitResult]:
+        if not merges:
+            return []
+        try:
+            tx = await loop.run_in_executor(None, execute_merges, wallet, safe, [p.call for p in merges])
+        except Exception as e:
+            log.error(f"[exit] {safe}: {len(merges)} merge(s) failed: {e}")
+            return [ExitResult(p.position_id, "failed", "merge", error=f"Merge failed: {e}") for p in merges]
+        return [ExitResult(p.position_id, "closed", "merge", p.shares, round(p.shares, 6), close_tx=tx) for p in merges]
+
+    async def _sell() -> list[ExitResult]:
+        if not sells:
+            return []
+        clob = ClobClientWrapper(wallet.get_unlocked_key(), wallet.address, safe_address=safe)
+        try:
+            outcomes = await clob.sell_many([(p.token_id, p.shares, p.price) for p in sells], max_slippage)
+        except Exception as e:
+            return [ExitResult(p.position_id, "failed", "sell", error=f"CLOB sell failed: {e}") for p in sells]
+        out = []
+        for p, (order_id, filled, error, fill) in zip(sells, outcomes):
+            if not filled:
+                out.append(ExitResult(p.position_id, "failed", "sell", error=error))
+                continue
+            size = fill.realized_size or p.shares
+            price = fill.realized_price if fill.realized_price is not None else fill.limit_price
+            out.append(ExitResult(p.position_id, "closed", "sell", size, round(size * price, 6), close_tx=order_id))
+        return out
+
+    for done in await asyncio.gather(_merge(), _sell()):
+        results += done
+    return results
+
+
+async def exit_positions(
+    wallet: WalletManager,
+    safe: str,
+    agent_id: str,
+    position_ids: list[str],
+    max_slippage: Optional[float] = None,
+) -> list[ExitResult]:
+    """Exit the agent's open positions `position_ids`; one result per id, in order."""
+    pool = get_pool()
+    rows = [
+        dict(r) for r in await pool.fetch(
+            f"""
+            UPDATE positions SET status = 'closing', closing_at = NOW()
+            WHERE agent_id = $1 AND position_id = ANY($2) AND status = 'open' AND token_id IS NOT NULL
+            RETURNING {_POSITION_COLUMNS}
+            """,
+            agent_id, position_ids,
+        )
+    ]
+    results = {pid: ExitResult(pid, "failed", error=NOT_OPEN) for pid in position_ids}
+    if not rows:
+        return list(results.values())
+
+    try:
+        done = await _run_exits(wallet, safe.lower(), agent_id, rows, max_slippage)
+    except Exception as e:
+        log.error(f"[exit] {agent_id}: exit of {len(rows)} position(s) failed: {e}")
+        done = [ExitResult(r["position_id"], "failed", error=str(e)) for r in rows]
+
+    by_id = {r["position_id"]: r for r in rows}
+    closed = [r for r in done if r.status == "closed"]
+    for r in closed:
+        r.pnl_usd = round(r.payout_usd - cost_basis({**by_id[r.position_id], "shares": r.shares}), 2)
+    if closed:
+        await pool.execute(
+            """
+            UPDATE positions p
+            SET status = 'closed', shares = u.shares, payout_usd = u.payout_usd,
+                close_tx = u.close_tx, closed_at = NOW()
+            FROM unnest($1::text[], $2::float8[], $3::float8[], $4::text[])
+                 AS u(position_id, shares, payout_usd, close_tx)
+            WHERE p.position_id = u.position_id AND p.status = 'closing'
+            """,
+            [r.position_id for r in closed], [r.shares for r in closed],
+            [r.payout_usd for r in closed], [r.close_tx for r in closed],
+        )
+    reopen = [r.position_id for r in done if r.status != "closed"]
+    if reopen:
+        await pool.execute(
+            "UPDATE positions SET status = 'open', closing_at = NULL WHERE position_id = ANY($1) AND status = 'closing'",
+            reopen,
+        )
+    await pnl_engine.reload_positions([r["position_id"] for r in rows])
+
+    results.update((r.position_id, r) for r in done)
+    return [results[pid] for pid in position_ids]
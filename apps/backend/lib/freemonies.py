@@ -32,7 +32,8 @@ from typing import Optional
 import httpx
 
 from lib.agent_store import Agent, AgentStore
-from lib.database import get_pool
+from lib.database import bind_pool, get_pool
+from lib.order_reconciler import track_order
 from lib.position_storage import PositionEntry, PositionStorage, TradeStorage
 from lib.tee_wallet import derive_solana_wallet, derive_wallet, is_tee_mode
 from lib.wallet_manager import WalletManager
@@ -362,6 +363,18 @@ async def run_freemonies_for_agent(agent: Agent) -> dict:
                 error=exec_result.error,
                 position_id=position_id,
             )
+            if exec_result.clob_order_id:
+                await track_order(
+                    order_id=exec_result.clob_order_id,
+                    agent_id=agent.agent_id,
+                    signer_address=wallet.address,
+                    token_id=exec_result.sold_token_id,
+                    side="SELL",
+                    price=exec_result.sell_limit_price or 0.0,
+                    size=exec_result.amount,
+                    order_type="FOK",
+                    position_id=position_id,
+                )
 
             trade_result["status"] = status
             trade_result["entry_price"] = exec_result.entry_price
@@ -416,6 +429,7 @@ async def start_freemonies_cron() -> None:
     """Background cron. Starts 90s after boot (offset from rebalance cron), then every N hours."""
     interval_secs = int(os.environ.get("FREEMONIES_INTERVAL_HOURS",
                                         os.environ.get("REBALANCE_INTERVAL_HOURS", "3"))) * 3600
+    bind_pool("background")
     await asyncio.sleep(90)  # offset from rebalance cron (starts at 60s)
     log.info(f"[freemonies cron] started — interval: {interval_secs // 3600}h")
     while True:
@@ -1,5 +1,6 @@
 """Polymarket Gamma API client for market browsing."""
 
+import asyncio
 import json
 from dataclasses import dataclass
 from typing import Optional
@@ -8,6 +9,8 @@ import httpx
 
 
 GAMMA_API_BASE = "https://gamma-api.polymarket.com"
+# Market ids per GET /markets?id=...&id=... request
+GAMMA_IDS_PER_REQUEST = 50
 
 
 @dataclass
@@ -30,6 +33,7 @@ class Market:
     closed: bool
     resolved: bool
     outcome: Optional[str]
+    neg_risk: bool = False
 
 
 @dataclass
@@ -105,6 +109,23 @@ class GammaClient:
             resp.raise_for_status()
             return self._parse_market(resp.json())
 
+    async def get_markets(self, market_ids: list[str]) -> list[Market]:
+        """Get many markets by ID (open or closed), GAMMA_IDS_PER_REQUEST per request, concurrently."""
+        ids = list(dict.fromkeys(market_ids))
+        chunks = [ids[i:i + GAMMA_IDS_PER_REQUEST] for i in range(0, len(ids), GAMMA_IDS_PER_REQUEST)]
+
+        async with httpx.AsyncClient(timeout=self.timeout) as http:
+            async def fetch(chunk: list[str]) -> list[dict]:
+                resp = await http.get(
+                    f"{GAMMA_API_BASE}/markets",
+                    params=[("id", market_id) for market_id in chunk] + [("limit", len(chunk))],
+                )
+                resp.raise_for_status()
+                return resp.json()
+
+            pages = await asyncio.gather(*[fetch(c) for c in chunks])
+        return [self._parse_market(m) for page in pages for m in page]
+
     async def get_market_by_slug(self, slug: str) -> Market:
         """Get market by slug."""
         async with httpx.AsyncClient(timeout=self.timeout) as http:
@@ -168,6 +189,7 @@ class GammaClient:
             closed=data.get("closed", False),
             resolved=data.get("resolved", False),
             outcome=data.get("outcome"),
+            neg_risk=bool(data.get("negRisk", False)),
         )
 
     def _parse_event(self, data: dict) -> MarketGroup:
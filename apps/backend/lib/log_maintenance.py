@@ -0,0 +1,241 @@
+"""
+agent_logs partition management and per-minute rollups.
+
+agent_logs is range-partitioned by created_at, one partition per UTC day
+(agent_logs_pYYYYMMDD). One background loop:
+
+  1. Creates the partitions for the next AGENT_LOG_PARTITIONS_AHEAD days.
+     Any rows that already landed in agent_logs_default for that day are
+     moved into the new partition before it is attached
+  2. Drops whole partitions older than AGENT_LOG_RETENTION_DAYS — no
+     DELETE, no vacuum debt
+  3. Rolls raw rows up into agent_log_rollups (requests, errors, latency
+     percentiles per agent per minute). The last few minutes are recomputed
+     every cycle, since buffered log rows arrive slightly late
+  4. Prunes rollups older than AGENT_LOG_ROLLUP_RETENTION_DAYS
+
+Partition DDL runs under a transaction-scoped advisory lock and re-checks
+the catalog inside it, so replicas booting together never create or drop
+the same partition twice.
+
+On first start after the switch to partitioning, rows still inside the
+retention window are copied from the old heap table (agent_logs_legacy)
+and the old table is dropped.
+
+Env vars:
+  AGENT_LOG_RETENTION_DAYS          Raw log partitions kept (default: 30)
+  AGENT_LOG_PARTITIONS_AHEAD        Daily partitions created in advance (default: 3)
+  AGENT_LOG_ROLLUP_RETENTION_DAYS   Rollup rows kept (default: 365)
+  AGENT_LOG_ROLLUP_INTERVAL_SECONDS Loop interval (default: 60)
+"""
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+
+from lib.database import bind_pool, get_pool
+
+log = logging.getLogger("log_maintenance")
+
+RETENTION_DAYS = int(os.environ.get("AGENT_LOG_RETENTION_DAYS", "30"))
+PARTITIONS_AHEAD = int(os.environ.get("AGENT_LOG_PARTITIONS_AHEAD", "3"))
+ROLLUP_RETENTION_DAYS = int(os.environ.get("AGENT_LOG_ROLLUP_RETENTION_DAYS", "365"))
+ROLLUP_INTERVAL = int(os.environ.get("AGENT_LOG_ROLLUP_INTERVAL_SECONDS", "60"))
+
+# Minutes re-aggregated each cycle to pick up rows flushed after their minute closed
+_ROLLUP_LATE_MINUTES = 5
+
+_PARTITION_PREFIX = "agent_logs_p"
+
+# Arbitrary app-wide key for pg_advisory_xact_lock around partition DDL
+_PARTITION_LOCK_KEY = 0x45504C47  # "EPLG"
+
+
+def _partition_name(day: date) -> str:
+    return f"{_PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+async def _existing_partitions(conn) -> set[str]:
+    rows = await conn.fetch(
+        """SELECT c.relname FROM pg_inherits i
+           JOIN pg_class c ON c.oid = i.inhrelid
+           JOIN pg_class p ON p.oid = i.inhparent
+           WHERE p.relname = 'agent_logs'"""
+    )
+    return {r["relname"] for r in rows}
+
+
+async def _create_partition(conn, day: date) -> bool:
+    """Create one day's partition, moving matching rows out of the default partition first.
+
+    A plain CREATE ... PARTITION OF fails if the default partition already
+    holds rows for that range, so the table is built standalone, filled from
+    the default partition, then attached — all in one transaction. Returns
+    False if another replica created it first.
+    """
+    name = _partition_name(day)
+    lo, hi = _day_start(day), _day_start(day + timedelta(days=1))
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", _PARTITION_LOCK_KEY)
+        # Re-check under the lock — another replica may have just created it
+        if name in await _existing_partitions(conn):
+            return False
+        await conn.execute(f"CREATE TABLE {name} (LIKE agent_logs INCLUDING DEFAULTS)")
+        moved = await conn.execute(
+            f"""WITH moved AS (
+                    DELETE FROM agent_logs_default
+                    WHERE created_at >= $1 AND created_at < $2
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved""",
+            lo, hi,
+        )
+        await conn.execute(
+            f"ALTER TABLE agent_logs ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+        )
+    n = int(moved.split()[-1])
+    log.info(f"[logs] created partition {name}" + (f" ({n} rows moved from default)" if n else ""))
+    return True
+
+
+async def ensure_partitions(first_day: date = None) -> int:
+    """Create missing daily partitions from `first_day` (default: today) through the look-ahead."""
+    today = datetime.now(timezone.utc).date()
+    first_day = first_day or today
+    pool = get_pool()
+    created = 0
+    async with pool.acquire() as conn:
+        existing = await _existing_partitions(conn)
+        day = first_day
+        while day <= today + timedelta(days=PARTITIONS_AHEAD):
+            if _partition_name(day) not in existing and await _create_partition(conn, day):
+                created += 1
+            day += timedelta(days=1)
+    return created
+
+
+async def drop_expired_partitions() -> list[str]:
+    """Drop daily partitions that end before the retention cutoff."""
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=RETENTION_DAYS)
+    pool = get_pool()
+    dropped = []
+    async with pool.acquire() as conn:
+        for name in sorted(await _existing_partitions(conn)):
+            if not name.startswith(_PARTITION_PREFIX):
+                continue
+            try:
+                day = datetime.strptime(name[len(_PARTITION_PREFIX):], "%Y%m%d").date()
+            except ValueError:
+                continue
+            if day < cutoff:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", _PARTITION_LOCK_KEY)
+                    if name not in await _existing_partitions(conn):
+                        continue    # another replica dropped it
+                    await conn.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+        # Stragglers in the default partition follow the same retention
+        await conn.execute("DELETE FROM agent_logs_default WHERE created_at < $1", _day_start(cutoff))
+    if dropped:
+        log.info(f"[logs] dropped {len(dropped)} expired partition(s): {', '.join(dropped)}")
+    return dropped
+
+
+async def migrate_legacy_logs() -> int:
+    """Copy in-retention rows from the pre-partitioning table, then drop it."""
+    pool = get_pool()
+    exists = await pool.fetchval("SELECT to_regclass('agent_logs_legacy') IS NOT NULL")
+    if not exists:
+        return 0
+
+    cutoff = _day_start(datetime.now(timezone.utc).date() - timedelta(days=RETENTION_DAYS))
+    oldest = await pool.fetchval(
+        "SELECT MIN(created_at) FROM agent_logs_legacy WHERE created_at >= $1", cutoff,
+    )
+    if oldest is not None:
+        await ensure_partitions(first_day=oldest.astimezone(timezone.utc).date())
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            result = await conn.execute(
+                """INSERT INTO agent_logs
+                       (log_id, agent_id, method, path, status_code, duration_ms,
+                        ip_address, body_snippet, created_at)
+                   SELECT log_id, agent_id, method, path, status_code, duration_ms,
+                          ip_address, body_snippet, created_at
+                   FROM agent_logs_legacy
+                   WHERE created_at >= $1
+                   ON CONFLICT DO NOTHING""",
+                cutoff,
+            )
+            await conn.execute("DROP TABLE agent_logs_legacy")
+    copied = int(result.split()[-1])
+    log.info(f"[logs] migrated {copied} rows from agent_logs_legacy into partitions")
+    return copied
+
+
+async def refresh_rollups() -> int:
+    """Recompute agent_log_rollups for every closed minute since the last rollup.
+
+    The window starts _ROLLUP_LATE_MINUTES before the newest rollup row (or
+    one day back on an empty table) and ends at the current minute, which is
+    still filling. Upserts make re-running a window harmless.
+    """
+    pool = get_pool()
+    now_minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    latest = await pool.fetchval("SELECT MAX(minute) FROM agent_log_rollups")
+    start = (latest - timedelta(minutes=_ROLLUP_LATE_MINUTES)) if latest else now_minute - timedelta(days=1)
+
+    result = await pool.execute(
+        """INSERT INTO agent_log_rollups
+               (agent_id, minute, requests, errors, p50_ms, p95_ms, p99_ms, max_ms)
+           SELECT agent_id,
+                  date_trunc('minute', created_at),
+                  COUNT(*),
+                  COUNT(*) FILTER (WHERE status_code >= 400),
+                  percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                  percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                  percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms),
+                  MAX(duration_ms)
+           FROM agent_logs
+           WHERE created_at >= $1 AND created_at < $2 AND agent_id IS NOT NULL
+           GROUP BY 1, 2
+           ON CONFLICT (agent_id, minute) DO UPDATE SET
+               requests = EXCLUDED.requests,
+               errors = EXCLUDED.errors,
+               p50_ms = EXCLUDED.p50_ms,
+               p95_ms = EXCLUDED.p95_ms,
+               p99_ms = EXCLUDED.p99_ms,
+               max_ms = EXCLUDED.max_ms""",
+        start, now_minute,
+    )
+    await pool.execute(
+        "DELETE FROM agent_log_rollups WHERE minute < NOW() - make_interval(days => $1)",
+        ROLLUP_RETENTION_DAYS,
+    )
+    return int(result.split()[-1])
+
+
+async def start_log_maintenance() -> None:
+    """Background loop. Partitions are ensured immediately so the first log flush has a home."""
+    bind_pool("background")
+    log.info(f"[logs] log maintenance started — retention: {RETENTION_DAYS}d, rollups every {ROLLUP_INTERVAL}s")
+    last_partition_day = None
+    while True:
+        try:
+            today = datetime.now(timezone.utc).date()
+            if last_partition_day != today:
+                await ensure_partitions()
+                await migrate_legacy_logs()
+                await drop_expired_partitions()
+                last_partition_day = today
+            await refresh_rollups()
+        except Exception as e:
+            log.error(f"[logs] maintenance error: {e}")
+        await asyncio.sleep(ROLLUP_INTERVAL)
@@ -0,0 +1,137 @@
+"""Buffered agent_logs writer.
+
+AgentLogMiddleware only appends a record to an in-memory buffer; a
+background task drains it into agent_logs with COPY every
+AGENT_LOG_FLUSH_MS or as soon as AGENT_LOG_BATCH_SIZE records are waiting.
+When the buffer is full (DB slow or down) new records are dropped and
+counted instead of slowing responses. The buffer is flushed on shutdown.
+
+A batch rejected for its data (a bad value, an agent deleted meanwhile) is
+retried row by row. Any other failure (connection lost, pool exhausted) puts
+the batch back at the front of the buffer, as far as it fits, and ends the
+flush until the next tick.
+
+Env vars:
+  AGENT_LOG_FLUSH_MS       Max delay before buffered records are written (default: 500)
+  AGENT_LOG_BATCH_SIZE     Flush early once this many records are buffered (default: 500)
+  AGENT_LOG_MAX_BUFFER     Records held before new ones are dropped (default: 20000)
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Optional
+
+import asyncpg
+
+from lib.database import get_pool
+
+log = logging.getLogger("agent_logs")
+
+AGENT_LOG_FLUSH_MS = int(os.environ.get("AGENT_LOG_FLUSH_MS", "500"))
+AGENT_LOG_BATCH_SIZE = int(os.environ.get("AGENT_LOG_BATCH_SIZE", "500"))
+AGENT_LOG_MAX_BUFFER = int(os.environ.get("AGENT_LOG_MAX_BUFFER", "20000"))
+
+_COLUMNS = [
+    "log_id", "agent_id", "method", "path", "status_code",
+    "duration_ms", "ip_address", "body_snippet", "created_at",
+]
+
+
+class AgentLogWriter:
+    """Bounded buffer + periodic COPY flusher for agent_logs."""
+
+    def __init__(self):
+        self._buffer: deque[tuple] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def enqueue(self, record: tuple) -> bool:
+        """Buffer one row (in _COLUMNS order). Never blocks; False if dropped."""
+        if len(self._buffer) >= AGENT_LOG_MAX_BUFFER:
+            self.dropped += 1
+            return False
+        self._buffer.append(record)
+        if len(self._buffer) >= AGENT_LOG_BATCH_SIZE:
+            self._wake.set()
+        return True
+
+    async def _write(self, batch: list[tuple]) -> None:
+        pool = get_pool("logging")
+        try:
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table("agent_logs", records=batch, columns=_COLUMNS)
+        except (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError) as e:
+            # COPY is all-or-nothing — retry row by row so one bad record
+            # (e.g. an agent deleted meanwhile) doesn't lose the batch
+            log.warning(f"[agent_logs] COPY of {len(batch)} rows failed ({e}); retrying per row")
+            placeholders = ", ".join(f"${i + 1}" for i in range(len(_COLUMNS)))
+            sql = f"INSERT INTO agent_logs ({', '.join(_COLUMNS)}) VALUES ({placeholders}) ON CONFLICT DO NOTHING"
+            for record in batch:
+                try:
+                    await pool.execute(sql, *record)
+                    self.written += 1
+                except Exception:
+                    self.failed += 1
+            return
+        self.written += len(batch)
+
+    async def flush(self) -> int:
+        """Write everything buffered right now. Returns rows taken off the buffer."""
+        taken = 0
+        while self._buffer:
+            n = min(len(self._buffer), AGENT_LOG_BATCH_SIZE)
+            batch = [self._buffer.popleft() for _ in range(n)]
+            taken += n
+            try:
+                await self._write(batch)
+            except Exception as e:
+                # DB unreachable — every further batch would fail the same way
+                room = max(0, AGENT_LOG_MAX_BUFFER - len(self._buffer))
+                kept = batch[:room]
+                self._buffer.extendleft(reversed(kept))
+                taken -= len(kept)
+                self.failed += n - len(kept)
+                log.error(f"[agent_logs] write of {n} rows failed, {len(kept)} requeued: {e}")
+                break
+        return taken
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=AGENT_LOG_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        self._stopping = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the flusher finish its current write, then write whatever is still buffered."""
+        self._stopping = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "max_buffer": AGENT_LOG_MAX_BUFFER,
+        }
+
+
+log_writer = AgentLogWriter()
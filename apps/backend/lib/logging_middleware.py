@@ -1,78 +1,100 @@
 """Agent request logging middleware.
 
 Records every API request made with an agent API key into the agent_logs table.
-Skips public/OAuth/health routes automatically.
+Skips public/OAuth/health routes automatically. Rows are handed to the
+buffered writer in lib/log_writer.py, so logging never waits on the DB.
+
+This is a plain ASGI middleware rather than a BaseHTTPMiddleware: skipped
+routes pass straight through with no extra task or response re-streaming,
+the request body is observed as the app reads it (so the first
+AGENT_LOG_BODY_BYTES can be logged without consuming it), and streaming
+responses are forwarded chunk by chunk untouched.
 """
 
+import os
 import time
 import uuid
-import json
+from datetime import datetime, timezone
 
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from lib.auth import hash_api_key
-from lib.database import get_pool
+from lib.auth import api_key_from_request, resolve_agent
+from lib.log_writer import log_writer
 
 
 # Paths to skip logging for (no API key involved)
 _SKIP_PREFIXES = ("/oauth/", "/health", "/docs", "/openapi", "/device/", "/register")
 
+# Request methods whose body prefix is logged
+_BODY_METHODS = ("POST", "PUT", "PATCH")
 
-class AgentLogMiddleware(BaseHTTPMiddleware):
+# Bytes of request body kept in body_snippet
+AGENT_LOG_BODY_BYTES = int(os.environ.get("AGENT_LOG_BODY_BYTES", "1024"))
+
+
+class AgentLogMiddleware:
     """Log every route hit that carries an agent API key."""
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        # Quick check: skip uninteresting routes
-        path = request.url.path
-        if any(path.startswith(p) for p in _SKIP_PREFIXES):
-            return await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        # Check for API key header
-        api_key = request.headers.get("X-API-Key") or request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
-        if not api_key:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Quick check: skip non-HTTP and uninteresting routes
+        if scope["type"] != "http" or scope["path"].startswith(_SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
-        start = time.monotonic()
-        response = await call_next(request)
-        duration_ms = int((time.monotonic() - start) * 1000)
+        # Check for API key header — Request(scope) only parses headers lazily
+        request = Request(scope)
+        if not api_key_from_request(request):
+            await self.app(scope, receive, send)
+            return
 
-        # Fire-and-forget: resolve agent and write log
+        # Resolve once up front — routes read the same agent off request.state
+        try:
+            agent = await resolve_agent(request)
+        except Exception:
+            agent = None  # DB down etc. — let the route produce the error
+
+        if not agent:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        body = bytearray()
+        status_code = 500  # if the app raises before starting a response
+
+        async def receive_wrapper() -> Message:
+            # Tee the first AGENT_LOG_BODY_BYTES as the app reads the body
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < AGENT_LOG_BODY_BYTES:
+                body.extend(message.get("body", b"")[:AGENT_LOG_BODY_BYTES - len(body)])
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
         try:
-            pool = get_pool()
-            key_hash = hash_api_key(api_key)
-            row = await pool.fetchrow("SELECT agent_id FROM agents WHERE api_key_hash = $1", key_hash)
-            if row:
-                agent_id = row["agent_id"]
-
-                # Grab a snippet of the request body for POST/PUT (already consumed, use state if available)
-                body_snippet: str | None = None
-                if request.method in ("POST", "PUT", "PATCH"):
-                    try:
-                        # Body has been consumed by call_next; we can't re-read it.
-                        # Store the path query params instead as a hint.
-                        params = str(dict(request.query_params)) if request.query_params else None
-                        body_snippet = params
-                    except Exception:
-                        pass
-
-                ip = request.client.host if request.client else None
-
-                await pool.execute(
-                    """INSERT INTO agent_logs
-                       (log_id, agent_id, method, path, status_code, duration_ms, ip_address, body_snippet, created_at)
-                       VALUES ($1, $2, $3, $4, $5, $6, $7, $8, NOW())""",
+            await self.app(scope, receive_wrapper if method in _BODY_METHODS else receive, send_wrapper)
+        finally:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            # Fire-and-forget: buffer the log row
+            try:
+                log_writer.enqueue((
                     str(uuid.uuid4()),
-                    agent_id,
-                    request.method,
-                    path,
-                    response.status_code,
+                    agent.agent_id,
+                    method,
+                    scope["path"],
+                    status_code,
                     duration_ms,
-                    ip,
-                    body_snippet,
-                )
-        except Exception:
-            pass  # Never let logging break the actual request
-
-        return response
+                    scope["client"][0] if scope.get("client") else None,
+                    body.decode("utf-8", errors="replace") if body else None,
+                    datetime.now(timezone.utc),
+                ))
+            except Exception:
+                pass  # Never let logging break the actual request
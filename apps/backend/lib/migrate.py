@@ -0,0 +1,115 @@
+"""Versioned schema migrations.
+
+Migrations are the numbered files in lib/migrations/ (NNNN_name.sql), applied
+in order. Each file runs in its own transaction and is recorded in
+schema_migrations, so it never runs twice.
+
+Startup fast path: when the newest recorded version is the newest file, the
+whole check is one SELECT — no locks and no DDL. Otherwise the runner takes
+a Postgres advisory lock, so that when several replicas boot at once exactly
+one of them migrates. The others wait on the lock, re-read
+schema_migrations and find nothing left to do.
+
+Add a schema change as a new file with the next number — never edit one
+that has shipped (a changed checksum is logged at the next migration run).
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import asyncpg
+
+log = logging.getLogger("migrate")
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Arbitrary app-wide key for pg_advisory_lock
+_LOCK_KEY = 0x45504D47  # "EPMG"
+
+# Seconds a migration (or a replica waiting for the lock) may take — well
+# past the pool's 30s command_timeout
+_TIMEOUT = 600
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+
+def load_migrations() -> list[Migration]:
+    """All migration files, ordered by version."""
+    migrations = []
+    for path in MIGRATIONS_DIR.glob("*.sql"):
+        m = _FILENAME.match(path.name)
+        if not m:
+            raise ValueError(f"Bad migration filename: {path.name} (expected NNNN_name.sql)")
+        migrations.append(Migration(version=int(m.group(1)), name=m.group(2), sql=path.read_text()))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+async def current_version(conn: asyncpg.Connection) -> int:
+    """Newest applied version, 0 on a database that has never been migrated."""
+    try:
+        return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    except asyncpg.UndefinedTableError:
+        return 0
+
+
+async def applied_migrations(conn: asyncpg.Connection) -> list[dict]:
+    try:
+        rows = await conn.fetch("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version")
+    except asyncpg.UndefinedTableError:
+        return []
+    return [dict(r) for r in rows]
+
+
+async def migrate(conn: asyncpg.Connection) -> list[str]:
+    """Apply pending migrations. Returns the names applied (empty if already current)."""
+    migrations = load_migrations()
+    if not migrations or await current_version(conn) >= migrations[-1].version:
+        return []
+
+    applied_now = []
+    await conn.execute("SELECT pg_advisory_lock($1)", _LOCK_KEY, timeout=_TIMEOUT)
+    try:
+        await conn.execute(
+            """CREATE TABLE IF NOT EXISTS schema_migrations (
+                   version INTEGER PRIMARY KEY,
+                   name TEXT NOT NULL,
+                   checksum TEXT NOT NULL,
+                   applied_at TIMESTAMPTZ DEFAULT NOW()
+               )"""
+        )
+        # Re-read under the lock — another replica may have just migrated
+        done = {r["version"]: r for r in await applied_migrations(conn)}
+        for m in migrations:
+            if m.version in done:
+                if done[m.version]["checksum"] != m.checksum:
+                    log.warning(f"[migrate] {m.version:04d}_{m.name} changed after it was applied")
+                continue
+            async with conn.transaction():
+                await conn.execute(m.sql, timeout=_TIMEOUT)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+                    m.version, m.name, m.checksum,
+                )
+            applied_now.append(f"{m.version:04d}_{m.name}")
+            log.info(f"[migrate] applied {m.version:04d}_{m.name}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _LOCK_KEY)
+    return applied_now
@@ -0,0 +1,147 @@
+-- Baseline: the schema init_db used to apply on every boot.
+-- Idempotent, so databases created before versioned migrations adopt it as-is.
+
+-- Users (Google OAuth accounts)
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    name TEXT DEFAULT '',
+    avatar_url TEXT DEFAULT '',
+    google_sub TEXT UNIQUE,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Registered agents
+CREATE TABLE IF NOT EXISTS agents (
+    agent_id TEXT PRIMARY KEY,
+    wallet_address TEXT NOT NULL,
+    api_key_hash TEXT UNIQUE NOT NULL,
+    wallet_index INTEGER DEFAULT 0,
+    polygon_safe TEXT DEFAULT '',
+    solana_wallet TEXT DEFAULT '',
+    scopes TEXT[] DEFAULT ARRAY['trade','balance','markets'],
+    owner_id TEXT REFERENCES users(user_id),
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Device codes (agent claim flow)
+CREATE TABLE IF NOT EXISTS device_codes (
+    device_code TEXT PRIMARY KEY,
+    user_code TEXT UNIQUE NOT NULL,
+    agent_id TEXT REFERENCES agents(agent_id),
+    status TEXT DEFAULT 'pending',
+    user_id TEXT REFERENCES users(user_id),
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Trade executions
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    market_id TEXT NOT NULL,
+    question TEXT,
+    side TEXT NOT NULL,
+    amount_usd DOUBLE PRECISION NOT NULL,
+    entry_price DOUBLE PRECISION,
+    split_tx TEXT,
+    clob_order_id TEXT,
+    clob_filled BOOLEAN DEFAULT FALSE,
+    status TEXT DEFAULT 'executed',
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Open positions
+CREATE TABLE IF NOT EXISTS positions (
+    position_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    market_id TEXT NOT NULL,
+    question TEXT,
+    position TEXT NOT NULL,
+    token_id TEXT,
+    entry_amount DOUBLE PRECISION,
+    entry_price DOUBLE PRECISION,
+    split_tx TEXT,
+    clob_order_id TEXT,
+    clob_filled BOOLEAN DEFAULT FALSE,
+    status TEXT DEFAULT 'open',
+    notes TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Agent API request logs (every route hit via API key)
+CREATE TABLE IF NOT EXISTS agent_logs (
+    log_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status_code INTEGER,
+    duration_ms INTEGER,
+    ip_address TEXT,
+    body_snippet TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_agents_api_key_hash ON agents(api_key_hash);
+CREATE INDEX IF NOT EXISTS idx_agents_wallet ON agents(wallet_address);
+CREATE INDEX IF NOT EXISTS idx_agents_owner ON agents(owner_id);
+CREATE INDEX IF NOT EXISTS idx_trades_agent ON trades(agent_id);
+CREATE INDEX IF NOT EXISTS idx_trades_market ON trades(market_id);
+CREATE INDEX IF NOT EXISTS idx_positions_agent ON positions(agent_id);
+CREATE INDEX IF NOT EXISTS idx_positions_market ON positions(market_id);
+CREATE INDEX IF NOT EXISTS idx_positions_status ON positions(status);
+CREATE INDEX IF NOT EXISTS idx_agent_logs_agent ON agent_logs(agent_id);
+CREATE INDEX IF NOT EXISTS idx_agent_logs_created ON agent_logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_device_codes_user_code ON device_codes(user_code);
+CREATE INDEX IF NOT EXISTS idx_device_codes_agent ON device_codes(agent_id);
+
+-- agent feature flags (idempotent migration)
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS auto_rebalance BOOLEAN DEFAULT FALSE;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS auto_freemonies BOOLEAN DEFAULT FALSE;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS freemonies_max_markets INTEGER DEFAULT 2;
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS freemonies_amount_per_market FLOAT DEFAULT 2.0;
+DO $$ BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name='agents' AND column_name='solana_vault') THEN
+    ALTER TABLE agents RENAME COLUMN solana_vault TO solana_wallet;
+  END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS vault_positions (
+    position_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    protocol TEXT NOT NULL,
+    protocol_name TEXT NOT NULL,
+    pool_id TEXT NOT NULL,
+    amount_usdc FLOAT NOT NULL,
+    shares_held TEXT NOT NULL DEFAULT '0',
+    apy_at_entry FLOAT NOT NULL,
+    status TEXT DEFAULT 'active',
+    deposited_at TIMESTAMPTZ DEFAULT NOW(),
+    withdrawn_at TIMESTAMPTZ,
+    deposit_tx TEXT,
+    withdraw_tx TEXT
+);
+
+CREATE TABLE IF NOT EXISTS vault_logs (
+    log_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    action TEXT NOT NULL,
+    from_protocol TEXT,
+    from_pool_id TEXT,
+    to_protocol TEXT,
+    to_pool_id TEXT,
+    amount_usdc FLOAT,
+    apy FLOAT,
+    shares TEXT,
+    tx_hash TEXT,
+    reason TEXT,
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_vault_positions_agent ON vault_positions(agent_id);
+CREATE INDEX IF NOT EXISTS idx_vault_positions_status ON vault_positions(status);
+CREATE INDEX IF NOT EXISTS idx_vault_logs_agent ON vault_logs(agent_id);
+CREATE INDEX IF NOT EXISTS idx_vault_logs_created ON vault_logs(created_at DESC);
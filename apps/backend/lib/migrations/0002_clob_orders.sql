@@ -0,0 +1,45 @@
+-- CLOB L2 API creds per signer EOA (Fernet-encrypted JSON, see lib/clob_client.py)
+CREATE TABLE IF NOT EXISTS clob_credentials (
+    signer_address TEXT PRIMARY KEY,
+    creds_encrypted TEXT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- CLOB orders we submitted, tracked by lib/order_reconciler.py until settled
+CREATE TABLE IF NOT EXISTS clob_orders (
+    order_id TEXT PRIMARY KEY,
+    agent_id TEXT REFERENCES agents(agent_id),
+    position_id TEXT,
+    signer_address TEXT NOT NULL,
+    token_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    price DOUBLE PRECISION NOT NULL,
+    size DOUBLE PRECISION NOT NULL,
+    size_matched DOUBLE PRECISION DEFAULT 0,
+    order_type TEXT DEFAULT 'GTC',
+    status TEXT DEFAULT 'open',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Individual CLOB fills (one row per matched trade leg of our orders)
+CREATE TABLE IF NOT EXISTS fills (
+    fill_id TEXT PRIMARY KEY,
+    order_id TEXT REFERENCES clob_orders(order_id),
+    agent_id TEXT REFERENCES agents(agent_id),
+    position_id TEXT,
+    token_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    price DOUBLE PRECISION NOT NULL,
+    size DOUBLE PRECISION NOT NULL,
+    fee_rate_bps INTEGER DEFAULT 0,
+    tx_hash TEXT,
+    matched_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_clob_orders_status ON clob_orders(status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_clob_orders_signer ON clob_orders(signer_address);
+CREATE INDEX IF NOT EXISTS idx_fills_order ON fills(order_id);
+CREATE INDEX IF NOT EXISTS idx_fills_position ON fills(position_id);
+CREATE INDEX IF NOT EXISTS idx_fills_agent ON fills(agent_id);
@@ -0,0 +1,46 @@
+-- agent_logs used to be a plain heap table; move it aside so it can be
+-- recreated partitioned (lib/log_maintenance.py backfills and drops it)
+DO $$ BEGIN
+  IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'agent_logs' AND relkind = 'r') THEN
+    ALTER TABLE agent_logs RENAME TO agent_logs_legacy;
+    ALTER INDEX IF EXISTS agent_logs_pkey RENAME TO agent_logs_legacy_pkey;
+    DROP INDEX IF EXISTS idx_agent_logs_agent;
+    DROP INDEX IF EXISTS idx_agent_logs_created;
+  END IF;
+END $$;
+
+-- Agent API request logs (every route hit via API key), one partition per
+-- UTC day; partitions are created ahead and dropped after retention by
+-- lib/log_maintenance.py, the default partition only catches stragglers
+CREATE TABLE IF NOT EXISTS agent_logs (
+    log_id TEXT NOT NULL,
+    agent_id TEXT REFERENCES agents(agent_id),
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    status_code INTEGER,
+    duration_ms INTEGER,
+    ip_address TEXT,
+    body_snippet TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (created_at, log_id)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS agent_logs_default PARTITION OF agent_logs DEFAULT;
+
+-- Per-agent per-minute request rollups of agent_logs (lib/log_maintenance.py)
+CREATE TABLE IF NOT EXISTS agent_log_rollups (
+    agent_id TEXT NOT NULL,
+    minute TIMESTAMPTZ NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    p50_ms DOUBLE PRECISION,
+    p95_ms DOUBLE PRECISION,
+    p99_ms DOUBLE PRECISION,
+    max_ms INTEGER,
+    PRIMARY KEY (agent_id, minute)
+);
+
+-- The heap table's indexes moved aside with it; the partitioned table is
+-- indexed by its primary key and the (agent_id, created_at) index
+DROP INDEX IF EXISTS idx_agent_logs_agent;
+DROP INDEX IF EXISTS idx_agent_logs_created;
+CREATE INDEX IF NOT EXISTS idx_agent_log_rollups_minute ON agent_log_rollups(minute);
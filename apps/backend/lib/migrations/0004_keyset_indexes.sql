@@ -0,0 +1,5 @@
+-- Composite keys for keyset pagination (lib/pagination.py): newest-first
+-- history per agent is a single index range scan at any depth
+DROP INDEX IF EXISTS idx_trades_agent;
+CREATE INDEX IF NOT EXISTS idx_trades_agent_created ON trades(agent_id, created_at DESC, trade_id DESC);
+CREATE INDEX IF NOT EXISTS idx_agent_logs_agent_created ON agent_logs(agent_id, created_at DESC, log_id DESC);
@@ -0,0 +1,81 @@
+-- Platform-wide counters for GET /stats, kept current by row triggers so the
+-- endpoint is a primary-key read instead of aggregates over trades/positions.
+-- lib/platform_stats.py periodically recomputes them to correct any drift.
+CREATE TABLE IF NOT EXISTS platform_stats (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    agents BIGINT NOT NULL DEFAULT 0,
+    trades BIGINT NOT NULL DEFAULT 0,
+    volume_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    open_positions BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION platform_stats_agents() RETURNS trigger AS $$
+BEGIN
+    UPDATE platform_stats
+    SET agents = agents + CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END,
+        updated_at = NOW()
+    WHERE id = 1;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+-- Only executed trades count toward trades / volume
+CREATE OR REPLACE FUNCTION platform_stats_trades() RETURNS trigger AS $$
+DECLARE
+    d_count BIGINT := 0;
+    d_volume DOUBLE PRECISION := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'executed' THEN
+        d_count := d_count - 1;
+        d_volume := d_volume - COALESCE(OLD.amount_usd, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'executed' THEN
+        d_count := d_count + 1;
+        d_volume := d_volume + COALESCE(NEW.amount_usd, 0);
+    END IF;
+    IF d_count <> 0 OR d_volume <> 0 THEN
+        UPDATE platform_stats
+        SET trades = trades + d_count, volume_usd = volume_usd + d_volume, updated_at = NOW()
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION platform_stats_positions() RETURNS trigger AS $$
+DECLARE
+    d_open BIGINT := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'open' THEN
+        d_open := d_open - 1;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'open' THEN
+        d_open := d_open + 1;
+    END IF;
+    IF d_open <> 0 THEN
+        UPDATE platform_stats SET open_positions = open_positions + d_open, updated_at = NOW()
+        WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_platform_stats_agents ON agents;
+CREATE TRIGGER trg_platform_stats_agents AFTER INSERT OR DELETE ON agents
+    FOR EACH ROW EXECUTE FUNCTION platform_stats_agents();
+
+DROP TRIGGER IF EXISTS trg_platform_stats_trades ON trades;
+CREATE TRIGGER trg_platform_stats_trades AFTER INSERT OR DELETE OR UPDATE OF status, amount_usd ON trades
+    FOR EACH ROW EXECUTE FUNCTION platform_stats_trades();
+
+DROP TRIGGER IF EXISTS trg_platform_stats_positions ON positions;
+CREATE TRIGGER trg_platform_stats_positions AFTER INSERT OR DELETE OR UPDATE OF status ON positions
+    FOR EACH ROW EXECUTE FUNCTION platform_stats_positions();
+
+-- Seed from the current tables (the trigger DDL above holds off writers
+-- until this transaction commits, so the seed and the triggers line up)
+INSERT INTO platform_stats (id, agents, trades, volume_usd, open_positions)
+SELECT 1,
+       (SELECT COUNT(*) FROM agents),
+       (SELECT COUNT(*) FROM trades WHERE status = 'executed'),
+       (SELECT COALESCE(SUM(amount_usd), 0) FROM trades WHERE status = 'executed'),
+       (SELECT COUNT(*) FROM positions WHERE status = 'open')
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,18 @@
+-- Per-agent equity history in three resolutions (lib/equity.py). The
+-- snapshotter writes agent_equity_1m; each coarser tier holds the last
+-- sample of every hour / day and outlives the tier below it.
+CREATE TABLE IF NOT EXISTS agent_equity_1m (
+    agent_id TEXT NOT NULL,
+    ts TIMESTAMPTZ NOT NULL,
+    safe_usdc DOUBLE PRECISION,
+    vault_usdc DOUBLE PRECISION NOT NULL DEFAULT 0,
+    positions_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    pnl_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent_id, ts)
+);
+CREATE TABLE IF NOT EXISTS agent_equity_1h (LIKE agent_equity_1m INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS agent_equity_1d (LIKE agent_equity_1m INCLUDING ALL);
+
+-- Retention deletes and downsampling scan by time across all agents
+CREATE INDEX IF NOT EXISTS idx_agent_equity_1m_ts ON agent_equity_1m(ts);
+CREATE INDEX IF NOT EXISTS idx_agent_equity_1h_ts ON agent_equity_1h(ts);
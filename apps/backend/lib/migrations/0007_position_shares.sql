@@ -0,0 +1,5 @@
+-- On-chain share count of each position, written by the CTF balance
+-- reconciler (lib/position_reconciler.py). NULL until first reconciled;
+-- readers fall back to entry_amount / entry_price.
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS shares DOUBLE PRECISION;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS reconciled_at TIMESTAMPTZ;
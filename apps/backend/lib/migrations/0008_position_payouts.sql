@@ -0,0 +1,6 @@
+-- What a position returned when it left the book: the redemption payout of
+-- a resolved market (lib/redemption.py) or the proceeds of an exit.
+-- Realized P&L = payout_usd - entry_amount.
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS payout_usd DOUBLE PRECISION;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS close_tx TEXT;
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS closed_at TIMESTAMPTZ;
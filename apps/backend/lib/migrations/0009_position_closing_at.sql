@@ -0,0 +1,7 @@
+-- When an exit claimed the position (status = 'closing', lib/exits.py).
+-- The position reconciler returns claims older than
+-- POSITION_CLOSING_TIMEOUT_SECONDS to 'open', so a crashed exit can't
+-- strand a position. Claims made before this column existed start the
+-- timeout now.
+ALTER TABLE positions ADD COLUMN IF NOT EXISTS closing_at TIMESTAMPTZ;
+UPDATE positions SET closing_at = NOW() WHERE status = 'closing' AND closing_at IS NULL;
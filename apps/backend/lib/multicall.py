@@ -0,0 +1,41 @@
+"""
+Multicall3 batching for read-only contract calls.
+
+aggregate() packs many (target, calldata) reads into Multicall3.aggregate3
+eth_calls. That is one RPC round-trip per MULTICALL_BATCH calls instead of
+one per call. Every sub-call runs with allowFailure=true, so a reverting
+read yields None rather than failing its whole batch.
+
+Multicall3 is deployed at the same address on Polygon, Base and most other
+EVM chains (CONTRACTS["MULTICALL3"]).
+
+Env vars:
+  MULTICALL_BATCH   Sub-calls per aggregate3 eth_call (default: 50)
+"""
+
+import os
+from typing import Optional
+
+from web3 import Web3
+
+from lib.contracts import CONTRACTS, MULTICALL3_ABI
+
+MULTICALL_BATCH = int(os.environ.get("MULTICALL_BATCH", "50"))
+
+
+def aggregate(w3: Web3, calls: list[tuple[str, bytes]], batch: int = None) -> list[Optional[bytes]]:
+    """Run `calls` through Multicall3 (blocking). Returns return data per call, None where it reverted."""
+    batch = batch or MULTICALL_BATCH
+    multicall = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["MULTICALL3"]), abi=MULTICALL3_ABI)
+    out: list[Optional[bytes]] = []
+    for i in range(0, len(calls), batch):
+        chunk = [(Web3.to_checksum_address(target), True, data) for target, data in calls[i:i + batch]]
+        results = multicall.functions.aggregate3(chunk).call()
+        out += [bytes(data) if ok else None for ok, data in results]
+    return out
+
+
+def rpc_calls(n_calls: int, batch: int = None) -> int:
+    """eth_calls aggregate() makes for `n_calls` sub-calls."""
+    batch = batch or MULTICALL_BATCH
+    return -(-n_calls // batch)
@@ -0,0 +1,363 @@
+"""
+Open-order reconciler — tracks CLOB orders after submission and records real fills.
+
+Every order we submit (FOK sells of the unwanted leg, resting GTC orders) is
+written to clob_orders via track_order(). One background loop then, per cycle:
+
+  1. Loads every open order, plus orders settled within the lookback window
+     (their last trades may land after they leave the book)
+  2. Groups them by signer EOA — the CLOB scopes orders/trades to the API key,
+     so it is one GET /data/orders + one GET /data/trades per signer, not one
+     call per order (signers are processed concurrently)
+  3. Inserts every matched leg of our orders into `fills` (idempotent)
+  4. Updates size_matched / status, and batch-cancels GTC orders older than
+     CLOB_ORDER_MAX_AGE_HOURS with one DELETE /orders per signer
+  5. Recomputes cost basis (entry_price) of the linked positions from fills
+
+Env vars:
+  CLOB_RECONCILE_INTERVAL_SECONDS  Loop interval (default: 60)
+  CLOB_RECONCILE_LOOKBACK_MINUTES  Keep re-reading trades for settled orders this long (default: 60)
+  CLOB_ORDER_MAX_AGE_HOURS         Cancel resting orders older than this (default: 24, 0 = never)
+  CLOB_RECONCILE_CONCURRENCY       Signers reconciled in parallel (default: 10)
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from lib.clob_client import ClobClientWrapper
+from lib.database import bind_pool, get_pool
+from lib.pnl_engine import pnl_engine
+from lib.wallet_manager import WalletManager
+
+log = logging.getLogger("order_reconciler")
+
+RECONCILE_INTERVAL = int(os.environ.get("CLOB_RECONCILE_INTERVAL_SECONDS", "60"))
+RECONCILE_LOOKBACK_MINUTES = int(os.environ.get("CLOB_RECONCILE_LOOKBACK_MINUTES", "60"))
+ORDER_MAX_AGE_HOURS = float(os.environ.get("CLOB_ORDER_MAX_AGE_HOURS", "24"))
+RECONCILE_CONCURRENCY = int(os.environ.get("CLOB_RECONCILE_CONCURRENCY", "10"))
+
+# Tolerance when comparing share sizes (CLOB amounts are 6-decimal fixed point)
+_SIZE_EPS = 1e-6
+
+
+async def track_order(
+    order_id: str,
+    agent_id: str,
+    signer_address: str,
+    token_id: str,
+    side: str,
+    price: float,
+    size: float,
+    order_type: str = "GTC",
+    position_id: Optional[str] = None,
+) -> None:
+    """Start tracking a submitted order.
+
+    FOK/FAK orders are settled the moment the CLOB answers, so they go in as
+    'matched' and are only revisited to pick up their fills.
+    """
+    status = "open" if order_type in ("GTC", "GTD") else "matched"
+    pool = get_pool()
+    await pool.execute(
+        """
+        INSERT INTO clob_orders (
+            order_id, agent_id, position_id, signer_address, token_id,
+            side, price, size, order_type, status
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+        ON CONFLICT (order_id) DO NOTHING
+        """,
+        order_id,
+        agent_id,
+        position_id,
+        signer_address.lower(),
+        token_id or "",
+        side,
+        price,
+        size,
+        order_type,
+        status,
+    )
+
+
+# ── Fill extraction ────────────────────────────────────────────────────────────
+
+
+def _matched_at(trade: dict) -> Optional[datetime]:
+    ts = trade.get("match_time") or trade.get("last_update")
+    try:
+        return datetime.fromtimestamp(int(ts), tz=timezone.utc) if ts else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _extract_fills(trades: list[dict], tracked: dict[str, dict]) -> list[dict]:
+    """Pick out the legs of `trades` that belong to orders in `tracked`.
+
+    Our order is either the taker (trade.taker_order_id) or one of the
+    resting maker_orders; each gets its own fill row.
+    """
+    fills = []
+    for t in trades:
+        if (t.get("status") or "").upper() == "FAILED":
+            continue
+        taker_id = t.get("taker_order_id")
+        if taker_id in tracked:
+            fills.append({
+                "fill_id": t["id"],
+                "order_id": taker_id,
+                "token_id": t.get("asset_id") or tracked[taker_id]["token_id"],
+                "side": (t.get("side") or tracked[taker_id]["side"]).upper(),
+                "price": float(t["price"]),
+                "size": float(t["size"]),
+                "fee_rate_bps": int(t.get("fee_rate_bps") or 0),
+                "tx_hash": t.get("transaction_hash"),
+                "matched_at": _matched_at(t),
+            })
+        for mo in t.get("maker_orders") or []:
+            maker_id = mo.get("order_id")
+            if maker_id not in tracked:
+                continue
+            fills.append({
+                "fill_id": f"{t['id']}:{maker_id}",
+                "order_id": maker_id,
+                "token_id": mo.get("asset_id") or tracked[maker_id]["token_id"],
+                "side": (mo.get("side") or tracked[maker_id]["side"]).upper(),
+                "price": float(mo["price"]),
+                "size": float(mo["matched_amount"]),
+                "fee_rate_bps": int(mo.get("fee_rate_bps") or 0),
+                "tx_hash": t.get("transaction_hash"),
+                "matched_at": _matched_at(t),
+            })
+    return fills
+
+
+# ── Per-signer reconciliation ─────────────────────────────────────────────────
+
+
+def _wallet_for_signer(signer: str, wallet_index: Optional[int]) -> Optional[WalletManager]:
+    """The wallet whose key signed these orders — agent's TEE key or the shared key."""
+    candidates = []
+    if wallet_index is not None:
+        candidates.append(lambda: WalletManager.from_tee(wallet_index))
+    candidates.append(WalletManager)
+    for make in candidates:
+        try:
+            wallet = make()
+        except Exception:
+            continue
+        if wallet.is_unlocked and wallet.address and wallet.address.lower() == signer:
+            return wallet
+    return None
+
+
+async def _reconcile_signer(signer: str, orders: list[dict]) -> dict:
+    """One signer's pass. Returns fills, order updates and cancel count (no DB writes)."""
+    out = {"fills": [], "updates": [], "cancelled": 0, "error": None}
+
+    wallet = _wallet_for_signer(signer, orders[0].get("wallet_index"))
+    if wallet is None:
+        out["error"] = "signing key unavailable"
+        return out
+
+    clob = ClobClientWrapper(wallet.get_unlocked_key(), wallet.address)
+    wallet.lock()
+
+    tracked = {o["order_id"]: o for o in orders}
+    open_ids = [oid for oid, o in tracked.items() if o["status"] == "open"]
+    after = int(min(o["created_at"] for o in orders).timestamp()) - 60
+
+    live, trades = await asyncio.gather(
+        clob.get_orders() if open_ids else asyncio.sleep(0, result=[]),
+        clob.get_trades(after=after),
+    )
+    live_by_id = {o["id"]: o for o in live}
+
+    out["fills"] = _extract_fills(trades, tracked)
+    filled_by_order: dict[str, float] = defaultdict(float)
+    for f in out["fills"]:
+        filled_by_order[f["order_id"]] += f["size"]
+
+    now = datetime.now(timezone.utc)
+    stale = []
+    for oid in open_ids:
+        o = tracked[oid]
+        if oid in live_by_id:
+            matched = float(live_by_id[oid].get("size_matched") or 0)
+            age_h = (now - o["created_at"]).total_seconds() / 3600
+            if ORDER_MAX_AGE_HOURS and age_h > ORDER_MAX_AGE_HOURS:
+                stale.append((oid, matched))
+            elif abs(matched - (o["size_matched"] or 0)) > _SIZE_EPS:
+                out["updates"].append((oid, matched, "open"))
+            continue
+
+        # Left the book: fully matched, or cancelled/expired (possibly after a partial fill)
+        matched = max(float(o["size_matched"] or 0), filled_by_order.get(oid, 0.0))
+        status = "filled" if matched + _SIZE_EPS >= o["size"] else "cancelled"
+        out["updates"].append((oid, matched, status))
+
+    if stale:
+        cancelled, not_cancelled = await clob.cancel_orders([oid for oid, _ in stale])
+        cancelled = set(cancelled)
+        for oid, matched in stale:
+            if oid in cancelled:
+                out["updates"].append((oid, matched, "cancelled"))
+            else:
+                log.warning(f"[reconcile] could not cancel stale {oid}: {not_cancelled.get(oid)}")
+        out["cancelled"] = len(cancelled)
+
+    return out
+
+
+# ── Cost basis ────────────────────────────────────────────────────────────────
+
+
+async def _update_cost_basis(position_ids: list[str]) -> int:
+    """Re-derive entry_price for positions from their recorded fills.
+
+    Split positions: cost = USDC split − proceeds of unwanted-leg sells, over
+    the split size. Pure CLOB positions: VWAP of buy fills. Returns rows updated.
+    """
+    if not position_ids:
+        return 0
+    pool = get_pool()
+    rows = await pool.fetch(
+        """
+        SELECT p.position_id, p.token_id AS wanted_token, p.entry_amount, p.split_tx,
+               f.token_id, f.side, f.price, f.size
+        FROM positions p
+        JOIN fills f ON f.position_id = p.position_id
+        WHERE p.position_id = ANY($1)
+        """,
+        position_ids,
+    )
+
+    acc: dict[str, dict] = {}
+    for r in rows:
+        a = acc.get(r["position_id"])
+        if a is None:
+            base = float(r["entry_amount"] or 0) if r["split_tx"] else 0.0
+            a = acc[r["position_id"]] = {"shares": base, "cost": base, "split": bool(r["split_tx"])}
+        notional = float(r["price"]) * float(r["size"])
+        if r["side"] == "BUY":
+            a["shares"] += float(r["size"])
+            a["cost"] += notional
+        elif not r["wanted_token"] or r["token_id"] != r["wanted_token"]:
+            a["cost"] -= notional  # sold the unwanted leg
+
+    updates = [
+        (pid, a["cost"] / a["shares"], None if a["split"] else a["cost"])
+        for pid, a in acc.items()
+        if a["shares"] > _SIZE_EPS
+    ]
+    if updates:
+        await pool.executemany(
+            """
+            UPDATE positions
+            SET entry_price = $2,
+                entry_amount = COALESCE($3, entry_amount),
+                clob_filled = TRUE
+            WHERE position_id = $1
+            """,
+            updates,
+        )
+        await pnl_engine.reload_positions([u[0] for u in updates])
+    return len(updates)
+
+
+# ── Cycle / cron ──────────────────────────────────────────────────────────────
+
+
+async def run_reconcile_cycle() -> dict:
+    """Reconcile every tracked order once. Returns summary counters."""
+    pool = get_pool()
+    rows = await pool.fetch(
+        """
+        SELECT o.*, a.wallet_index
+        FROM clob_orders o
+        LEFT JOIN agents a ON a.agent_id = o.agent_id
+        WHERE o.status = 'open'
+           OR o.updated_at > NOW() - make_interval(mins => $1)
+        """,
+        RECONCILE_LOOKBACK_MINUTES,
+    )
+    summary = {"orders": len(rows), "signers": 0, "fills": 0, "updated": 0, "cancelled": 0, "positions": 0, "errors": 0}
+    if not rows:
+        return summary
+
+    by_signer: dict[str, list[dict]] = defaultdict(list)
+    for r in rows:
+        by_signer[r["signer_address"]].append(dict(r))
+    summary["signers"] = len(by_signer)
+
+    sem = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+    async def _guarded(signer: str, orders: list[dict]) -> dict:
+        async with sem:
+            try:
+                return await _reconcile_signer(signer, orders)
+            except Exception as e:
+                return {"fills": [], "updates": [], "cancelled": 0, "error": str(e)}
+
+    signers = list(by_signer)
+    results = await asyncio.gather(*[_guarded(s, by_signer[s]) for s in signers])
+
+    order_meta = {r["order_id"]: r for r in rows}
+    fills, updates = [], []
+    for signer, res in zip(signers, results):
+        if res["error"]:
+            summary["errors"] += 1
+            log.warning(f"[reconcile] {signer}: {res['error']}")
+        fills += res["fills"]
+        updates += res["updates"]
+        summary["cancelled"] += res["cancelled"]
+
+    if fills:
+        await pool.executemany(
+            """
+            INSERT INTO fills (
+                fill_id, order_id, agent_id, position_id, token_id, side,
+                price, size, fee_rate_bps, tx_hash, matched_at
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+            ON CONFLICT (fill_id) DO NOTHING
+            """,
+            [
+                (
+                    f["fill_id"], f["order_id"], order_meta[f["order_id"]]["agent_id"],
+                    order_meta[f["order_id"]]["position_id"], f["token_id"], f["side"],
+                    f["price"], f["size"], f["fee_rate_bps"], f["tx_hash"], f["matched_at"],
+                )
+                for f in fills
+            ],
+        )
+    if updates:
+        await pool.executemany(
+            "UPDATE clob_orders SET size_matched = $2, status = $3, updated_at = NOW() WHERE order_id = $1",
+            updates,
+        )
+
+    summary["fills"] = len(fills)
+    summary["updated"] = len(updates)
+    position_ids = list({
+        order_meta[f["order_id"]]["position_id"] for f in fills if order_meta[f["order_id"]]["position_id"]
+    })
+    summary["positions"] = await _update_cost_basis(position_ids)
+    return summary
+
+
+async def start_order_reconciler() -> None:
+    """Background loop. Starts 30s after boot, then every CLOB_RECONCILE_INTERVAL_SECONDS."""
+    bind_pool("background")
+    await asyncio.sleep(30)
+    log.info(f"[reconcile] order reconciler started — interval: {RECONCILE_INTERVAL}s")
+    while True:
+        try:
+            summary = await run_reconcile_cycle()
+            if summary["orders"]:
+                log.info(f"[reconcile] {summary}")
+        except Exception as e:
+            log.error(f"[reconcile] top-level error: {e}")
+        await asyncio.sleep(RECONCILE_INTERVAL)
@@ -0,0 +1,180 @@
+"""CLOB order book cache and VWAP fill estimation.
+
+Books are kept per token as {price: size} maps on each side. They are
+populated from REST snapshots (GET /book) and can be kept current between
+snapshots with level deltas — the same (side, price, new_size) updates the
+CLOB market websocket pushes as `price_change` events.
+
+The walker answers "what limit price fills N shares FOK, and at what
+average price", which is what the split → sell flow needs instead of a
+blind discount off Gamma's outcomePrices.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+# Snapshots older than this are refetched before pricing an order
+CLOB_BOOK_TTL = float(os.environ.get("CLOB_BOOK_TTL", "2"))
+
+# Max fraction below the reference price a FOK sell may fill at (0.10 = 10%)
+CLOB_MAX_SLIPPAGE = float(os.environ.get("CLOB_MAX_SLIPPAGE", "0.10"))
+
+
+@dataclass
+class BookSide:
+    """One side of a book: price → size (shares)."""
+
+    levels: dict[float, float]
+
+    def sorted(self, descending: bool) -> list[tuple[float, float]]:
+        return sorted(self.levels.items(), key=lambda lv: lv[0], reverse=descending)
+
+
+@dataclass
+class OrderBook:
+    """Cached book for one token."""
+
+    token_id: str
+    bids: BookSide
+    asks: BookSide
+    tick_size: Optional[str]
+    updated_at: float
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return max(self.bids.levels) if self.bids.levels else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return min(self.asks.levels) if self.asks.levels else None
+
+
+@dataclass
+class FillEstimate:
+    """Result of walking the book for a given size."""
+
+    side: str                 # "SELL" walks bids, "BUY" walks asks
+    size: float               # shares requested
+    filled: float             # shares the visible book can absorb (≤ size)
+    vwap: Optional[float]     # average fill price over `filled`
+    limit_price: Optional[float]  # worst level touched — the FOK limit that fills `size`
+    best_price: Optional[float]
+    levels_used: int
+
+    @property
+    def fully_filled(self) -> bool:
+        return self.filled + 1e-9 >= self.size
+
+    @property
+    def slippage(self) -> Optional[float]:
+        """Fractional distance of the limit price from the top of book."""
+        if self.limit_price is None or not self.best_price:
+            return None
+        return abs(self.best_price - self.limit_price) / self.best_price
+
+
+def walk_book(levels: list[tuple[float, float]], size: float, side: str) -> FillEstimate:
+    """Consume `levels` (best first) until `size` shares are filled."""
+    remaining = size
+    notional = 0.0
+    limit_price = None
+    used = 0
+    for price, level_size in levels:
+        if remaining <= 1e-9:
+            break
+        take = min(remaining, level_size)
+        notional += take * price
+        remaining -= take
+        limit_price = price
+        used += 1
+
+    filled = size - max(remaining, 0.0)
+    return FillEstimate(
+        side=side,
+        size=size,
+        filled=filled,
+        vwap=notional / filled if filled > 0 else None,
+        limit_price=limit_price,
+        best_price=levels[0][0] if levels else None,
+        levels_used=used,
+    )
+
+
+def quote_fok_sell(book: OrderBook, size: float, reference_price: float, max_slippage: float = None) -> tuple[Optional[FillEstimate], Optional[str]]:
+    """Price a FOK sell of `size` shares against the cached bids.
+
+    The limit is the worst bid level needed to fill the whole size. It is
+    rejected if it sits more than `max_slippage` below `reference_price`
+    (falling back to the best bid when no reference is known).
+
+    Returns:
+        Tuple of (estimate, error_message) — estimate is returned even on
+        error so callers can report the visible depth.
+    """
+    max_slippage = CLOB_MAX_SLIPPAGE if max_slippage is None else max_slippage
+    est = walk_book(book.bids.sorted(descending=True), size, "SELL")
+
+    if est.best_price is None:
+        return est, "No bids on the book"
+    if not est.fully_filled:
+        return est, f"Insufficient depth: book absorbs {est.filled:.2f} of {size:.2f} shares"
+
+    floor = (reference_price or est.best_price) * (1 - max_slippage)
+    if est.limit_price < floor:
+        return est, (
+            f"Fill needs limit ${est.limit_price:.3f} (VWAP ${est.vwap:.3f}), "
+            f"beyond {max_slippage:.0%} slippage cap (floor ${floor:.3f})"
+        )
+    return est, None
+
+
+class OrderBookCache:
+    """Per-token order books shared across agents."""
+
+    def __init__(self, ttl: float = None):
+        self.ttl = CLOB_BOOK_TTL if ttl is None else ttl
+        self._books: dict[str, OrderBook] = {}
+
+    def apply_snapshot(self, raw: dict) -> OrderBook:
+        """Replace a token's book with a GET /book (or websocket `book`) payload."""
+        book = OrderBook(
+            token_id=raw["asset_id"],
+            bids=BookSide({float(lv["price"]): float(lv["size"]) for lv in raw.get("bids") or []}),
+            asks=BookSide({float(lv["price"]): float(lv["size"]) for lv in raw.get("asks") or []}),
+            tick_size=raw.get("tick_size"),
+            updated_at=time.monotonic(),
+        )
+        self._books[book.token_id] = book
+        return book
+
+    def apply_delta(self, token_id: str, side: str, price: float, size: float) -> None:
+        """Set one level to its new absolute size (0 removes it). Ignored until a snapshot exists."""
+        book = self._books.get(token_id)
+        if book is None:
+            return
+        levels = (book.bids if side.upper() in ("BUY", "BID") else book.asks).levels
+        if size <= 0:
+            levels.pop(float(price), None)
+        else:
+            levels[float(price)] = float(size)
+        book.updated_at = time.monotonic()
+
+    def peek(self, token_id: str) -> Optional[OrderBook]:
+        """Cached book regardless of age."""
+        return self._books.get(token_id)
+
+    async def get(self, token_id: str, fetch: Callable[[str], Awaitable[dict]], max_age: float = None) -> OrderBook:
+        """Cached book if fresh enough, otherwise a new snapshot from `fetch`."""
+        max_age = self.ttl if max_age is None else max_age
+        book = self._books.get(token_id)
+        if book is not None and time.monotonic() - book.updated_at < max_age:
+            return book
+        return self.apply_snapshot(await fetch(token_id))
+
+    def invalidate(self, token_id: str) -> None:
+        self._books.pop(token_id, None)
+
+
+order_books = OrderBookCache()
@@ -0,0 +1,56 @@
+"""Keyset (cursor) pagination helpers.
+
+History lists are ordered by (created_at DESC, id DESC), and each page
+continues strictly after the last key of the previous one. A deep page is
+then the same index range scan as page one instead of an OFFSET that reads
+and discards every row before it. created_at is part of the key, so the
+queries leave out rows where it is NULL (only the older tables allow it).
+
+The cursor given to clients is that last key, base64url-encoded. It is
+opaque to them: pass back `nextCursor` unchanged to get the next page.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, str]]:
+    """(created_at, id) key from a cursor, None for the first page. 400 if malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(rows: list, limit: int, id_field: str) -> tuple[list, Optional[str]]:
+    """Split a `limit + 1` fetch into (page, next_cursor).
+
+    Fetching one extra row tells whether another page exists without a
+    COUNT; next_cursor is None on the last page.
+    """
+    page = rows[:limit]
+    if len(rows) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last["created_at"], last[id_field])
+
+
+async def estimate_count(conn, sql: str, *args) -> int:
+    """Planner's row estimate for `sql` (from table statistics — no rows are read)."""
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,126 @@
+"""
+Platform counters for the public /stats endpoint.
+
+The numbers live in the single-row platform_stats table, which row triggers
+on agents, trades and positions keep current (migration 0005). /stats reads
+that row through a short in-process cache, so an unauthenticated flood costs
+at most one primary-key read per STATS_CACHE_TTL per process. Concurrent
+cache misses share one read.
+
+A background loop recomputes the counters from the source tables every
+STATS_RECONCILE_INTERVAL_SECONDS and logs any drift it corrects (e.g. from
+rows changed while the triggers were disabled, or a restored backup). The
+full scans take no lock: one statement reads the counters and the source
+totals from the same snapshot, so their difference is the true drift
+whatever commits meanwhile. The drift is then added to the row
+(agents = agents + drift, ...), which keeps every trigger increment made
+during the scan.
+
+Env vars:
+  STATS_CACHE_TTL                    Seconds /stats is served from memory (default: 10)
+  STATS_RECONCILE_INTERVAL_SECONDS   Drift-correction interval (default: 3600)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from lib.database import bind_pool, get_pool
+
+log = logging.getLogger("platform_stats")
+
+STATS_CACHE_TTL = float(os.environ.get("STATS_CACHE_TTL", "10"))
+STATS_RECONCILE_INTERVAL = int(os.environ.get("STATS_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+_COUNTERS = ("agents", "trades", "volume_usd", "open_positions")
+
+
+def _to_stats(row) -> dict:
+    if row is None:
+        return {"agents": 0, "trades": 0, "volume_usd": 0.0, "open_positions": 0}
+    return {
+        "agents": int(row["agents"]),
+        "trades": int(row["trades"]),
+        "volume_usd": round(float(row["volume_usd"]), 2),
+        "open_positions": int(row["open_positions"]),
+    }
+
+
+class PlatformStatsCache:
+    """TTL cache over the platform_stats row, with single-flight refresh."""
+
+    def __init__(self, ttl: float = STATS_CACHE_TTL):
+        self.ttl = ttl
+        self._value: Optional[dict] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> dict:
+        if self._value is not None and time.monotonic() - self._fetched_at < self.ttl:
+            return self._value
+        async with self._lock:
+            # Another waiter may have refreshed while we queued on the lock
+            if self._value is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._value
+            row = await get_pool().fetchrow(
+                "SELECT agents, trades, volume_usd, open_positions FROM platform_stats WHERE id = 1"
+            )
+            self._value = _to_stats(row)
+            self._fetched_at = time.monotonic()
+            return self._value
+
+    def invalidate(self) -> None:
+        self._value = None
+
+
+platform_stats = PlatformStatsCache()
+
+
+async def reconcile_platform_stats() -> dict:
+    """Recompute the counters from source tables. Returns {counter: drift} for any that were off."""
+    pool = get_pool()
+    # One statement = one snapshot: source totals minus the counters as of that same moment
+    row = await pool.fetchrow(
+        """SELECT (SELECT COUNT(*) FROM agents) - COALESCE(s.agents, 0) AS agents,
+                  (SELECT COUNT(*) FROM trades WHERE status = 'executed') - COALESCE(s.trades, 0) AS trades,
+                  (SELECT COALESCE(SUM(amount_usd), 0) FROM trades WHERE status = 'executed')::float8
+                      - COALESCE(s.volume_usd, 0) AS volume_usd,
+                  (SELECT COUNT(*) FROM positions WHERE status = 'open') - COALESCE(s.open_positions, 0) AS open_positions
+           FROM (SELECT 1) AS one
+           LEFT JOIN platform_stats s ON s.id = 1"""
+    )
+    drift = {k: row[k] for k in _COUNTERS if abs(row[k]) > 0.005}
+    if not drift:
+        return {}
+
+    # Only the short increment takes the row lock; trigger updates queue behind it for a moment
+    await pool.execute(
+        """INSERT INTO platform_stats (id, agents, trades, volume_usd, open_positions, updated_at)
+           VALUES (1, $1, $2, $3, $4, NOW())
+           ON CONFLICT (id) DO UPDATE SET
+               agents = platform_stats.agents + EXCLUDED.agents,
+               trades = platform_stats.trades + EXCLUDED.trades,
+               volume_usd = platform_stats.volume_usd + EXCLUDED.volume_usd,
+               open_positions = platform_stats.open_positions + EXCLUDED.open_positions,
+               updated_at = EXCLUDED.updated_at""",
+        drift.get("agents", 0), drift.get("trades", 0), drift.get("volume_usd", 0.0), drift.get("open_positions", 0),
+    )
+    platform_stats.invalidate()
+    return {k: round(v, 2) if k == "volume_usd" else int(v) for k, v in drift.items()}
+
+
+async def start_platform_stats_reconciler() -> None:
+    """Background loop. First pass 120s after boot, then every STATS_RECONCILE_INTERVAL_SECONDS."""
+    bind_pool("background")
+    await asyncio.sleep(120)
+    log.info(f"[stats] platform_stats reconciler started — interval: {STATS_RECONCILE_INTERVAL}s")
+    while True:
+        try:
+            drift = await reconcile_platform_stats()
+            if drift:
+                log.warning(f"[stats] corrected platform_stats drift: {drift}")
+        except Exception as e:
+            log.error(f"[stats] reconcile error: {e}")
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL)
@@ -0,0 +1,172 @@
+"""Live P&L for an agent's positions.
+
+One read of the agent's positions (run alongside a SQL trade count), one
+batched price lookup for every open token, then a single pass that values
+each position and sums the totals. Latency is flat in the number of
+positions rather than one CLOB round-trip per position.
+
+Prices come from a shared TTL cache, so a dashboard polling several agents
+that hold the same tokens reuses the same quotes. Only missing or stale
+tokens are fetched, in chunks of PNL_PRICE_BATCH per request.
+
+Env vars:
+  PNL_PRICE_TTL     Seconds a token price is reused (default: 5)
+  PNL_PRICE_BATCH   Token ids per price request (default: 100)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from lib.gamma_client import GammaClient
+from lib.position_storage import PositionStorage, TradeStorage
+
+log = logging.getLogger("pnl")
+
+PNL_PRICE_TTL = float(os.environ.get("PNL_PRICE_TTL", "5"))
+PNL_PRICE_BATCH = int(os.environ.get("PNL_PRICE_BATCH", "100"))
+
+
+def _as_price(value) -> Optional[float]:
+    """CLOB /prices returns either a bare price or {"BUY": x, "SELL": y}; the latter is marked at mid."""
+    if isinstance(value, dict):
+        sides = [float(v) for v in value.values() if v not in (None, "")]
+        return sum(sides) / len(sides) if sides else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PriceCache:
+    """token_id → (price, fetched_at), refreshed in batches."""
+
+    def __init__(self, ttl: float = None, gamma: GammaClient = None):
+        self.ttl = PNL_PRICE_TTL if ttl is None else ttl
+        self._gamma = gamma or GammaClient()
+        self._prices: dict[str, tuple[float, float]] = {}
+
+    def peek(self, token_id: str) -> Optional[float]:
+        """Cached price regardless of age."""
+        entry = self._prices.get(token_id)
+        return entry[0] if entry else None
+
+    def put(self, token_id: str, price: float) -> None:
+        self._prices[token_id] = (price, time.monotonic())
+
+    async def get_many(self, token_ids: list[str]) -> dict[str, float]:
+        """Prices for `token_ids`, fetching only missing/stale ones. Tokens without a quote are omitted."""
+        now = time.monotonic()
+        stale = sorted({t for t in token_ids if t not in self._prices or now - self._prices[t][1] >= self.ttl})
+        if stale:
+            chunks = [stale[i:i + PNL_PRICE_BATCH] for i in range(0, len(stale), PNL_PRICE_BATCH)]
+            results = await asyncio.gather(*[self._gamma.get_prices(c) for c in chunks], return_exceptions=True)
+            for chunk, result in zip(chunks, results):
+                if isinstance(result, Exception):
+                    log.warning(f"[pnl] price fetch for {len(chunk)} tokens failed: {result}")
+                    continue
+                for token_id, raw in result.items():
+                    price = _as_price(raw)
+                    if price is not None:
+                        self.put(token_id, price)
+        # Fall back to the last known price when a refresh failed
+        return {t: self._prices[t][0] for t in token_ids if t in self._prices}
+
+
+price_cache = PriceCache()
+
+
+@dataclass
+class PositionValue:
+    """One position with its live valuation (None fields when it can't be priced)."""
+
+    row: dict
+    current_price: Optional[float]
+    current_value: float
+    pnl_usd: Optional[float]
+    pnl_pct: Optional[float]
+
+
+@dataclass
+class AgentPnL:
+    agent_id: str
+    positions: list[PositionValue]
+    total_invested: float
+    total_current_value: float
+    total_pnl_usd: float
+    total_pnl_pct: float
+    open_positions: int
+    total_trades: int
+
+
+def _is_priceable(row: dict) -> bool:
+    return row.get("status") == "open" and bool(row.get("token_id")) and (row.get("entry_price") or 0) > 0
+
+
+def cost_basis(row: dict) -> float:
+    """Net USDC paid for a position: shares × entry_price once shares are known, else entry_amount.
+
+    For a split, entry_amount is the gross USDC split and still includes what
+    selling the unwanted leg recovered. entry_price is the net price per share
+    (lib/order_reconciler.py), so shares × entry_price is the cost of the
+    tokens actually held.
+    """
+    shares = row.get("shares")
+    entry = row.get("entry_price") or 0
+    if shares and entry > 0:
+        return shares * entry
+    return float(row.get("entry_amount") or 0)
+
+
+def value_positions(rows: list[dict], prices: dict[str, float]) -> list[PositionValue]:
+    """Value every position in one pass.
+
+    Closed positions with a recorded payout are valued at it; other closed
+    or unpriced positions are carried at cost. Cost is cost_basis().
+    """
+    out = []
+    for row in rows:
+        amount = cost_basis(row)
+        entry = row.get("entry_price") or 0
+        price = prices.get(row["token_id"]) if _is_priceable(row) else None
+        if price is not None and amount > 0:
+            # On-chain share count once the position reconciler has seen it
+            shares = row["shares"] if row.get("shares") is not None else amount / entry
+            value = shares * price
+            pnl = round(value - amount, 2)
+            out.append(PositionValue(row, price, value, pnl, round(pnl / amount * 100, 2)))
+        elif row.get("status") != "open" and row.get("payout_usd") is not None and amount > 0:
+            # Redeemed or exited: valued at what it actually returned
+            pnl = round(row["payout_usd"] - amount, 2)
+            out.append(PositionValue(row, None, row["payout_usd"], pnl, round(pnl / amount * 100, 2)))
+        else:
+            out.append(PositionValue(row, price, amount, None, None))
+    return out
+
+
+async def compute_agent_pnl(agent_id: str) -> AgentPnL:
+    """Positions + trade count (concurrently), one batched price lookup, one valuation pass."""
+    rows, total_trades = await asyncio.gather(
+        PositionStorage().get_by_agent(agent_id),
+        TradeStorage().count_by_agent(agent_id),
+    )
+    open_tokens = [r["token_id"] for r in rows if _is_priceable(r)]
+    prices = await price_cache.get_many(open_tokens) if open_tokens else {}
+    values = value_positions(rows, prices)
+
+    invested = sum(cost_basis(v.row) for v in values)
+    current = sum(v.current_value for v in values)
+    pnl_usd = round(current - invested, 2)
+    return AgentPnL(
+        agent_id=agent_id,
+        positions=values,
+        total_invested=round(invested, 2),
+        total_current_value=round(current, 2),
+        total_pnl_usd=pnl_usd,
+        total_pnl_pct=round(pnl_usd / invested * 100, 2) if invested > 0 else 0.0,
+        open_positions=len(open_tokens),
+        total_trades=total_trades,
+    )
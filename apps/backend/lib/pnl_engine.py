@@ -0,0 +1,269 @@
+"""
+Incremental in-memory P&L engine.
+
+lib/pnl.py values an agent from scratch on every read. This engine instead
+keeps every agent's open positions in flat arrays (token, shares, cost,
+last mark) and reacts to price changes. A new price for a token touches
+only the positions holding that token, adjusting their agent's and owner's
+unrealized P&L by shares × Δprice. Agent and user totals are then plain
+dictionary reads.
+
+Positions that are no longer open have a fixed value, exactly as lib/pnl.py
+treats them. The value is their payout when one was recorded (redemption
+or exit), otherwise their cost; the same applies to positions without a
+token or entry price. Cost is lib.pnl.cost_basis(), the net cost of the
+shares held. An open position whose token has no price yet is carried at
+cost until its first mark arrives.
+
+Inputs:
+  - rebuild() loads every position from Postgres. It runs at boot and every
+    PNL_ENGINE_REBUILD_SECONDS, which also picks up writes made by other
+    replicas and clears floating-point drift
+  - PositionStorage add/status changes and the order reconciler's
+    cost-basis updates call reload_positions() for just those rows
+  - the engine loop prices every held token through lib.pnl.price_cache
+    every PNL_ENGINE_INTERVAL_SECONDS and feeds changes to on_price()
+
+Env vars:
+  PNL_ENGINE_INTERVAL_SECONDS   Price poll interval (default: 10)
+  PNL_ENGINE_REBUILD_SECONDS    Full rebuild interval (default: 600)
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from array import array
+from collections import defaultdict
+from typing import Optional
+
+from lib.database import bind_pool, get_pool
+from lib.pnl import cost_basis, price_cache
+
+log = logging.getLogger("pnl_engine")
+
+PNL_ENGINE_INTERVAL = float(os.environ.get("PNL_ENGINE_INTERVAL_SECONDS", "10"))
+PNL_ENGINE_REBUILD = float(os.environ.get("PNL_ENGINE_REBUILD_SECONDS", "600"))
+
+_NAN = float("nan")
+
+_POSITIONS_SQL = """
+    SELECT p.position_id, p.agent_id, p.token_id, p.status, p.entry_amount, p.entry_price, p.shares,
+           p.payout_usd, a.owner_id
+    FROM positions p
+    JOIN agents a ON a.agent_id = p.agent_id
+"""
+
+
+class _AgentBook:
+    """One agent's marked positions as parallel arrays, plus running totals."""
+
+    __slots__ = ("owner_id", "position_ids", "tokens", "shares", "cost", "mark", "slot", "fixed", "invested", "pnl")
+
+    def __init__(self, owner_id: Optional[str]):
+        self.owner_id = owner_id
+        self.position_ids: list[str] = []
+        self.tokens: list[str] = []
+        self.shares = array("d")
+        self.cost = array("d")
+        self.mark = array("d")              # NaN until the token has a price
+        self.slot: dict[str, int] = {}      # position_id → index in the arrays
+        self.fixed: dict[str, tuple[float, float]] = {}  # position_id → (cost, pnl) for unmarked positions
+        self.invested = 0.0
+        self.pnl = 0.0                      # marked open positions + fixed ones
+
+
+class PnLEngine:
+    """Agent and user P&L totals maintained incrementally from price updates."""
+
+    def __init__(self):
+        self._reset()
+        self.built_at: Optional[float] = None
+
+    def _reset(self) -> None:
+        self._books: dict[str, _AgentBook] = {}
+        self._holders: dict[str, set[tuple[str, str]]] = defaultdict(set)  # token → {(agent_id, position_id)}
+        self._user_agents: dict[str, set[str]] = defaultdict(set)
+        self._user_invested: dict[str, float] = defaultdict(float)
+        self._user_pnl: dict[str, float] = defaultdict(float)
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    # ── Position bookkeeping ─────────────────────────────────────────────────
+
+    def _bump(self, book: _AgentBook, invested: float = 0.0, pnl: float = 0.0) -> None:
+        book.invested += invested
+        book.pnl += pnl
+        if book.owner_id:
+            self._user_invested[book.owner_id] += invested
+            self._user_pnl[book.owner_id] += pnl
+
+    def _book(self, agent_id: str, owner_id: Optional[str]) -> _AgentBook:
+        book = self._books.get(agent_id)
+        if book is None:
+            book = self._books[agent_id] = _AgentBook(owner_id)
+            if owner_id:
+                self._user_agents[owner_id].add(agent_id)
+        return book
+
+    def upsert(self, row: dict, owner_id: Optional[str] = None, mark: Optional[float] = None) -> None:
+        """Add or replace one position (a positions row). `mark` seeds its price if known."""
+        agent_id = row.get("agent_id")
+        if not agent_id:
+            return
+        self.remove(agent_id, row["position_id"])
+        existing = self._books.get(agent_id)
+        book = self._book(agent_id, owner_id if owner_id is not None else (existing.owner_id if existing else None))
+
+        amount = cost_basis(row)
+        entry = float(row.get("entry_price") or 0)
+        token_id = row.get("token_id")
+        if row.get("status") != "open" or not token_id or entry <= 0:
+            payout = row.get("payout_usd")
+            pnl = float(payout) - amount if payout is not None else 0.0
+            book.fixed[row["position_id"]] = (amount, pnl)
+            self._bump(book, invested=amount, pnl=pnl)
+            return
+
+        book.slot[row["position_id"]] = len(book.position_ids)
+        book.position_ids.append(row["position_id"])
+        book.tokens.append(token_id)
+        book.shares.append(row["shares"] if row.get("shares") is not None else amount / entry)
+        book.cost.append(amount)
+        book.mark.append(_NAN)
+        self._holders[token_id].add((agent_id, row["position_id"]))
+        self._bump(book, invested=amount)
+        if mark is not None:
+            self._mark(book, book.slot[row["position_id"]], mark)
+
+    def remove(self, agent_id: str, position_id: str) -> None:
+        book = self._books.get(agent_id)
+        if book is None:
+            return
+        if position_id in book.fixed:
+            cost, pnl = book.fixed.pop(position_id)
+            self._bump(book, invested=-cost, pnl=-pnl)
+            return
+        i = book.slot.pop(position_id, None)
+        if i is None:
+            return
+
+        unrealized = 0.0 if math.isnan(book.mark[i]) else book.shares[i] * book.mark[i] - book.cost[i]
+        self._bump(book, invested=-book.cost[i], pnl=-unrealized)
+        token_id = book.tokens[i]
+        self._holders[token_id].discard((agent_id, position_id))
+        if not self._holders[token_id]:
+            del self._holders[token_id]
+
+        # Swap-remove: move the last slot into i
+        last = len(book.position_ids) - 1
+        if i != last:
+            for arr in (book.position_ids, book.tokens, book.shares, book.cost, book.mark):
+                arr[i] = arr[last]
+            book.slot[book.position_ids[i]] = i
+        for arr in (book.position_ids, book.tokens, book.shares, book.cost, book.mark):
+            arr.pop()
+
+    # ── Prices ───────────────────────────────────────────────────────────────
+
+    def _mark(self, book: _AgentBook, i: int, price: float) -> None:
+        old = book.mark[i]
+        delta = book.shares[i] * price - (book.cost[i] if math.isnan(old) else book.shares[i] * old)
+        book.mark[i] = price
+        if delta:
+            self._bump(book, pnl=delta)
+
+    def on_price(self, token_id: str, price: float) -> int:
+        """Apply a new price for one token. Returns positions re-marked."""
+        holders = self._holders.get(token_id)
+        if not holders:
+            return 0
+        for agent_id, position_id in holders:
+            book = self._books[agent_id]
+            self._mark(book, book.slot[position_id], price)
+        return len(holders)
+
+    def tokens(self) -> list[str]:
+        """Every token currently held in an open position."""
+        return list(self._holders)
+
+    # ── Reads (O(1)) ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _summary(invested: float, pnl: float) -> dict:
+        pnl = round(pnl, 2)
+        return {
+            "total_invested": round(invested, 2),
+            "total_current_value": round(invested + pnl, 2),
+            "total_pnl_usd": pnl,
+            "total_pnl_pct": round(pnl / invested * 100, 2) if invested > 0 else 0.0,
+        }
+
+    def agent_totals(self, agent_id: str) -> dict:
+        book = self._books.get(agent_id)
+        if book is None:
+            return {**self._summary(0.0, 0.0), "open_positions": 0}
+        return {**self._summary(book.invested, book.pnl), "open_positions": len(book.position_ids)}
+
+    def open_value(self, agent_id: str) -> float:
+        """Marked value of the agent's open positions (unpriced ones at cost)."""
+        book = self._books.get(agent_id)
+        if book is None:
+            return 0.0
+        return sum(c if math.isnan(m) else s * m for s, c, m in zip(book.shares, book.cost, book.mark))
+
+    def user_totals(self, user_id: str) -> dict:
+        return self._summary(self._user_invested.get(user_id, 0.0), self._user_pnl.get(user_id, 0.0))
+
+    def user_agents(self, user_id: str) -> list[str]:
+        return sorted(self._user_agents.get(user_id, ()))
+
+    # ── Loading ──────────────────────────────────────────────────────────────
+
+    async def rebuild(self) -> int:
+        """Reload every position from Postgres, keeping known prices as marks."""
+        rows = await get_pool().fetch(_POSITIONS_SQL)
+        self._reset()
+        for r in rows:
+            row = dict(r)
+            self.upsert(row, owner_id=row["owner_id"], mark=price_cache.peek(row["token_id"]) if row["token_id"] else None)
+        self.built_at = time.monotonic()
+        return len(rows)
+
+    async def reload_positions(self, position_ids: list[str]) -> None:
+        """Re-read specific positions after a write (new position, status or cost-basis change)."""
+        if not self.ready or not position_ids:
+            return
+        rows = await get_pool().fetch(_POSITIONS_SQL + " WHERE p.position_id = ANY($1)", list(position_ids))
+        for r in rows:
+            row = dict(r)
+            self.upsert(row, owner_id=row["owner_id"], mark=price_cache.peek(row["token_id"]) if row["token_id"] else None)
+
+    async def refresh_prices(self) -> int:
+        """Price every held token (batched, via the shared cache) and apply the changes."""
+        tokens = self.tokens()
+        if not tokens:
+            return 0
+        prices = await price_cache.get_many(tokens)
+        return sum(self.on_price(t, p) for t, p in prices.items())
+
+
+pnl_engine = PnLEngine()
+
+
+async def start_pnl_engine() -> None:
+    """Background loop: build at boot, re-mark every PNL_ENGINE_INTERVAL_SECONDS, rebuild periodically."""
+    bind_pool("background")
+    log.info(f"[pnl] engine started — prices every {PNL_ENGINE_INTERVAL:.0f}s, rebuild every {PNL_ENGINE_REBUILD:.0f}s")
+    while True:
+        try:
+            if not pnl_engine.ready or time.monotonic() - pnl_engine.built_at >= PNL_ENGINE_REBUILD:
+                n = await pnl_engine.rebuild()
+                log.info(f"[pnl] rebuilt from {n} positions")
+            await pnl_engine.refresh_prices()
+        except Exception as e:
+            log.error(f"[pnl] engine error: {e}")
+        await asyncio.sleep(PNL_ENGINE_INTERVAL)
@@ -0,0 +1,206 @@
+"""
+On-chain position reconciler — corrects positions from real CTF balances.
+
+Positions are written optimistically at trade time. entry_amount /
+entry_price only approximates the token count, and sells or redemptions
+made outside the API are never recorded. One background loop, per cycle:
+
+  1. Loads every open position that should already hold tokens (older than
+     POSITION_RECONCILE_GRACE_SECONDS; pure CLOB buys only once filled)
+  2. Dedupes them into (Safe, token_id) pairs. Each agent's outcome tokens
+     live in its Polymarket Safe
+  3. Reads all pairs with ERC-1155 balanceOfBatch, CTF_BALANCE_BATCH pairs
+     per call, and packs those calls into Multicall3 aggregate3 eth_calls
+     (lib/multicall.py). 10,000 positions are 50 balanceOfBatch calls,
+     i.e. one or two RPC round-trips
+  4. Splits each pair's balance across the positions sharing it, in
+     proportion to their expected size. A zero balance closes the position
+  5. Writes every changed shares / status in one UPDATE ... FROM unnest()
+     and reloads those rows into the P&L engine
+
+A pair whose batch reverted is left untouched for the cycle. The write only
+touches rows that are still 'open', so a position an exit or the
+resolution watcher took over during the read keeps their status.
+
+Each cycle first returns exit claims ('closing') older than
+POSITION_CLOSING_TIMEOUT_SECONDS to 'open'. Their exit died mid-request,
+and the on-chain balance then decides what happens to the position.
+
+Env vars:
+  POSITION_RECONCILE_INTERVAL_SECONDS  Loop interval (default: 300)
+  POSITION_RECONCILE_GRACE_SECONDS     Skip positions younger than this (default: 300)
+  POSITION_CLOSING_TIMEOUT_SECONDS     Reopen exit claims older than this (default: 600)
+  CTF_BALANCE_BATCH                    (owner, id) pairs per balanceOfBatch (default: 200)
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Optional
+
+from eth_abi import decode as abi_decode
+from web3 import Web3
+
+from lib.contracts import CONTRACTS, CTF_ABI, derive_polymarket_safe
+from lib.database import bind_pool, get_pool
+from lib.multicall import aggregate, rpc_calls
+from lib.pnl_engine import pnl_engine
+
+log = logging.getLogger("position_reconciler")
+
+RECONCILE_INTERVAL = int(os.environ.get("POSITION_RECONCILE_INTERVAL_SECONDS", "300"))
+RECONCILE_GRACE = int(os.environ.get("POSITION_RECONCILE_GRACE_SECONDS", "300"))
+CLOSING_TIMEOUT = int(os.environ.get("POSITION_CLOSING_TIMEOUT_SECONDS", "600"))
+BALANCE_BATCH = int(os.environ.get("CTF_BALANCE_BATCH", "200"))
+
+CTF_DECIMALS = 10**6
+# Below one base unit a share difference is noise
+_SHARE_EPS = 1 / CTF_DECIMALS
+
+
+def read_ctf_balances(w3: Web3, pairs: list[tuple[str, str]]) -> dict[tuple[str, str], int]:
+    """Raw CTF balances for (owner, token_id) pairs via balanceOfBatch + Multicall3 (blocking).
+
+    Pairs in a batch that reverted are missing from the result.
+    """
+    ctf = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI)
+    chunks = [pairs[i:i + BALANCE_BATCH] for i in range(0, len(pairs), BALANCE_BATCH)]
+    calls = []
+    for chunk in chunks:
+        data = ctf.encode_abi(
+            "balanceOfBatch",
+            args=[[Web3.to_checksum_address(o) for o, _ in chunk], [int(t) for _, t in chunk]],
+        )
+        calls.append((CONTRACTS["CTF"], bytes.fromhex(data[2:])))
+
+    out: dict[tuple[str, str], int] = {}
+    for chunk, result in zip(chunks, aggregate(w3, calls)):
+        if result is None:
+            log.warning(f"[positions] balanceOfBatch for {len(chunk)} pairs reverted")
+            continue
+        (balances,) = abi_decode(["uint256[]"], result)
+        out.update(zip(chunk, balances))
+    return out
+
+
+def _expected_shares(row: dict) -> float:
+    if row.get("shares") is not None:
+        return row["shares"]
+    entry = row.get("entry_price") or 0
+    return (row.get("entry_amount") or 0) / entry if entry > 0 else 0.0
+
+
+def allocate_shares(rows: list[dict], raw_balance: int) -> list[float]:
+    """Split one (Safe, token) balance across the positions sharing it, pro rata to expected size."""
+    onchain = raw_balance / CTF_DECIMALS
+    expected = [_expected_shares(r) for r in rows]
+    total = sum(expected)
+    return [onchain * exp / total if total > 0 else onchain / len(rows) for exp in expected]
+
+
+def plan_updates(
+    groups: dict[tuple[str, str], list[dict]], balances: dict[tuple[str, str], int]
+) -> list[tuple[str, float, str]]:
+    """(position_id, shares, status) for every position whose on-chain size differs from the stored one."""
+    updates = []
+    for key, rows in groups.items():
+        raw = balances.get(key)
+        if raw is None:
+            continue
+        for row, shares in zip(rows, allocate_shares(rows, raw)):
+            if shares < _SHARE_EPS:
+                updates.append((row["position_id"], 0.0, "closed"))
+            elif row.get("shares") is None or abs(shares - row["shares"]) >= _SHARE_EPS:
+                updates.append((row["position_id"], shares, "open"))
+    return updates
+
+
+async def release_stale_claims() -> list[str]:
+    """Return positions stuck in 'closing' past CLOSING_TIMEOUT to 'open'. Returns their ids."""
+    rows = await get_pool().fetch(
+        """
+        UPDATE positions SET status = 'open', closing_at = NULL
+        WHERE status = 'closing' AND closing_at < NOW() - make_interval(secs => $1)
+        RETURNING position_id
+        """,
+        CLOSING_TIMEOUT,
+    )
+    ids = [r["position_id"] for r in rows]
+    if ids:
+        log.warning(f"[positions] reopened {len(ids)} position(s) left 'closing' by an interrupted exit")
+        await pnl_engine.reload_positions(ids)
+    return ids
+
+
+async def run_position_reconcile(rpc_url: Optional[str] = None) -> dict:
+    """Reconcile every open position against chain once. Returns summary counters."""
+    rpc_url = rpc_url or os.environ.get("CHAINSTACK_NODE", "")
+    summary = {"positions": 0, "pairs": 0, "rpc_calls": 0, "updated": 0, "closed": 0, "released": 0}
+    summary["released"] = len(await release_stale_claims())
+    if not rpc_url:
+        return summary
+
+    pool = get_pool()
+    rows = await pool.fetch(
+        """
+        SELECT p.position_id, p.token_id, p.entry_amount, p.entry_price, p.shares,
+               a.wallet_address, a.polygon_safe
+        FROM positions p
+        JOIN agents a ON a.agent_id = p.agent_id
+        WHERE p.status = 'open'
+          AND p.token_id IS NOT NULL
+          AND p.created_at < NOW() - make_interval(secs => $1)
+          AND (p.split_tx IS NOT NULL OR p.clob_filled)
+        """,
+        RECONCILE_GRACE,
+    )
+    summary["positions"] = len(rows)
+    if not rows:
+        return summary
+
+    groups: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for r in rows:
+        safe = r["polygon_safe"] or derive_polymarket_safe(r["wallet_address"])
+        groups[(safe.lower(), r["token_id"])].append(dict(r))
+    pairs = list(groups)
+    summary["pairs"] = len(pairs)
+    summary["rpc_calls"] = rpc_calls(-(-len(pairs) // BALANCE_BATCH))
+
+    w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 30}))
+    balances = await asyncio.get_running_loop().run_in_executor(None, read_ctf_balances, w3, pairs)
+
+    updates = plan_updates(groups, balances)
+    updated = []
+    if updates:
+        ids, shares, statuses = (list(col) for col in zip(*updates))
+        # Rows an exit claimed ('closing') or the resolution watcher settled since the read are left alone
+        updated = await pool.fetch(
+            """
+            UPDATE positions p
+            SET shares = u.shares, status = u.status, reconciled_at = NOW()
+            FROM unnest($1::text[], $2::float8[], $3::text[]) AS u(position_id, shares, status)
+            WHERE p.position_id = u.position_id AND p.status = 'open'
+            RETURNING p.position_id, p.status
+            """,
+            ids, shares, statuses,
+        )
+        await pnl_engine.reload_positions([r["position_id"] for r in updated])
+    summary["updated"] = len(updated)
+    summary["closed"] = sum(1 for r in updated if r["status"] == "closed")
+    return summary
+
+
+async def start_position_reconciler() -> None:
+    """Background loop. Starts 90s after boot, then every POSITION_RECONCILE_INTERVAL_SECONDS."""
+    bind_pool("background")
+    await asyncio.sleep(90)
+    log.info(f"[positions] on-chain reconciler started — interval: {RECONCILE_INTERVAL}s")
+    while True:
+        try:
+            summary = await run_position_reconcile()
+            if summary["updated"] or summary["released"]:
+                log.info(f"[positions] {summary}")
+        except Exception as e:
+            log.error(f"[positions] reconcile error: {e}")
+        await asyncio.sleep(RECONCILE_INTERVAL)
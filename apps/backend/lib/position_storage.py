@@ -30,13 +30,20 @@ class PositionEntry:
     clob_filled: bool = False
 
     # Status
-    status: str = "open"  # open, closed, resolved
+    status: str = "open"  # open, closing, closed, resolved
     notes: Optional[str] = None
 
     # Agent link
     agent_id: Optional[str] = None
 
 
+async def _sync_pnl_engine(*position_ids: str) -> None:
+    """Push position writes into the in-memory P&L engine (lib/pnl_engine.py)."""
+    from lib.pnl_engine import pnl_engine
+
+    await pnl_engine.reload_positions(list(position_ids))
+
+
 class PositionStorage:
     """PostgreSQL-backed position storage."""
 
@@ -66,6 +73,7 @@ class PositionStorage:
             entry.notes,
             datetime.fromisoformat(entry.entry_time) if entry.entry_time else datetime.now(timezone.utc),
         )
+        await _sync_pnl_engine(entry.position_id)
 
     async def get(self, position_id: str) -> Optional[dict]:
         """Get position by ID."""
@@ -102,6 +110,7 @@ class PositionStorage:
             status,
             position_id,
         )
+        await _sync_pnl_engine(position_id)
         return result == "UPDATE 1"
 
     async def update_notes(self, position_id: str, notes: str) -> bool:
@@ -161,16 +170,37 @@ class TradeStorage:
             error,
         )
 
-    async def get_by_agent(self, agent_id: str, limit: int = 50) -> list[dict]:
-        """Get trade history for an agent."""
+    async def get_by_agent(self, agent_id: str, limit: int = 50, before: tuple[datetime, str] = None) -> list[dict]:
+        """Get trade history for an agent, newest first.
+
+        `before` is a (created_at, trade_id) key from lib/pagination.py —
+        only trades strictly older than it are returned. Trades without a
+        created_at have no key and are left out.
+        """
         pool = get_pool()
-        rows = await pool.fetch(
-            "SELECT * FROM trades WHERE agent_id = $1 ORDER BY created_at DESC LIMIT $2",
-            agent_id,
-            limit,
-        )
+        if before:
+            rows = await pool.fetch(
+                """SELECT * FROM trades
+                   WHERE agent_id = $1 AND created_at IS NOT NULL AND (created_at, trade_id) < ($2, $3)
+                   ORDER BY created_at DESC, trade_id DESC LIMIT $4""",
+                agent_id,
+                *before,
+                limit,
+            )
+        else:
+            rows = await pool.fetch(
+                """SELECT * FROM trades WHERE agent_id = $1 AND created_at IS NOT NULL
+                   ORDER BY created_at DESC, trade_id DESC LIMIT $2""",
+                agent_id,
+                limit,
+            )
         return [dict(r) for r in rows]
 
+    async def count_by_agent(self, agent_id: str) -> int:
+        """Number of trades recorded for an agent."""
+        pool = get_pool()
+        return await pool.fetchval("SELECT COUNT(*) FROM trades WHERE agent_id = $1", agent_id)
+
     async def get_trade(self, trade_id: str) -> Optional[dict]:
         """Get single trade by ID."""
         pool = get_pool()
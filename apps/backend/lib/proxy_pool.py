@@ -0,0 +1,223 @@
+"""Health-scored egress pool for CLOB traffic.
+
+Cloudflare blocks individual exit IPs, so instead of one HTTPS_PROXY that
+gets torn down and re-dialled on every 403, keep a warm HTTP/2 client per
+proxy and route each request through the healthiest one.
+
+Exits are scored by smoothed success rate over EWMA latency. An exit that
+gets a Cloudflare block is quarantined with exponential backoff and
+comes back automatically once it expires. Its connections are dropped too,
+so a single rotating gateway still gets a fresh IP on the next dial.
+
+Configure with CLOB_PROXIES (comma-separated URLs). Falls back to
+HTTPS_PROXY / HTTP_PROXY, and to a direct connection when neither is set.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+# Base quarantine after a block; doubles per consecutive block up to the max
+PROXY_QUARANTINE_SECONDS = float(os.environ.get("PROXY_QUARANTINE_SECONDS", "60"))
+PROXY_QUARANTINE_MAX_SECONDS = float(os.environ.get("PROXY_QUARANTINE_MAX_SECONDS", "1800"))
+
+# Weight of the newest sample in the latency EWMA
+_LATENCY_ALPHA = 0.2
+
+
+def _configured_proxies() -> list[Optional[str]]:
+    raw = os.environ.get("CLOB_PROXIES", "")
+    proxies = [p.strip() for p in raw.split(",") if p.strip()]
+    if not proxies:
+        single = os.environ.get("HTTPS_PROXY") or os.environ.get("HTTP_PROXY")
+        proxies = [single] if single else []
+    return proxies or [None]
+
+
+def _redact(url: Optional[str]) -> str:
+    """Hide proxy credentials in metrics/logs."""
+    if not url:
+        return "direct"
+    if "@" in url:
+        scheme, _, rest = url.partition("://")
+        return f"{scheme}://***@{rest.split('@', 1)[1]}"
+    return url
+
+
+@dataclass
+class ProxyExit:
+    """One egress route and its health counters."""
+
+    url: Optional[str]
+    client: Optional[httpx.AsyncClient] = None
+    successes: int = 0
+    failures: int = 0
+    blocks: int = 0
+    consecutive_blocks: int = 0
+    latency_ms: Optional[float] = None
+    quarantined_until: float = 0.0
+    in_flight: int = 0
+    last_error: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+    @property
+    def score(self) -> float:
+        """Laplace-smoothed success rate over latency (seconds); higher is better."""
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        latency_s = (self.latency_ms or 500.0) / 1000
+        return success_rate / (1 + latency_s) / (1 + 0.1 * self.in_flight)
+
+
+class ProxyPool:
+    """Warm httpx clients per proxy, picked by health score."""
+
+    def __init__(self, proxies: list[Optional[str]] = None):
+        self.exits = [ProxyExit(url=p) for p in (proxies or _configured_proxies())]
+
+    @property
+    def proxied(self) -> bool:
+        """True if any exit goes through a proxy (i.e. a retry can change IP)."""
+        return any(e.url for e in self.exits)
+
+    def _client(self, exit: ProxyExit) -> httpx.AsyncClient:
+        if exit.client is None or exit.client.is_closed:
+            exit.client = httpx.AsyncClient(
+                http2=True,
+                proxy=exit.url,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={
+                    "User-Agent": "py_clob_client",
+                    "Accept": "*/*",
+                    "Content-Type": "application/json",
+                },
+            )
+        return exit.client
+
+    def acquire(self) -> tuple[ProxyExit, httpx.AsyncClient]:
+        """Best healthy exit — or, if every exit is quarantined, the one released soonest."""
+        healthy = [e for e in self.exits if not e.quarantined]
+        if healthy:
+            exit = max(healthy, key=lambda e: e.score)
+        else:
+            exit = min(self.exits, key=lambda e: e.quarantined_until)
+        return exit, self._client(exit)
+
+    def report(self, exit: ProxyExit, ok: bool, latency_ms: float = None, blocked: bool = False, error: str = None) -> None:
+        """Record the outcome of one request made through `exit`."""
+        if latency_ms is not None:
+            exit.latency_ms = latency_ms if exit.latency_ms is None else (
+                _LATENCY_ALPHA * latency_ms + (1 - _LATENCY_ALPHA) * exit.latency_ms
+            )
+        if ok:
+            exit.successes += 1
+            exit.consecutive_blocks = 0
+            return
+
+        exit.failures += 1
+        exit.last_error = error
+        if blocked:
+            exit.blocks += 1
+            exit.consecutive_blocks += 1
+            backoff = min(
+                PROXY_QUARANTINE_SECONDS * 2 ** (exit.consecutive_blocks - 1),
+                PROXY_QUARANTINE_MAX_SECONDS,
+            )
+            exit.quarantined_until = time.monotonic() + backoff
+            self._retire_client(exit)
+            print(f"[PROXY] {_redact(exit.url)} blocked — quarantined {backoff:.0f}s")
+
+    def _retire_client(self, exit: ProxyExit) -> None:
+        """Drop the exit's connections so a rotating gateway hands out a new IP on redial.
+
+        The old client is closed after a grace period so requests still in
+        flight on it can finish.
+        """
+        old, exit.client = exit.client, None
+        if old is not None:
+            asyncio.get_running_loop().call_later(30, lambda: asyncio.ensure_future(old.aclose()))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send through the best exit and score it.
+
+        A 403 whose body looks like Cloudflare counts as a block; any other
+        non-5xx response counts as a healthy exit, since the proxy did its job.
+        """
+        exit, client = self.acquire()
+        exit.in_flight += 1
+        start = time.monotonic()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.RequestError as e:
+            self.report(exit, ok=False, error=str(e))
+            raise
+        finally:
+            exit.in_flight -= 1
+
+        latency_ms = (time.monotonic() - start) * 1000
+        if resp.status_code == 403 and _looks_blocked(resp):
+            self.report(exit, ok=False, latency_ms=latency_ms, blocked=True, error="cloudflare 403")
+        elif resp.status_code >= 500:
+            self.report(exit, ok=False, latency_ms=latency_ms, error=f"HTTP {resp.status_code}")
+        else:
+            self.report(exit, ok=True, latency_ms=latency_ms)
+        return resp
+
+    async def warm(self, url: str) -> None:
+        """Open a connection on every exit so the first order skips the TLS handshake."""
+        async def _ping(exit: ProxyExit):
+            start = time.monotonic()
+            try:
+                await self._client(exit).get(url)
+                self.report(exit, ok=True, latency_ms=(time.monotonic() - start) * 1000)
+            except httpx.RequestError as e:
+                self.report(exit, ok=False, error=str(e))
+
+        await asyncio.gather(*[_ping(e) for e in self.exits])
+
+    async def aclose(self) -> None:
+        for exit in self.exits:
+            if exit.client is not None:
+                await exit.client.aclose()
+                exit.client = None
+
+    def metrics(self) -> dict:
+        """Per-exit health for /health/proxies."""
+        now = time.monotonic()
+        exits = []
+        for e in self.exits:
+            total = e.successes + e.failures
+            exits.append({
+                "exit": _redact(e.url),
+                "score": round(e.score, 4),
+                "requests": total,
+                "success_rate": round(e.successes / total, 4) if total else None,
+                "latency_ms": round(e.latency_ms, 1) if e.latency_ms is not None else None,
+                "blocks": e.blocks,
+                "quarantined": e.quarantined,
+                "quarantine_remaining_s": round(max(e.quarantined_until - now, 0), 1),
+                "in_flight": e.in_flight,
+                "last_error": e.last_error,
+            })
+        return {
+            "exits": exits,
+            "healthy": sum(1 for e in self.exits if not e.quarantined),
+            "total": len(self.exits),
+        }
+
+
+def _looks_blocked(resp: httpx.Response) -> bool:
+    # Body only, like ClobClientWrapper._is_cloudflare_block: every response
+    # through Polymarket's front carries `server: cloudflare`, blocked or not
+    text = resp.text.lower()
+    return "cloudflare" in text or "blocked" in text
+
+
+proxy_pool = ProxyPool()
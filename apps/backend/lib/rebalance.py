@@ -16,6 +16,8 @@ All thresholds configurable via environment variables:
   REBALANCE_APY_THRESHOLD   Min APY improvement to trigger rebalance (default: 0.5)
   REBALANCE_INTERVAL_HOURS  Cron interval (default: 3)
   REBALANCE_MIN_TVL         Min vault TVL via DefiLlama (default: 1000000)
+
+Vault APYs come from the shared DefiLlama snapshot in lib/yields.py.
 """
 
 import asyncio
@@ -25,12 +27,12 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional, Any
 
-import httpx
 from web3 import Web3
 
 from lib.agent_store import AgentStore, Agent
-from lib.database import get_pool
+from lib.database import bind_pool, get_pool
 from lib.tee_wallet import derive_wallet
+from lib.yields import TRACKED_PROTOCOLS, yields
 
 log = logging.getLogger("rebalance")
 
@@ -50,14 +52,6 @@ PROTOCOL_TYPES = {
     "compound-v3": "compound",
 }
 
-TRACKED_PROTOCOLS = {
-    "morpho": "Morpho",
-    "fluid": "Fluid",
-    "euler": "Euler",
-    "aave-v3": "Aave v3",
-    "compound-v3": "Compound v3",
-}
-
 # ── ABIs ──────────────────────────────────────────────────────────────────────
 
 ERC20_ABI = [
@@ -265,7 +259,7 @@ def _deposit_erc4626(
     w3: Web3, private_key: str, agent_addr: str, vault_addr: str, amount_raw: int
 ) -> tuple[str, int]:
     """Approve (if needed) and deposit into ERC4626 vault. Returns (tx_hash, total_shares_after)."""
-    vault = w3.eth.contract(address=_cs(vault_addr), abi=ERC4626_ABI + ERC20_ABI)
+    vault = w3.eth.contract(address=_cs(vault_addr), abi=ERC4626_ABI)
     _ensure_approval(w3, private_key, agent_addr, vault_addr, amount_raw)
     tx = _build_tx(w3, agent_addr, vault.functions.deposit(amount_raw, _cs(agent_addr)))
     tx_hash = _sign_send_wait(w3, private_key, tx)
@@ -375,50 +369,25 @@ def _compound_balance(w3: Web3, agent_addr: str) -> float:
         return 0.0
 
 
-# ── DefiLlama fetch (async) ───────────────────────────────────────────────────
+# ── Best vault (DefiLlama snapshot) ───────────────────────────────────────────
 
 
 async def _fetch_best_vault() -> Optional[dict]:
-    """Fetch best USDC vault on Base from DefiLlama. Returns vault dict or None."""
+    """Best USDC vault on Base from the DefiLlama snapshot (lib/yields.py). Returns vault dict or None."""
     min_tvl = float(_env("REBALANCE_MIN_TVL", "1000000"))
-    try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get("https://yields.llama.fi/pools")
-            if resp.status_code != 200:
-                return None
-            pools = resp.json().get("data", [])
-    except Exception as e:
-        log.warning(f"DefiLlama fetch failed: {e}")
-        return None
-
-    vaults = []
-    for pool in pools:
-        if (pool.get("chain") or "").lower() != "base":
+    # Snapshot pools are sorted by APY, best first
+    for pool in await yields.current():
+        if pool.project not in PROTOCOL_TYPES or pool.tvl_usd < min_tvl or pool.apy <= 0:
             continue
-        project = (pool.get("project") or "").lower()
-        if project not in PROTOCOL_TYPES:
-            continue
-        if "USDC" not in (pool.get("symbol") or "").upper():
-            continue
-        tvl = pool.get("tvlUsd") or 0
-        apy = pool.get("apy") or 0
-        if tvl < min_tvl or apy <= 0:
-            continue
-        vaults.append(
-            {
-                "protocol": project,
-                "protocol_name": TRACKED_PROTOCOLS[project],
-                "pool_id": pool.get("pool", ""),
-                "apy": round(apy, 4),
-                "tvl_usd": round(tvl, 2),
-                "type": PROTOCOL_TYPES[project],
-            }
-        )
-
-    if not vaults:
-        return None
-    vaults.sort(key=lambda v: v["apy"], reverse=True)
-    return vaults[0]
+        return {
+            "protocol": pool.project,
+            "protocol_name": TRACKED_PROTOCOLS[pool.project],
+            "pool_id": pool.pool_id,
+            "apy": round(pool.apy, 4),
+            "tvl_usd": round(pool.tvl_usd, 2),
+            "type": PROTOCOL_TYPES[pool.project],
+        }
+    return None
 
 
 # ── DB helpers (async) ────────────────────────────────────────────────────────
@@ -800,6 +769,7 @@ async def run_rebalance_cron() -> None:
 async def start_rebalance_cron() -> None:
     """Background cron loop. Starts 60s after server boot, then every REBALANCE_INTERVAL_HOURS."""
     interval_secs = int(_env("REBALANCE_INTERVAL_HOURS", "3")) * 3600
+    bind_pool("background")
     await asyncio.sleep(60)  # let server finish startup
     log.info(f"[cron] rebalance cron started — interval: {interval_secs // 3600}h")
     while True:
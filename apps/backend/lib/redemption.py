@@ -0,0 +1,302 @@
+"""
+Resolution watcher — notices resolved markets and redeems winning tokens.
+
+One background loop, per cycle:
+
+  1. Loads every open position together with its agent's Safe
+  2. Looks up all of their markets in one batched Gamma query
+     (GammaClient.get_markets, GAMMA_IDS_PER_REQUEST ids per request)
+  3. For markets Gamma reports closed, reads the on-chain result
+     (payoutDenominator / payoutNumerators) through Multicall3. Only
+     conditions the oracle has reported on the CTF can be redeemed, and
+     those numbers, not Gamma's prices, set the payout
+  4. Reads every affected Safe's balance of both outcome tokens with the
+     same balanceOfBatch + Multicall3 path as lib/position_reconciler.py
+  5. Queues one transaction per Safe. It holds one redeemPositions call per
+     condition where the Safe still has a winning token (on the CTF for
+     standard markets, the NegRiskAdapter for neg-risk ones). Several calls
+     are packed into a MultiSend that the Safe delegatecalls, so a Safe
+     pays for one execTransaction however many markets it redeems
+  6. Marks the positions `resolved` in one bulk UPDATE. payout_usd is
+     shares × the outcome's payout fraction, and close_tx is the
+     redemption tx. Positions holding only losing tokens need no
+     transaction and resolve with a zero payout. Realized P&L is
+     payout_usd minus the net cost of those shares (lib.pnl.cost_basis)
+
+A Safe whose transaction fails keeps its positions open for the next cycle.
+
+Env vars:
+  RESOLUTION_WATCH_INTERVAL_SECONDS  Loop interval (default: 600)
+  REDEEM_CONCURRENCY                 Safes redeemed in parallel (default: 4)
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from eth_abi import decode as abi_decode
+from web3 import Web3
+
+from lib.contracts import (
+    CONTRACTS,
+    CTF_ABI,
+    MULTISEND_ABI,
+    NEG_RISK_ADAPTER_ABI,
+    derive_polymarket_safe,
+)
+from lib.database import bind_pool, get_pool
+from lib.gamma_client import GammaClient, Market
+from lib.multicall import aggregate
+from lib.pnl import cost_basis
+from lib.pnl_engine import pnl_engine
+from lib.position_reconciler import allocate_shares, read_ctf_balances
+from lib.wallet_manager import WalletManager
+
+log = logging.getLogger("redemption")
+
+RESOLUTION_INTERVAL = int(os.environ.get("RESOLUTION_WATCH_INTERVAL_SECONDS", "600"))
+REDEEM_CONCURRENCY = int(os.environ.get("REDEEM_CONCURRENCY", "4"))
+
+# execTransaction gas: fixed overhead plus one redeemPositions per condition
+_GAS_BASE = 100_000
+_GAS_PER_REDEEM = 150_000
+
+
+@dataclass
+class SafeRedemption:
+    """Everything one Safe redeems in a single transaction."""
+
+    safe: str
+    wallet_index: int
+    calls: list[tuple[str, bytes]] = field(default_factory=list)          # (target, calldata)
+    positions: list[tuple[str, float, float]] = field(default_factory=list)  # (position_id, shares, payout_usd)
+
+
+def _condition_bytes(condition_id: str) -> bytes:
+    return bytes.fromhex(condition_id.removeprefix("0x"))
+
+
+# ── Chain reads (blocking — run in an executor) ───────────────────────────────
+
+
+def read_payouts(w3: Web3, condition_ids: list[str]) -> dict[str, tuple[float, float]]:
+    """(YES, NO) payout per share for every condition the oracle has reported on chain."""
+    ctf = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI)
+    calls = []
+    for cid in condition_ids:
+        cond = _condition_bytes(cid)
+        calls += [
+            (CONTRACTS["CTF"], bytes.fromhex(ctf.encode_abi("payoutDenominator", args=[cond])[2:])),
+            (CONTRACTS["CTF"], bytes.fromhex(ctf.encode_abi("payoutNumerators", args=[cond, 0])[2:])),
+            (CONTRACTS["CTF"], bytes.fromhex(ctf.encode_abi("payoutNumerators", args=[cond, 1])[2:])),
+        ]
+    results = aggregate(w3, calls)
+
+    out = {}
+    for i, cid in enumerate(condition_ids):
+        denominator, yes, no = (
+            abi_decode(["uint256"], r)[0] if r else 0 for r in results[3 * i:3 * i + 3]
+        )
+        if denominator:
+            out[cid] = (yes / denominator, no / denominator)
+    return out
+
+
+def redeem_call(market: Market, yes_raw: int, no_raw: int) -> tuple[str, bytes]:
+    """(target, calldata) redeeming a Safe's tokens of one resolved market."""
+    cond = _condition_bytes(market.condition_id)
+    if market.neg_risk:
+        adapter = Web3().eth.contract(
+            address=Web3.to_checksum_address(CONTRACTS["NEG_RISK_ADAPTER"]), abi=NEG_RISK_ADAPTER_ABI
+        )
+        data = adapter.encode_abi("redeemPositions", args=[cond, [yes_raw, no_raw]])
+        return CONTRACTS["NEG_RISK_ADAPTER"], bytes.fromhex(data[2:])
+    ctf = Web3().eth.contract(address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI)
+    data = ctf.encode_abi(
+        "redeemPositions",
+        args=[Web3.to_checksum_address(CONTRACTS["USDC_E"]), bytes(32), cond, [1, 2]],
+    )
+    return CONTRACTS["CTF"], bytes.fromhex(data[2:])
+
+
+def encode_multisend(calls: list[tuple[str, bytes]]) -> bytes:
+    """MultiSend.multiSend calldata: packed operation | to | value | data length | data entries."""
+    packed = b"".join(
+        b"\x00"
+        + bytes.fromhex(Web3.to_checksum_address(to)[2:])
+        + (0).to_bytes(32, "big")
+        + len(data).to_bytes(32, "big")
+        + data
+        for to, data in calls
+    )
+    multisend = Web3().eth.contract(
+        address=Web3.to_checksum_address(CONTRACTS["MULTISEND_CALL_ONLY"]), abi=MULTISEND_ABI
+    )
+    return bytes.fromhex(multisend.encode_abi("multiSend", args=[packed])[2:])
+
+
+def execute_redemption(wallet: WalletManager, safe: str, calls: list[tuple[str, bytes]]) -> str:
+    """Send one Safe transaction for all `calls` (MultiSend when more than one). Returns tx hash."""
+    gas = _GAS_BASE + _GAS_PER_REDEEM * len(calls)
+    if len(calls) == 1:
+        target, data = calls[0]
+        return wallet.safe_exec(safe, target, data, gas=gas)
+    return wallet.safe_exec(
+        safe, CONTRACTS["MULTISEND_CALL_ONLY"], encode_multisend(calls), gas=gas, operation=1
+    )
+
+
+# ── Planning ──────────────────────────────────────────────────────────────────
+
+
+def plan_redemptions(
+    rows: list[dict],
+    resolved: dict[str, tuple[Market, tuple[float, float]]],
+    balances: dict[tuple[str, str], int],
+) -> tuple[list[SafeRedemption], list[tuple[str, float, float]]]:
+    """Split positions in resolved markets into per-Safe redemptions and no-tx settlements.
+
+    rows carry position_id, market_id, token_id, shares / entry fields, safe
+    and wallet_index. Markets whose Safe balances could not be read are
+    skipped for this cycle.
+    """
+    by_safe_market: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    wallet_index: dict[str, int] = {}
+    for r in rows:
+        if r["market_id"] in resolved:
+            by_safe_market[(r["safe"], r["market_id"])].append(r)
+            wallet_index[r["safe"]] = r["wallet_index"]
+
+    plans: dict[str, SafeRedemption] = {}
+    settled: list[tuple[str, float, float]] = []
+    for (safe, market_id), market_rows in by_safe_market.items():
+        market, (pay_yes, pay_no) = resolved[market_id]
+        yes_raw = balances.get((safe, market.yes_token_id))
+        no_raw = balances.get((safe, market.no_token_id)) if market.no_token_id else 0
+        if yes_raw is None or no_raw is None:
+            continue
+
+        outcome = []
+        for token_id, raw, fraction in ((market.yes_token_id, yes_raw, pay_yes), (market.no_token_id, no_raw, pay_no)):
+            token_rows = [r for r in market_rows if r["token_id"] == token_id]
+            if token_rows:
+                for r, shares in zip(token_rows, allocate_shares(token_rows, raw)):
+                    outcome.append((r["position_id"], shares, round(shares * fraction, 6)))
+
+        if yes_raw * pay_yes + no_raw * pay_no > 0:
+            plan = plans.setdefault(safe, SafeRedemption(safe, wallet_index[safe]))
+            plan.calls.append(redeem_call(market, yes_raw, no_raw))
+            plan.positions += outcome
+        else:
+            settled += outcome
+    return list(plans.values()), settled
+
+
+# ── Cycle / cron ──────────────────────────────────────────────────────────────
+
+
+async def run_resolution_cycle(rpc_url: Optional[str] = None) -> dict:
+    """Resolve and redeem once. Returns summary counters."""
+    rpc_url = rpc_url or os.environ.get("CHAINSTACK_NODE", "")
+    summary = {"positions": 0, "markets": 0, "resolved_markets": 0, "safes": 0,
+               "transactions": 0, "resolved": 0, "payout_usd": 0.0, "pnl_usd": 0.0, "errors": 0}
+    if not rpc_url:
+        return summary
+
+    pool = get_pool()
+    rows = [
+        dict(r) for r in await pool.fetch(
+            """
+            SELECT p.position_id, p.market_id, p.token_id, p.entry_amount, p.entry_price, p.shares,
+                   a.wallet_address, a.polygon_safe, a.wallet_index
+            FROM positions p
+            JOIN agents a ON a.agent_id = p.agent_id
+            WHERE p.status = 'open' AND p.token_id IS NOT NULL
+            """
+        )
+    ]
+    summary["positions"] = len(rows)
+    if not rows:
+        return summary
+
+    markets = await GammaClient().get_markets([r["market_id"] for r in rows])
+    summary["markets"] = len(markets)
+    closed = [m for m in markets if (m.closed or m.resolved) and m.condition_id]
+    if not closed:
+        return summary
+
+    loop = asyncio.get_running_loop()
+    w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 30}))
+    payouts = await loop.run_in_executor(None, read_payouts, w3, [m.condition_id for m in closed])
+    resolved = {m.id: (m, payouts[m.condition_id]) for m in closed if m.condition_id in payouts}
+    summary["resolved_markets"] = len(resolved)
+    if not resolved:
+        return summary
+
+    pairs = set()
+    for r in rows:
+        if r["market_id"] in resolved:
+            r["safe"] = (r["polygon_safe"] or derive_polymarket_safe(r["wallet_address"])).lower()
+            market = resolved[r["market_id"]][0]
+            pairs.update((r["safe"], t) for t in (market.yes_token_id, market.no_token_id) if t)
+    balances = await loop.run_in_executor(None, read_ctf_balances, w3, sorted(pairs))
+
+    plans, settled = plan_redemptions([r for r in rows if "safe" in r], resolved, balances)
+    summary["safes"] = len(plans)
+    sem = asyncio.Semaphore(REDEEM_CONCURRENCY)
+
+    async def _redeem(plan: SafeRedemption) -> list[tuple[str, float, float, Optional[str]]]:
+        async with sem:
+            try:
+                wallet = WalletManager.from_tee(plan.wallet_index, rpc_url=rpc_url)
+                tx = await loop.run_in_executor(None, execute_redemption, wallet, plan.safe, plan.calls)
+            except Exception as e:
+                log.error(f"[redeem] {plan.safe}: {len(plan.calls)} redemption(s) failed: {e}")
+                summary["errors"] += 1
+                return []
+            summary["transactions"] += 1
+            return [(pid, shares, payout, tx) for pid, shares, payout in plan.positions]
+
+    updates = [(pid, shares, payout, None) for pid, shares, payout in settled]
+    for done in await asyncio.gather(*[_redeem(p) for p in plans]):
+        updates += done
+
+    if updates:
+        ids, shares, payout_usd, txs = (list(col) for col in zip(*updates))
+        await pool.execute(
+            """
+            UPDATE positions p
+            SET status = 'resolved', shares = u.shares, payout_usd = u.payout_usd,
+                close_tx = u.close_tx, closed_at = NOW()
+            FROM unnest($1::text[], $2::float8[], $3::float8[], $4::text[])
+                 AS u(position_id, shares, payout_usd, close_tx)
+            WHERE p.position_id = u.position_id AND p.status = 'open'
+            """,
+            ids, shares, payout_usd, txs,
+        )
+        await pnl_engine.reload_positions(ids)
+    summary["resolved"] = len(updates)
+    summary["payout_usd"] = round(sum(u[2] for u in updates), 2)
+    by_id = {r["position_id"]: r for r in rows}
+    summary["pnl_usd"] = round(
+        sum(payout - cost_basis({**by_id[pid], "shares": shares}) for pid, shares, payout, _ in updates), 2
+    )
+    return summary
+
+
+async def start_resolution_watcher() -> None:
+    """Background loop. Starts 180s after boot, then every RESOLUTION_WATCH_INTERVAL_SECONDS."""
+    bind_pool("background")
+    await asyncio.sleep(180)
+    log.info(f"[redeem] resolution watcher started — interval: {RESOLUTION_INTERVAL}s")
+    while True:
+        try:
+            summary = await run_resolution_cycle()
+            if summary["resolved"] or summary["errors"]:
+                log.info(f"[redeem] {summary}")
+        except Exception as e:
+            log.error(f"[redeem] top-level error: {e}")
+        await asyncio.sleep(RESOLUTION_INTERVAL)
@@ -0,0 +1,805 @@
+"""In-process EVM stand-in for simulation, dry-runs and benchmarking.
+
+Serves just enough Ethereum JSON-RPC over a localhost HTTP port for the real
+WalletManager, TradeExecutor and rebalance code to run unmodified: point
+CHAINSTACK_NODE / BASE_RPC_URL at SimChain.url and every Web3.HTTPProvider
+in the codebase talks to it instead of mainnet.
+
+Contracts are Python mocks keyed by address, not bytecode:
+  ERC20       balanceOf / allowance / approve / transfer / transferFrom
+  CTF         splitPosition / mergePositions / redeemPositions / balanceOf /
+              balanceOfBatch / setApprovalForAll / isApprovedForAll /
+              safeTransferFrom / payoutNumerators / payoutDenominator
+  Gnosis Safe nonce / execTransaction (the EIP-712 owner signature is verified)
+  ERC4626     deposit / redeem / balanceOf / previewRedeem / previewDeposit / asset
+  Multicall3  aggregate3
+  MultiSend   multiSend (CALL-only entries, run with the caller as msg.sender)
+
+ERC20 transfers and mints emit Transfer logs, kept per block and served by
+eth_getLogs (address and topic filters) and in transaction receipts.
+
+Gas is modeled from a fixed per-call schedule plus intrinsic calldata cost,
+not metered — good for relative comparisons, not for exact fee quotes.
+"""
+
+import copy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+import rlp
+from eth_abi import decode as abi_decode, encode as abi_encode
+from eth_account import Account
+from web3 import Web3
+
+from lib.wallet_manager import _DOMAIN_TYPEHASH, _SAFE_TX_TYPEHASH
+
+
+DEFAULT_GAS_PRICE = 30 * 10**9  # 30 gwei
+BLOCK_GAS_LIMIT = 30_000_000
+_ZERO32 = "0x" + "00" * 32
+TRANSFER_TOPIC = "0x" + Web3.keccak(text="Transfer(address,address,uint256)").hex().removeprefix("0x")
+
+
+def _norm(addr: str) -> str:
+    return addr.lower()
+
+
+def _selector(signature: str) -> bytes:
+    return bytes(Web3.keccak(text=signature)[:4])
+
+
+def _int(b: bytes) -> int:
+    return int.from_bytes(b, "big") if b else 0
+
+
+def _topic(addr: str) -> str:
+    """An address as an indexed event topic."""
+    return "0x" + "00" * 12 + _norm(addr).removeprefix("0x")
+
+
+def sim_position_id(collateral: str, condition_id: bytes, index_set: int) -> int:
+    """Stand-in CTF position id for an outcome.
+
+    The real CTF derives collection ids via an elliptic-curve hash; the mock
+    only needs ids that are stable and distinct per (collateral, condition, outcome).
+    """
+    return _int(Web3.keccak(abi_encode(
+        ["address", "bytes32", "uint256"], [collateral, condition_id, index_set]
+    )))
+
+
+class SimRevert(Exception):
+    """A mock contract call reverted."""
+
+
+# ── Mock contracts ────────────────────────────────────────────────────────────
+
+
+def _split_types(args: str) -> list[str]:
+    """Split an ABI argument list on top-level commas, keeping tuple types whole."""
+    types, depth, start = [], 0, 0
+    for i, ch in enumerate(args):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            types.append(args[start:i])
+            start = i + 1
+    types.append(args[start:])
+    return [t for t in types if t]
+
+
+def _abi(signature: str, outputs: tuple = (), gas: int = 0):
+    """Mark a mock method as the handler for an ABI function signature."""
+    args = signature[signature.index("(") + 1:-1]
+    in_types = _split_types(args)
+
+    def wrap(fn):
+        fn._abi = (_selector(signature), in_types, list(outputs), gas, signature.split("(")[0])
+        return fn
+    return wrap
+
+
+class _Mock:
+    """Base for mock contracts — builds a selector → handler table per subclass."""
+
+    kind = "contract"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {
+            fn._abi[0]: fn
+            for fn in (getattr(cls, name) for name in dir(cls))
+            if hasattr(fn, "_abi")
+        }
+
+    def __init__(self, address: str):
+        self.address = _norm(address)
+
+
+class MockERC20(_Mock):
+    kind = "erc20"
+
+    def __init__(self, address: str, symbol: str = "USDC"):
+        super().__init__(address)
+        self.symbol = symbol
+        self.balances: dict[str, int] = {}
+        self.allowances: dict[tuple[str, str], int] = {}
+
+    def mint(self, to: str, amount: int) -> None:
+        self.balances[_norm(to)] = self.balances.get(_norm(to), 0) + amount
+
+    def move(self, state: "_State", src: str, dst: str, amount: int) -> None:
+        src, dst = _norm(src), _norm(dst)
+        if self.balances.get(src, 0) < amount:
+            raise SimRevert(f"{self.symbol}: transfer amount exceeds balance")
+        self.balances[src] -= amount
+        self.balances[dst] = self.balances.get(dst, 0) + amount
+        state.emit(self.address, [TRANSFER_TOPIC, _topic(src), _topic(dst)], abi_encode(["uint256"], [amount]))
+
+    def spend_allowance(self, owner: str, spender: str, amount: int) -> None:
+        key = (_norm(owner), _norm(spender))
+        current = self.allowances.get(key, 0)
+        if current < amount:
+            raise SimRevert(f"{self.symbol}: insufficient allowance")
+        if current != 2**256 - 1:
+            self.allowances[key] = current - amount
+
+    @_abi("balanceOf(address)", ("uint256",), gas=2_600)
+    def balance_of(self, state, sender, owner):
+        return (self.balances.get(_norm(owner), 0),)
+
+    @_abi("allowance(address,address)", ("uint256",), gas=2_600)
+    def allowance(self, state, sender, owner, spender):
+        return (self.allowances.get((_norm(owner), _norm(spender)), 0),)
+
+    @_abi("approve(address,uint256)", ("bool",), gas=24_000)
+    def approve(self, state, sender, spender, amount):
+        self.allowances[(sender, _norm(spender))] = amount
+        return (True,)
+
+    @_abi("transfer(address,uint256)", ("bool",), gas=29_000)
+    def transfer(self, state, sender, to, amount):
+        self.move(state, sender, to, amount)
+        return (True,)
+
+    @_abi("transferFrom(address,address,uint256)", ("bool",), gas=34_000)
+    def transfer_from(self, state, sender, src, dst, amount):
+        self.spend_allowance(src, sender, amount)
+        self.move(state, src, dst, amount)
+        return (True,)
+
+
+class MockCTF(_Mock):
+    kind = "ctf"
+
+    def __init__(self, address: str):
+        super().__init__(address)
+        self.balances: dict[tuple[str, int], int] = {}
+        self.approvals: dict[tuple[str, str], bool] = {}
+        self.payouts: dict[bytes, list[int]] = {}  # condition_id → payout numerators
+
+    def report_payouts(self, condition_id: bytes, payouts: list[int]) -> None:
+        """Resolve a condition, as the oracle would (setup helper, not an ABI call)."""
+        self.payouts[bytes(condition_id)] = list(payouts)
+
+    def _credit(self, owner: str, token_id: int, amount: int) -> None:
+        key = (_norm(owner), token_id)
+        self.balances[key] = self.balances.get(key, 0) + amount
+
+    def _debit(self, owner: str, token_id: int, amount: int) -> None:
+        key = (_norm(owner), token_id)
+        if self.balances.get(key, 0) < amount:
+            raise SimRevert("CTF: insufficient outcome token balance")
+        self.balances[key] -= amount
+
+    @_abi("isApprovedForAll(address,address)", ("bool",), gas=2_600)
+    def is_approved_for_all(self, state, sender, owner, operator):
+        return (self.approvals.get((_norm(owner), _norm(operator)), False),)
+
+    @_abi("setApprovalForAll(address,bool)", (), gas=24_000)
+    def set_approval_for_all(self, state, sender, operator, approved):
+        self.approvals[(sender, _norm(operator))] = approved
+        return ()
+
+    @_abi("balanceOf(address,uint256)", ("uint256",), gas=2_600)
+    def balance_of(self, state, sender, owner, token_id):
+        return (self.balances.get((_norm(owner), token_id), 0),)
+
+    @_abi("balanceOfBatch(address[],uint256[])", ("uint256[]",), gas=5_000)
+    def balance_of_batch(self, state, sender, owners, token_ids):
+        if len(owners) != len(token_ids):
+            raise SimRevert("CTF: owners and ids length mismatch")
+        return ([self.balances.get((_norm(o), t), 0) for o, t in zip(owners, token_ids)],)
+
+    @_abi("splitPosition(address,bytes32,bytes32,uint256[],uint256)", (), gas=110_000)
+    def split_position(self, state, sender, collateral, parent, condition_id, partition, amount):
+        token = state.contract(collateral)
+        token.spend_allowance(sender, self.address, amount)
+        token.move(state, sender, self.address, amount)
+        for index_set in partition:
+            self._credit(sender, sim_position_id(collateral, condition_id, index_set), amount)
+        return ()
+
+    @_abi("mergePositions(address,bytes32,bytes32,uint256[],uint256)", (), gas=90_000)
+    def merge_positions(self, state, sender, collateral, parent, condition_id, partition, amount):
+        for index_set in partition:
+            self._debit(sender, sim_position_id(collateral, condition_id, index_set), amount)
+        state.contract(collateral).move(state, self.address, sender, amount)
+        return ()
+
+    @_abi("redeemPositions(address,bytes32,bytes32,uint256[])", (), gas=60_000)
+    def redeem_positions(self, state, sender, collateral, parent, condition_id, index_sets):
+        payouts = self.payouts.get(bytes(condition_id))
+        if not payouts:
+            raise SimRevert("CTF: result for condition not received yet")
+        denominator = sum(payouts)
+        total = 0
+        for index_set in index_sets:
+            key = (sender, sim_position_id(collateral, condition_id, index_set))
+            balance = self.balances.pop(key, 0)
+            numerator = sum(p for i, p in enumerate(payouts) if index_set & (1 << i))
+            total += balance * numerator // denominator
+        if total:
+            state.contract(collateral).move(state, self.address, sender, total)
+        return ()
+
+    @_abi("payoutDenominator(bytes32)", ("uint256",), gas=2_400)
+    def payout_denominator(self, state, sender, condition_id):
+        return (sum(self.payouts.get(bytes(condition_id), [])),)
+
+    @_abi("payoutNumerators(bytes32,uint256)", ("uint256",), gas=2_400)
+    def payout_numerators(self, state, sender, condition_id, index):
+        payouts = self.payouts.get(bytes(condition_id), [])
+        return (payouts[index] if index < len(payouts) else 0,)
+
+    @_abi("safeTransferFrom(address,address,uint256,uint256,bytes)", (), gas=35_000)
+    def safe_transfer_from(self, state, sender, src, dst, token_id, amount, data):
+        if _norm(src) != sender and not self.approvals.get((_norm(src), sender), False):
+            raise SimRevert("CTF: caller is not owner nor approved")
+        self._debit(src, token_id, amount)
+        self._credit(dst, token_id, amount)
+        return ()
+
+
+class MockSafe(_Mock):
+    kind = "safe"
+
+    def __init__(self, address: str, owner: str):
+        super().__init__(address)
+        self.owner = _norm(owner)
+        self.nonce = 0
+
+    @_abi("nonce()", ("uint256",), gas=2_400)
+    def get_nonce(self, state, sender):
+        return (self.nonce,)
+
+    @_abi(
+        "execTransaction(address,uint256,bytes,uint8,uint256,uint256,uint256,address,address,bytes)",
+        ("bool",),
+        gas=28_000,
+    )
+    def exec_transaction(self, state, sender, to, value, data, operation,
+                         safe_tx_gas, base_gas, gas_price, gas_token, refund_receiver, signatures):
+        domain_sep = Web3.keccak(abi_encode(
+            ["bytes32", "uint256", "address"], [_DOMAIN_TYPEHASH, state.chain_id, self.address]
+        ))
+        safe_tx_hash = Web3.keccak(abi_encode(
+            ["bytes32", "address", "uint256", "bytes32", "uint8",
+             "uint256", "uint256", "uint256", "address", "address", "uint256"],
+            [_SAFE_TX_TYPEHASH, to, value, Web3.keccak(data), operation,
+             safe_tx_gas, base_gas, gas_price, gas_token, refund_receiver, self.nonce],
+        ))
+        final_hash = Web3.keccak(b"\x19\x01" + domain_sep + safe_tx_hash)
+        if len(signatures) < 65:
+            raise SimRevert("GS020")
+        r, s, v = _int(signatures[:32]), _int(signatures[32:64]), signatures[64]
+        try:
+            signer = Account._recover_hash(final_hash, vrs=(v, r, s))
+        except Exception:
+            raise SimRevert("GS026")
+        if _norm(signer) != self.owner:
+            raise SimRevert("GS026")
+        self.nonce += 1
+        try:
+            state.call(self.address, _norm(to), data)
+        except SimRevert:
+            raise SimRevert("GS013")
+        return (True,)
+
+
+class MockVault(_Mock):
+    kind = "erc4626"
+
+    def __init__(self, address: str, asset: str):
+        super().__init__(address)
+        self.asset_addr = _norm(asset)
+        self.shares: dict[str, int] = {}
+        self.total_shares = 0
+        self.total_assets = 0
+
+    def accrue(self, state: "_State", assets: int) -> None:
+        """Simulate yield — mint `assets` of the underlying into the vault."""
+        state.contract(self.asset_addr).mint(self.address, assets)
+        self.total_assets += assets
+
+    def _to_shares(self, assets: int) -> int:
+        if self.total_shares == 0 or self.total_assets == 0:
+            return assets
+        return assets * self.total_shares // self.total_assets
+
+    def _to_assets(self, shares: int) -> int:
+        if self.total_shares == 0:
+            return shares
+        return shares * self.total_assets // self.total_shares
+
+    @_abi("asset()", ("address",), gas=2_400)
+    def asset(self, state, sender):
+        return (Web3.to_checksum_address(self.asset_addr),)
+
+    @_abi("balanceOf(address)", ("uint256",), gas=2_600)
+    def balance_of(self, state, sender, owner):
+        return (self.shares.get(_norm(owner), 0),)
+
+    @_abi("previewDeposit(uint256)", ("uint256",), gas=4_000)
+    def preview_deposit(self, state, sender, assets):
+        return (self._to_shares(assets),)
+
+    @_abi("previewRedeem(uint256)", ("uint256",), gas=4_000)
+    def preview_redeem(self, state, sender, shares):
+        return (self._to_assets(shares),)
+
+    @_abi("deposit(uint256,address)", ("uint256",), gas=95_000)
+    def deposit(self, state, sender, assets, receiver):
+        token = state.contract(self.asset_addr)
+        token.spend_allowance(sender, self.address, assets)
+        token.move(state, sender, self.address, assets)
+        minted = self._to_shares(assets)
+        self.shares[_norm(receiver)] = self.shares.get(_norm(receiver), 0) + minted
+        self.total_shares += minted
+        self.total_assets += assets
+        return (minted,)
+
+    @_abi("redeem(uint256,address,address)", ("uint256",), gas=70_000)
+    def redeem(self, state, sender, shares, receiver, owner):
+        if _norm(owner) != sender:
+            raise SimRevert("ERC4626: redeem on behalf of owner not supported")
+        if self.shares.get(sender, 0) < shares:
+            raise SimRevert("ERC4626: redeem more than max")
+        assets = self._to_assets(shares)
+        self.shares[sender] -= shares
+        self.total_shares -= shares
+        self.total_assets -= assets
+        state.contract(self.asset_addr).move(state, self.address, receiver, assets)
+        return (assets,)
+
+
+# ── Chain state + execution ───────────────────────────────────────────────────
+
+
+class MockMulticall3(_Mock):
+    kind = "multicall3"
+
+    @_abi("aggregate3((address,bool,bytes)[])", ("(bool,bytes)[]",), gas=2_000)
+    def aggregate3(self, state, sender, calls):
+        results = []
+        for target, allow_failure, data in calls:
+            try:
+                results.append((True, state.call(self.address, target, data)))
+            except SimRevert:
+                if not allow_failure:
+                    raise SimRevert("Multicall3: call failed")
+                results.append((False, b""))
+        return (results,)
+
+    @_abi("getEthBalance(address)", ("uint256",), gas=2_600)
+    def get_eth_balance(self, state, sender, addr):
+        return (state.native.get(addr, 0),)
+
+
+class MockMultiSend(_Mock):
+    kind = "multisend"
+
+    @_abi("multiSend(bytes)", (), gas=3_000)
+    def multi_send(self, state, sender, transactions):
+        # Packed entries: operation (1) | to (20) | value (32) | data length (32) | data
+        i = 0
+        while i < len(transactions):
+            operation = transactions[i]
+            to = "0x" + transactions[i + 1:i + 21].hex()
+            length = _int(transactions[i + 53:i + 85])
+            data = transactions[i + 85:i + 85 + length]
+            if operation != 0:
+                raise SimRevert("MultiSendCallOnly: invalid operation")
+            state.call(sender, to, data)
+            i += 85 + length
+        return ()
+
+
+class _State:
+    """Balances, nonces and mock contracts. Deep-copied for eth_call / reverts."""
+
+    def __init__(self, chain_id: int):
+        self.chain_id = chain_id
+        self.native: dict[str, int] = {}
+        self.nonces: dict[str, int] = {}
+        self.contracts: dict[str, _Mock] = {}
+        self.gas_used = 0
+        self.trace: list[str] = []
+        self.logs: list[tuple[str, list[str], bytes]] = []  # (address, topics, data) of the current call
+
+    def emit(self, address: str, topics: list[str], data: bytes) -> None:
+        self.logs.append((_norm(address), topics, data))
+
+    def contract(self, address: str) -> Any:
+        mock = self.contracts.get(_norm(address))
+        if mock is None:
+            raise SimRevert(f"no contract at {address}")
+        return mock
+
+    def call(self, sender: str, to: Optional[str], data: bytes) -> bytes:
+        """Execute calldata against a mock contract and return ABI-encoded output."""
+        mock = self.contracts.get(_norm(to or ""))
+        if mock is None:
+            return b""  # plain value transfer / call to an EOA
+        fn = mock._dispatch.get(bytes(data[:4]))
+        if fn is None:
+            raise SimRevert(f"{mock.kind}: unknown selector 0x{bytes(data[:4]).hex()}")
+        _, in_types, out_types, gas, name = fn._abi
+        self.gas_used += gas
+        self.trace.append(f"{getattr(mock, 'symbol', mock.kind)}.{name}")
+        args = abi_decode(in_types, bytes(data[4:])) if in_types else ()
+        args = tuple(_norm(a) if t == "address" else a for t, a in zip(in_types, args))
+        out = fn(mock, self, _norm(sender), *args)
+        return abi_encode(out_types, list(out)) if out_types else b""
+
+
+def _intrinsic_gas(data: bytes) -> int:
+    return 21_000 + sum(16 if b else 4 for b in data)
+
+
+def _decode_raw_tx(raw: bytes) -> dict:
+    """Decode a signed legacy / EIP-2930 / EIP-1559 transaction."""
+    if raw[0] == 2:
+        f = rlp.decode(raw[1:])
+        nonce, gas, to, value, data = f[1], f[4], f[5], f[6], f[7]
+        price = _int(f[3])
+    elif raw[0] == 1:
+        f = rlp.decode(raw[1:])
+        nonce, price, gas, to, value, data = f[1], _int(f[2]), f[3], f[4], f[5], f[6]
+    else:
+        f = rlp.decode(raw)
+        nonce, price, gas, to, value, data = f[0], _int(f[1]), f[2], f[3], f[4], f[5]
+    return {
+        "type": raw[0] if raw[0] in (1, 2) else 0,
+        "nonce": _int(nonce),
+        "gas_price": price,
+        "gas": _int(gas),
+        "to": "0x" + to.hex() if to else None,
+        "value": _int(value),
+        "data": bytes(data),
+        "from": _norm(Account.recover_transaction(raw)),
+    }
+
+
+class SimChain:
+    """A single-chain JSON-RPC stand-in with instant mining."""
+
+    def __init__(self, chain_id: int, gas_price: int = DEFAULT_GAS_PRICE):
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.state = _State(chain_id)
+        self.block_number = 1
+        self.receipts: dict[str, dict] = {}
+        self.logs: list[dict] = []            # every emitted log, in block order
+        self.rpc_stats: dict[str, list] = {}  # method → [count, seconds]
+        self._lock = threading.RLock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.url = ""
+
+    # ── setup ────────────────────────────────────────────────────────────
+
+    def deploy(self, mock: _Mock) -> Any:
+        with self._lock:
+            self.state.contracts[mock.address] = mock
+        return mock
+
+    def deploy_erc20(self, address: str, symbol: str = "USDC") -> MockERC20:
+        return self.deploy(MockERC20(address, symbol))
+
+    def deploy_ctf(self, address: str) -> MockCTF:
+        return self.deploy(MockCTF(address))
+
+    def deploy_safe(self, address: str, owner: str) -> MockSafe:
+        return self.deploy(MockSafe(address, owner))
+
+    def deploy_vault(self, address: str, asset: str) -> MockVault:
+        return self.deploy(MockVault(address, asset))
+
+    def deploy_multicall(self, address: str) -> MockMulticall3:
+        return self.deploy(MockMulticall3(address))
+
+    def deploy_multisend(self, address: str) -> MockMultiSend:
+        return self.deploy(MockMultiSend(address))
+
+    def fund(self, address: str, wei: int) -> None:
+        with self._lock:
+            self.state.native[_norm(address)] = self.state.native.get(_norm(address), 0) + wei
+
+    def mint(self, token: str, to: str, amount: int) -> None:
+        """Credit `amount` base units of an ERC20 mock to `to`, in a new block with its Transfer log."""
+        with self._lock:
+            self.state.contract(token).mint(to, amount)
+            self.block_number += 1
+            self._record_logs(
+                [(_norm(token), [TRANSFER_TOPIC, _topic("0x" + "00" * 20), _topic(to)], abi_encode(["uint256"], [amount]))],
+                _ZERO32,
+            )
+
+    def contract(self, address: str) -> Any:
+        """Live mock at `address` — mutate only inside `with chain.locked():`.
+
+        Every mined transaction swaps in a new state object, so re-fetch
+        after sending rather than holding on to the returned mock.
+        """
+        return self.state.contract(address)
+
+    def locked(self):
+        return self._lock
+
+    # ── execution ────────────────────────────────────────────────────────
+
+    def _run(self, sender: str, to: Optional[str], data: bytes, value: int = 0) -> tuple[_State, bytes]:
+        """Execute on a copy of the state. Returns (new_state, returndata); raises SimRevert."""
+        state = copy.deepcopy(self.state)
+        state.gas_used = _intrinsic_gas(data)
+        state.trace = []
+        state.logs = []
+        if value:
+            if state.native.get(sender, 0) < value:
+                raise SimRevert("insufficient native balance for value")
+            state.native[sender] -= value
+            state.native[_norm(to or "")] = state.native.get(_norm(to or ""), 0) + value
+        out = state.call(sender, to, data)
+        return state, out
+
+    def _eth_call(self, tx: dict) -> tuple[bytes, int]:
+        data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+        value = int(tx.get("value", "0x0"), 16)
+        state, out = self._run(_norm(tx.get("from") or "0x" + "00" * 20), tx.get("to"), data, value)
+        return out, state.gas_used
+
+    def _send_raw(self, raw_hex: str) -> str:
+        raw = bytes.fromhex(raw_hex[2:])
+        tx = _decode_raw_tx(raw)
+        sender = tx["from"]
+        expected = self.state.nonces.get(sender, 0)
+        if tx["nonce"] < expected:
+            raise _RpcError(-32000, "nonce too low")
+        if tx["nonce"] > expected:
+            raise _RpcError(-32000, f"nonce too high: expected {expected}, got {tx['nonce']}")
+        if self.state.native.get(sender, 0) < tx["gas"] * tx["gas_price"] + tx["value"]:
+            raise _RpcError(-32000, "insufficient funds for gas * price + value")
+
+        tx_hash = "0x" + Web3.keccak(raw).hex().removeprefix("0x")
+        logs = []
+        try:
+            new_state, _ = self._run(sender, tx["to"], tx["data"], tx["value"])
+            status, gas_used, trace = 1, new_state.gas_used, new_state.trace
+            if gas_used > tx["gas"]:
+                status, gas_used, trace = 0, tx["gas"], new_state.trace + ["out of gas"]
+            else:
+                self.state = new_state
+                logs = new_state.logs
+        except SimRevert as e:
+            status, gas_used, trace = 0, min(tx["gas"], _intrinsic_gas(tx["data"]) + 30_000), [f"revert: {e}"]
+
+        self.state.nonces[sender] = expected + 1
+        self.state.native[sender] -= gas_used * tx["gas_price"]
+        self.block_number += 1
+        self.receipts[tx_hash] = {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockHash": self._block_hash(self.block_number),
+            "blockNumber": hex(self.block_number),
+            "from": sender,
+            "to": _norm(tx["to"]) if tx["to"] else None,
+            "cumulativeGasUsed": hex(gas_used),
+            "gasUsed": hex(gas_used),
+            "effectiveGasPrice": hex(tx["gas_price"]),
+            "contractAddress": None,
+            "logs": self._record_logs(logs, tx_hash),
+            "logsBloom": "0x" + "00" * 256,
+            "status": hex(status),
+            "type": hex(tx["type"]),
+            "trace": trace,
+        }
+        return tx_hash
+
+    def _block_hash(self, number: int) -> str:
+        return "0x" + Web3.keccak(text=f"block{number}").hex().removeprefix("0x")
+
+    def _record_logs(self, logs: list[tuple[str, list[str], bytes]], tx_hash: str) -> list[dict]:
+        """Append a call's logs to the current block. Returns them in RPC form."""
+        out = [
+            {
+                "address": address,
+                "topics": topics,
+                "data": "0x" + data.hex(),
+                "blockNumber": hex(self.block_number),
+                "blockHash": self._block_hash(self.block_number),
+                "transactionHash": tx_hash,
+                "transactionIndex": "0x0",
+                "logIndex": hex(i),
+                "removed": False,
+            }
+            for i, (address, topics, data) in enumerate(logs)
+        ]
+        self.logs += out
+        return out
+
+    def _block_param(self, value: Optional[str]) -> int:
+        if value is None or value in ("latest", "pending", "safe", "finalized"):
+            return self.block_number
+        if value == "earliest":
+            return 0
+        return int(value, 16)
+
+    def _get_logs(self, flt: dict) -> list[dict]:
+        """eth_getLogs: block range, address (one or a list) and per-position topic filters (None or OR-lists)."""
+        lo, hi = self._block_param(flt.get("fromBlock")), self._block_param(flt.get("toBlock"))
+        addresses = flt.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {_norm(a) for a in addresses} if addresses else None
+        topics = [
+            None if t is None else {x.lower() for x in ([t] if isinstance(t, str) else t)}
+            for t in flt.get("topics") or []
+        ]
+
+        def matches(log: dict) -> bool:
+            if not lo <= int(log["blockNumber"], 16) <= hi:
+                return False
+            if addresses is not None and log["address"] not in addresses:
+                return False
+            if len(topics) > len(log["topics"]):
+                return False
+            return all(want is None or got in want for want, got in zip(topics, log["topics"]))
+
+        return [l for l in self.logs if matches(l)]
+
+    def _block(self) -> dict:
+        return {
+            "number": hex(self.block_number),
+            "hash": self._block_hash(self.block_number),
+            "parentHash": _ZERO32,
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": _ZERO32,
+            "logsBloom": "0x" + "00" * 256,
+            "transactionsRoot": _ZERO32,
+            "stateRoot": _ZERO32,
+            "receiptsRoot": _ZERO32,
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "extraData": "0x",
+            "size": "0x0",
+            "gasLimit": hex(BLOCK_GAS_LIMIT),
+            "gasUsed": "0x0",
+            "timestamp": hex(int(time.time())),
+            "baseFeePerGas": hex(self.gas_price // 2),
+            "mixHash": _ZERO32,
+            "transactions": [],
+            "uncles": [],
+        }
+
+    def handle(self, method: str, params: list) -> Any:
+        """Answer one JSON-RPC call."""
+        if method == "eth_chainId":
+            return hex(self.chain_id)
+        if method == "net_version":
+            return str(self.chain_id)
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method in ("eth_getBlockByNumber", "eth_getBlockByHash"):
+            return self._block()
+        if method == "eth_gasPrice":
+            return hex(self.gas_price)
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(self.gas_price // 10)
+        if method == "eth_getBalance":
+            return hex(self.state.native.get(_norm(params[0]), 0))
+        if method == "eth_getTransactionCount":
+            return hex(self.state.nonces.get(_norm(params[0]), 0))
+        if method == "eth_getCode":
+            return "0x00" if _norm(params[0]) in self.state.contracts else "0x"
+        if method == "eth_call":
+            out, _ = self._eth_call(params[0])
+            return "0x" + out.hex()
+        if method == "eth_estimateGas":
+            _, gas = self._eth_call(params[0])
+            return hex(gas)
+        if method == "eth_sendRawTransaction":
+            return self._send_raw(params[0])
+        if method == "eth_getLogs":
+            return self._get_logs(params[0])
+        if method == "eth_getTransactionReceipt":
+            receipt = self.receipts.get(_norm(params[0]))
+            if receipt is None:
+                return None
+            return {k: v for k, v in receipt.items() if k != "trace"}
+        raise _RpcError(-32601, f"method not supported by SimChain: {method}")
+
+    def dispatch(self, request: Any) -> Any:
+        """Handle a JSON-RPC request object or batch."""
+        if isinstance(request, list):
+            return [self.dispatch(r) for r in request]
+        method, params = request.get("method", ""), request.get("params") or []
+        start = time.perf_counter()
+        response: dict = {"jsonrpc": "2.0", "id": request.get("id")}
+        with self._lock:
+            try:
+                response["result"] = self.handle(method, params)
+            except SimRevert as e:
+                reason = abi_encode(["string"], [str(e)]).hex()
+                response["error"] = {
+                    "code": 3,
+                    "message": f"execution reverted: {e}",
+                    "data": "0x08c379a0" + reason,
+                }
+            except _RpcError as e:
+                response["error"] = {"code": e.code, "message": e.message}
+        stat = self.rpc_stats.setdefault(method, [0, 0.0])
+        stat[0] += 1
+        stat[1] += time.perf_counter() - start
+        return response
+
+    # ── HTTP ─────────────────────────────────────────────────────────────
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving JSON-RPC on a background thread. Returns the URL."""
+        chain = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                payload = json.dumps(chain.dispatch(json.loads(body))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        return self.url
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "SimChain":
+        if not self.url:
+            self.serve()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
@@ -158,16 +158,16 @@ class WalletManager:
         )
         return usdc.functions.balanceOf(Web3.to_checksum_address(safe_address)).call() / 1e6
 
-    def safe_exec(self, safe_address: str, to: str, data: bytes, gas: int = 350000) -> str:
-        """Execute a transaction through the Gnosis Safe. EOA signs + pays gas.
+    def _build_safe_exec_tx(
+        self, w3: Web3, safe_address: str, to: str, data: bytes, gas: int, operation: int = 0
+    ) -> dict:
+        """Sign the SafeTx as owner and build the outer execTransaction call.
 
-        The Safe becomes msg.sender for the inner call — so USDC.e and tokens
-        are pulled from / minted to the Safe, not the EOA.
+        operation 0 = CALL, 1 = DELEGATECALL (used for MultiSend batches).
         """
         if not self._private_key:
             raise ValueError("No wallet configured")
 
-        w3 = self._get_web3()
         eoa = Web3.to_checksum_address(self._address)
         safe = Web3.to_checksum_address(safe_address)
         to_addr = Web3.to_checksum_address(to)
@@ -185,7 +185,7 @@ class WalletManager:
             abi_encode(
                 ["bytes32", "address", "uint256", "bytes32", "uint8",
                  "uint256", "uint256", "uint256", "address", "address", "uint256"],
-                [_SAFE_TX_TYPEHASH, to_addr, 0, Web3.keccak(data), 0,
+                [_SAFE_TX_TYPEHASH, to_addr, 0, Web3.keccak(data), operation,
                  0, 0, 0, _ZERO_ADDR, _ZERO_ADDR, nonce],
             )
         )
@@ -197,8 +197,8 @@ class WalletManager:
         sig = account._key_obj.sign_msg_hash(final_hash)
         signature = sig.r.to_bytes(32, "big") + sig.s.to_bytes(32, "big") + bytes([sig.v + 27])
 
-        tx = safe_contract.functions.execTransaction(
-            to_addr, 0, data, 0, 0, 0, 0, _ZERO_ADDR, _ZERO_ADDR, signature
+        return safe_contract.functions.execTransaction(
+            to_addr, 0, data, operation, 0, 0, 0, _ZERO_ADDR, _ZERO_ADDR, signature
         ).build_transaction({
             "from": eoa,
             "nonce": w3.eth.get_transaction_count(eoa),
@@ -207,6 +207,15 @@ class WalletManager:
             "chainId": POLYGON_CHAIN_ID,
         })
 
+    def safe_exec(self, safe_address: str, to: str, data: bytes, gas: int = 350000, operation: int = 0) -> str:
+        """Execute a transaction through the Gnosis Safe. EOA signs + pays gas.
+
+        The Safe becomes msg.sender for the inner call — so USDC.e and tokens
+        are pulled from / minted to the Safe, not the EOA.
+        """
+        w3 = self._get_web3()
+        tx = self._build_safe_exec_tx(w3, safe_address, to, data, gas, operation)
+
         acct = w3.eth.account.from_key(self._private_key)
         signed = acct.sign_transaction(tx)
         tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
@@ -217,6 +226,21 @@ class WalletManager:
 
         return tx_hash.hex()
 
+    def simulate_safe_exec(
+        self, safe_address: str, to: str, data: bytes, gas: int = 350000, operation: int = 0
+    ) -> int:
+        """Dry-run a Safe transaction with eth_call + eth_estimateGas. Nothing is broadcast.
+
+        Returns the estimated gas. Raises ValueError if the call would revert.
+        """
+        w3 = self._get_web3()
+        tx = self._build_safe_exec_tx(w3, safe_address, to, data, gas, operation)
+        try:
+            w3.eth.call(tx, "pending")
+            return w3.eth.estimate_gas(tx, "pending")
+        except Exception as e:
+            raise ValueError(f"Safe execTransaction would revert: {e}")
+
     def check_approvals(self) -> bool:
         """Check if all Polymarket approvals are set."""
         if not self._address:
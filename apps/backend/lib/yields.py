@@ -0,0 +1,174 @@
+"""
+DefiLlama yields snapshot — the tracked Base USDC pools, kept in memory.
+
+yields.llama.fi/pools lists every pool DefiLlama knows about (thousands,
+several MB of JSON). Only a handful matter here: USDC pools on Base from
+TRACKED_PROTOCOLS. One background loop downloads the dataset every
+YIELDS_REFRESH_SECONDS and parses it as it streams in, decoding one pool
+object at a time and keeping only the tracked ones. The full document is
+never held in memory.
+
+The result replaces the previous snapshot in one assignment, together with
+its `updated_at` time. GET /vaults/base and the auto-rebalance cron read it
+without a network call. Only the very first read before the loop has
+finished a refresh fetches inline, and concurrent first reads share that
+one download. A failed refresh keeps serving the last good snapshot.
+
+Env vars:
+  YIELDS_REFRESH_SECONDS  Snapshot refresh interval (default: 600)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import httpx
+
+log = logging.getLogger("yields")
+
+DEFILLAMA_YIELDS = "https://yields.llama.fi/pools"
+YIELDS_REFRESH = int(os.environ.get("YIELDS_REFRESH_SECONDS", "600"))
+
+# protocols we track on Base: DefiLlama project slug → display name
+TRACKED_PROTOCOLS = {
+    "aave-v3":     "Aave v3",
+    "compound-v3": "Compound v3",
+    "euler":       "Euler",
+    "morpho":      "Morpho",
+    "fluid":       "Fluid",
+}
+
+_decoder = json.JSONDecoder()
+
+
+@dataclass
+class YieldPool:
+    """One tracked Base USDC pool as DefiLlama reports it."""
+
+    project: str
+    pool_id: str       # DefiLlama pool id (the vault contract for ERC4626 protocols)
+    symbol: str
+    apy: float         # total APY (base + rewards)
+    apy_base: float
+    apy_reward: float
+    tvl_usd: float
+    url: Optional[str] = None
+
+
+def _tracked(pool: dict) -> Optional[YieldPool]:
+    """The pool as a YieldPool if it is a tracked Base USDC pool, else None."""
+    if (pool.get("chain") or "").lower() != "base":
+        return None
+    project = (pool.get("project") or "").lower()
+    symbol = (pool.get("symbol") or "").upper()
+    if project not in TRACKED_PROTOCOLS or "USDC" not in symbol:
+        return None
+    return YieldPool(
+        project=project,
+        pool_id=pool.get("pool", ""),
+        symbol=symbol,
+        apy=pool.get("apy") or 0,
+        apy_base=pool.get("apyBase") or 0,
+        apy_reward=pool.get("apyReward") or 0,
+        tvl_usd=pool.get("tvlUsd") or 0,
+        url=pool.get("url"),
+    )
+
+
+async def iter_pools(chunks: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """Yield each object of the top-level "data" array of a {"data": [...]} document as it arrives.
+
+    Only the current, not yet complete pool object is buffered. Raises ValueError
+    if the stream ends before the array does.
+    """
+    buf, pos, in_array = "", 0, False
+    async for chunk in chunks:
+        buf = buf[pos:] + chunk
+        pos = 0
+        if not in_array:
+            key = buf.find('"data"')
+            bracket = buf.find("[", key) if key >= 0 else -1
+            if bracket < 0:
+                # keep the key, or a key split across chunks
+                pos = key if key >= 0 else max(0, len(buf) - len('"data"'))
+                continue
+            pos, in_array = bracket + 1, True
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                return
+            try:
+                obj, pos = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break       # object continues in the next chunk
+            yield obj
+    raise ValueError("response ended inside the data array")
+
+
+class YieldsSnapshot:
+    """Tracked Base USDC pools from the last successful DefiLlama download."""
+
+    def __init__(self, url: str = DEFILLAMA_YIELDS):
+        self.url = url
+        self.pools: list[YieldPool] = []            # sorted by APY, best first
+        self.updated_at: Optional[float] = None     # unix time of the last successful refresh
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.updated_at is not None
+
+    async def refresh(self) -> int:
+        """Download and stream-parse the dataset, then swap in the tracked pools. Returns pools kept."""
+        async with self._lock:
+            return await self._refresh()
+
+    async def _refresh(self) -> int:
+        pools: list[YieldPool] = []
+        seen = 0
+        async with httpx.AsyncClient(timeout=30) as client:
+            async with client.stream("GET", self.url) as resp:
+                resp.raise_for_status()
+                async for raw in iter_pools(resp.aiter_text()):
+                    seen += 1
+                    pool = _tracked(raw)
+                    if pool is not None:
+                        pools.append(pool)
+        if not seen:
+            raise ValueError("no pools in DefiLlama response")
+        pools.sort(key=lambda p: p.apy, reverse=True)
+        self.pools, self.updated_at = pools, time.time()
+        log.debug(f"[yields] kept {len(pools)} of {seen} pools")
+        return len(pools)
+
+    async def current(self) -> list[YieldPool]:
+        """The snapshot's pools. Fetches inline only if no refresh has succeeded yet."""
+        if not self.ready:
+            async with self._lock:
+                if not self.ready:
+                    try:
+                        await self._refresh()
+                    except Exception as e:
+                        log.warning(f"[yields] DefiLlama fetch failed: {e}")
+        return self.pools
+
+
+yields = YieldsSnapshot()
+
+
+async def start_yields_refresher() -> None:
+    """Background loop: refresh the snapshot at boot, then every YIELDS_REFRESH_SECONDS."""
+    log.info(f"[yields] DefiLlama snapshot refresher started — interval: {YIELDS_REFRESH}s")
+    while True:
+        try:
+            await yields.refresh()
+        except Exception as e:
+            log.warning(f"[yields] refresh failed, keeping snapshot from {yields.updated_at}: {e}")
+        await asyncio.sleep(YIELDS_REFRESH)
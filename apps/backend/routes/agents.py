@@ -1,21 +1,24 @@
 """Agent routes — positions, trade history, and PnL."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
 from typing import Optional
 
-from lib.auth import require_api_key, hash_api_key
-from lib.agent_store import AgentStore
-from lib.position_storage import PositionStorage, TradeStorage
-from lib.gamma_client import GammaClient
+from lib.auth import current_agent
+from lib.agent_store import Agent, AgentStore
+from lib.position_storage import TradeStorage
+from lib.pagination import decode_cursor, keyset_page
+from lib.equity import equity_range, fetch_equity
+from lib.pnl import compute_agent_pnl
+from lib.pnl_engine import pnl_engine
 from typing import Optional as Opt
 
 
 router = APIRouter()
 store = AgentStore()
-positions = PositionStorage()
 trades = TradeStorage()
-gamma = GammaClient()
 
 
 class PositionOut(BaseModel):
@@ -26,6 +29,8 @@ class PositionOut(BaseModel):
     token_id: Optional[str]
     entry_amount: Optional[float]
     entry_price: Optional[float]
+    shares: Optional[float] = None
+    payout_usd: Optional[float] = None
     current_price: Optional[float]
     pnl_usd: Optional[float]
     pnl_pct: Optional[float]
@@ -69,7 +74,7 @@ class FlagsUpdate(BaseModel):
 async def update_agent_flags(
     agent_id: str,
     body: FlagsUpdate,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Toggle flags and configure auto-invest settings.
 
@@ -78,8 +83,6 @@ async def update_agent_flags(
     freemonies_max_markets      — max markets to invest in per cycle (default 2)
     freemonies_amount_per_market — USDC per market trade (default $2, min $2)
     """
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != agent_id:
         raise HTTPException(status_code=403, detail="API key does not match agent")
 
@@ -104,70 +107,56 @@ async def update_agent_flags(
 
 
 @router.get("/agents/{agent_id}/positions", response_model=list[PositionOut])
-async def get_agent_positions(agent_id: str, api_key: str = Depends(require_api_key)):
-    """Get all positions for an agent with live P&L."""
+async def get_agent_positions(agent_id: str, agent: Optional[Agent] = Depends(current_agent)):
+    """Get all positions for an agent with live P&L (one batched price lookup, see lib/pnl.py)."""
 
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != agent_id:
         raise HTTPException(status_code=403, detail="API key does not match agent")
 
-    rows = await positions.get_by_agent(agent_id)
-    results = []
-
-    for row in rows:
-        current_price = None
-        pnl_usd = None
-        pnl_pct = None
-
-        # Fetch live price for open positions
-        if row.get("status") == "open" and row.get("token_id"):
-            try:
-                prices = await gamma.get_prices([row["token_id"]])
-                if row["token_id"] in prices:
-                    current_price = float(prices[row["token_id"]])
-                    entry = row.get("entry_price", 0) or 0
-                    amount = row.get("entry_amount", 0) or 0
-                    if entry > 0 and amount > 0:
-                        tokens = amount / entry
-                        current_value = tokens * current_price
-                        pnl_usd = round(current_value - amount, 2)
-                        pnl_pct = round((pnl_usd / amount) * 100, 2)
-            except Exception:
-                pass
-
-        results.append(PositionOut(
-            position_id=row["position_id"],
-            market_id=row["market_id"],
-            question=row.get("question", ""),
-            position=row["position"],
-            token_id=row.get("token_id"),
-            entry_amount=row.get("entry_amount"),
-            entry_price=row.get("entry_price"),
-            current_price=current_price,
-            pnl_usd=pnl_usd,
-            pnl_pct=pnl_pct,
-            status=row.get("status", "open"),
-            created_at=str(row.get("created_at", "")),
-        ))
-
-    return results
+    pnl = await compute_agent_pnl(agent_id)
+
+    return [
+        PositionOut(
+            position_id=v.row["position_id"],
+            market_id=v.row["market_id"],
+            question=v.row.get("question", ""),
+            position=v.row["position"],
+            token_id=v.row.get("token_id"),
+            entry_amount=v.row.get("entry_amount"),
+            entry_price=v.row.get("entry_price"),
+            shares=v.row.get("shares"),
+            payout_usd=v.row.get("payout_usd"),
+            current_price=v.current_price,
+            pnl_usd=v.pnl_usd,
+            pnl_pct=v.pnl_pct,
+            status=v.row.get("status", "open"),
+            created_at=str(v.row.get("created_at", "")),
+        )
+        for v in pnl.positions
+    ]
 
 
 @router.get("/agents/{agent_id}/trades", response_model=list[TradeOut])
 async def get_agent_trades(
     agent_id: str,
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
-    api_key: str = Depends(require_api_key),
+    cursor: Optional[str] = Query(None),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
-    """Get trade history for an agent."""
+    """Get trade history for an agent.
+
+    Keyset-paginated: when more trades exist, the X-Next-Cursor response
+    header carries the `cursor` for the next page (the body stays a list).
+    """
 
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != agent_id:
         raise HTTPException(status_code=403, detail="API key does not match agent")
 
-    rows = await trades.get_by_agent(agent_id, limit=limit)
+    rows = await trades.get_by_agent(agent_id, limit=limit + 1, before=decode_cursor(cursor))
+    rows, next_cursor = keyset_page(rows, limit, "trade_id")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
     return [
         TradeOut(
@@ -188,51 +177,53 @@ async def get_agent_trades(
     ]
 
 
+@router.get("/agents/{agent_id}/equity")
+async def get_agent_equity(
+    agent_id: str,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    resolution: str = Query("auto", pattern="^(auto|1m|1h|1d)$"),
+    agent: Optional[Agent] = Depends(current_agent),
+):
+    """Equity history (Safe USDC + vault + open positions) from the snapshot tiers in lib/equity.py.
+
+    Defaults to the last 24h. `auto` picks the finest resolution still
+    retained for `start`.
+    """
+
+    if not agent or agent.agent_id != agent_id:
+        raise HTTPException(status_code=403, detail="API key does not match agent")
+
+    start, end = equity_range(start, end)
+    return {"agentId": agent_id, **await fetch_equity([agent_id], start, end, resolution)}
+
+
 @router.get("/agents/{agent_id}/pnl", response_model=PnLSummary)
-async def get_agent_pnl(agent_id: str, api_key: str = Depends(require_api_key)):
-    """Get P&L summary for an agent."""
+async def get_agent_pnl(agent_id: str, agent: Optional[Agent] = Depends(current_agent)):
+    """Get P&L summary for an agent.
+
+    Served from the incremental engine (lib/pnl_engine.py) once it has been
+    built; until then valued directly via lib/pnl.py.
+    """
 
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != agent_id:
         raise HTTPException(status_code=403, detail="API key does not match agent")
 
-    pos_rows = await positions.get_by_agent(agent_id)
-    trade_rows = await trades.get_by_agent(agent_id)
-
-    total_invested = 0.0
-    total_current = 0.0
-    open_count = 0
-
-    for row in pos_rows:
-        entry = row.get("entry_price", 0) or 0
-        amount = row.get("entry_amount", 0) or 0
-        total_invested += amount
-
-        if row.get("status") == "open" and row.get("token_id") and entry > 0:
-            open_count += 1
-            try:
-                prices = await gamma.get_prices([row["token_id"]])
-                if row["token_id"] in prices:
-                    current_price = float(prices[row["token_id"]])
-                    tokens = amount / entry
-                    total_current += tokens * current_price
-                else:
-                    total_current += amount  # Fallback to entry
-            except Exception:
-                total_current += amount
-        else:
-            total_current += amount
-
-    pnl_usd = round(total_current - total_invested, 2)
-    pnl_pct = round((pnl_usd / total_invested) * 100, 2) if total_invested > 0 else 0.0
+    if pnl_engine.ready:
+        return PnLSummary(
+            agentId=agent_id,
+            **pnl_engine.agent_totals(agent_id),
+            total_trades=await TradeStorage().count_by_agent(agent_id),
+        )
+
+    pnl = await compute_agent_pnl(agent_id)
 
     return PnLSummary(
         agentId=agent_id,
-        total_invested=round(total_invested, 2),
-        total_current_value=round(total_current, 2),
-        total_pnl_usd=pnl_usd,
-        total_pnl_pct=pnl_pct,
-        open_positions=open_count,
-        total_trades=len(trade_rows),
+        total_invested=pnl.total_invested,
+        total_current_value=pnl.total_current_value,
+        total_pnl_usd=pnl.total_pnl_usd,
+        total_pnl_pct=pnl.total_pnl_pct,
+        open_positions=pnl.open_positions,
+        total_trades=pnl.total_trades,
     )
@@ -1,18 +1,15 @@
-"""Balance route — multi-chain balances: Polygon EOA+Safe, Solana vault, Base EOA."""
+"""Balance routes — multi-chain balances: Polygon EOA+Safe, Solana vault, Base EOA."""
 
 import os
-import asyncio
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request, Header
 from pydantic import BaseModel
-from web3 import Web3
 
-from lib.auth import require_api_key, hash_api_key
-from lib.agent_store import AgentStore
-from lib.contracts import CONTRACTS, ERC20_ABI, derive_polymarket_safe
-from lib.database import get_pool
+from lib.auth import resolve_agent
+from lib.agent_store import Agent, AgentStore
+from lib.balances import BASE, POLYGON, SOLANA, Balance, balances
+from lib.contracts import derive_polymarket_safe
 from routes.oauth import get_current_user
 
 
@@ -26,9 +23,6 @@ CHAIN_LOGOS = {
 }
 USDC_LOGO = "https://raw.githubusercontent.com/trustwallet/assets/master/blockchains/binance/assets/USDC-CD2/logo.png"
 
-BASE_USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
-SOLANA_USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
-
 
 class ChainBalance(BaseModel):
     chain: str
@@ -50,52 +44,43 @@ class BalanceResponse(BaseModel):
     flags: dict
 
 
-# ── chain helpers ─────────────────────────────────────────────────────────────
-
-def _evm_balance(rpc_url: str, address: str, usdc_contract_addr: str) -> tuple[float, float]:
-    """Return (native, usdc) for any EVM chain."""
-    try:
-        from web3.middleware import ExtraDataToPOAMiddleware
-        w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": 15}))
-        w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
-        cs = Web3.to_checksum_address(address)
-        native = float(w3.from_wei(w3.eth.get_balance(cs), "ether"))
-        usdc_c = w3.eth.contract(address=Web3.to_checksum_address(usdc_contract_addr), abi=ERC20_ABI)
-        usdc = usdc_c.functions.balanceOf(cs).call() / 1e6
-        return native, usdc
-    except Exception as e:
-        print(f"evm balance error [{address}]: {e}")
-        return 0.0, 0.0
-
-
-async def _solana_balance(address: str) -> tuple[float, float]:
-    """Return (SOL, USDC) for a Solana address."""
-    if not address or address == "not derived":
-        return 0.0, 0.0
-    rpc = os.environ.get("SOLANA_RPC_URL", "https://api.mainnet-beta.solana.com")
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            sol_resp = await client.post(rpc, json={
-                "jsonrpc": "2.0", "id": 1, "method": "getBalance",
-                "params": [address],
-            })
-            lamports = sol_resp.json().get("result", {}).get("value", 0)
-
-            tok_resp = await client.post(rpc, json={
-                "jsonrpc": "2.0", "id": 2,
-                "method": "getTokenAccountsByOwner",
-                "params": [address, {"mint": SOLANA_USDC_MINT}, {"encoding": "jsonParsed"}],
-            })
-            accounts = tok_resp.json().get("result", {}).get("value", [])
-            usdc = 0.0
-            if accounts:
-                usdc = float(
-                    accounts[0]["account"]["data"]["parsed"]["info"]["tokenAmount"]["uiAmount"] or 0
-                )
-            return lamports / 1e9, usdc
-    except Exception as e:
-        print(f"solana balance error [{address}]: {e}")
-        return 0.0, 0.0
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+def _balance_keys(agent: Agent) -> list[tuple[str, str]]:
+    """(chain, address) snapshot keys for one agent: polygon eoa, polygon safe, base eoa[, solana vault]."""
+    safe_addr = agent.polygon_safe or derive_polymarket_safe(agent.wallet_address)
+    keys = [(POLYGON, agent.wallet_address), (POLYGON, safe_addr), (BASE, agent.wallet_address)]
+    if agent.solana_wallet and agent.solana_wallet != "not derived":
+        keys.append((SOLANA, agent.solana_wallet))
+    return keys
+
+
+def _chain_balance(chain: str, address: str, balance: Balance, native_symbol: str) -> ChainBalance:
+    return ChainBalance(
+        chain=chain, chain_logo=CHAIN_LOGOS[chain],
+        address=address,
+        native=round(balance.native, 6), native_symbol=native_symbol,
+        usdc=round(balance.usdc, 6),
+    )
+
+
+def _balance_response(agent: Agent, snap: dict[tuple[str, str], Balance]) -> BalanceResponse:
+    keys = _balance_keys(agent)
+    pol_eoa, pol_safe, base_eoa = (snap[k] for k in keys[:3])
+    sol = snap[keys[3]] if len(keys) > 3 else Balance(0.0, 0.0)
+
+    return BalanceResponse(
+        agentId=agent.agent_id,
+        polygon_eoa=_chain_balance("polygon", agent.wallet_address, pol_eoa, "POL"),
+        polygon_safe=_chain_balance("polygon", keys[1][1], pol_safe, "POL"),
+        solana_wallet=_chain_balance("solana", agent.solana_wallet or "not derived", sol, "SOL"),
+        base_eoa=_chain_balance("base", agent.wallet_address, base_eoa, "ETH"),
+        total_usdc=round(pol_eoa.usdc + pol_safe.usdc + base_eoa.usdc + sol.usdc, 6),
+        flags={
+            "auto_rebalance": agent.auto_rebalance,
+            "auto_freemonies": agent.auto_freemonies,
+        },
+    )
 
 
 # ── route ─────────────────────────────────────────────────────────────────────
@@ -113,10 +98,11 @@ async def get_balance(
     - polygon safe (POL + USDC.e) — polymarket proxy wallet
     - solana vault (SOL + USDC)   — metengine x402 payments
     - base eoa     (ETH + USDC)   — same address, base chain
+    served from lib/balances.py snapshots (BALANCE_TTL); misses cost one
+    multicall per evm chain plus one solana rpc batch.
     """
     if api_key and api_key.startswith("epk_"):
-        key_hash = hash_api_key(api_key)
-        agent = await store.get_agent_by_key_hash(key_hash)
+        agent = await resolve_agent(request)
         if not agent or agent.agent_id != agent_id:
             raise HTTPException(status_code=403, detail="API key does not match agent")
     else:
@@ -126,63 +112,36 @@ async def get_balance(
         agent = await store.get_agent(agent_id)
         if not agent:
             raise HTTPException(status_code=404, detail="agent not found")
-        pool = get_pool()
-        owner = await pool.fetchval("SELECT owner_id FROM agents WHERE agent_id = $1", agent_id)
-        if owner != user["sub"]:
+        if agent.owner_id != user["sub"]:
             raise HTTPException(status_code=403, detail="you do not own this agent")
 
-    polygon_rpc = os.environ.get("CHAINSTACK_NODE", "")
-    base_rpc = os.environ.get("BASE_RPC_URL", "https://mainnet.base.org")
-    if not polygon_rpc:
+    if not os.environ.get("CHAINSTACK_NODE", ""):
         raise HTTPException(status_code=503, detail="polygon RPC not configured (CHAINSTACK_NODE)")
 
-    safe_addr = agent.polygon_safe or derive_polymarket_safe(agent.wallet_address)
-    solana_addr = agent.solana_wallet or ""
+    keys = _balance_keys(agent)
+    return _balance_response(agent, await balances.get_many(keys))
 
-    loop = asyncio.get_event_loop()
 
-    # kick off EVM queries in thread pool (blocking Web3 calls)
-    pol_eoa_fut  = loop.run_in_executor(None, _evm_balance, polygon_rpc, agent.wallet_address, CONTRACTS["USDC_E"])
-    pol_safe_fut = loop.run_in_executor(None, _evm_balance, polygon_rpc, safe_addr, CONTRACTS["USDC_E"])
-    base_fut     = loop.run_in_executor(None, _evm_balance, base_rpc, agent.wallet_address, BASE_USDC)
-    sol_coro     = _solana_balance(solana_addr)
+class UserBalancesResponse(BaseModel):
+    agents: list[BalanceResponse]
+    total_usdc: float
 
-    pol_eoa_native,  pol_eoa_usdc  = await pol_eoa_fut
-    pol_safe_native, pol_safe_usdc = await pol_safe_fut
-    base_native,     base_usdc     = await base_fut
-    sol_native,      sol_usdc      = await sol_coro
 
-    total_usdc = pol_eoa_usdc + pol_safe_usdc + base_usdc + sol_usdc
+@router.get("/user/balances", response_model=UserBalancesResponse)
+async def get_user_balances(request: Request):
+    """
+    balances for every agent the logged-in user owns, in one response.
+    all addresses go into a single balances.get_many, so a cold dashboard
+    costs one multicall per evm chain plus one solana getMultipleAccounts,
+    however many agents there are.
+    """
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+    if not os.environ.get("CHAINSTACK_NODE", ""):
+        raise HTTPException(status_code=503, detail="polygon RPC not configured (CHAINSTACK_NODE)")
 
-    return BalanceResponse(
-        agentId=agent_id,
-        polygon_eoa=ChainBalance(
-            chain="polygon", chain_logo=CHAIN_LOGOS["polygon"],
-            address=agent.wallet_address,
-            native=round(pol_eoa_native, 6), native_symbol="POL",
-            usdc=round(pol_eoa_usdc, 6),
-        ),
-        polygon_safe=ChainBalance(
-            chain="polygon", chain_logo=CHAIN_LOGOS["polygon"],
-            address=safe_addr,
-            native=round(pol_safe_native, 6), native_symbol="POL",
-            usdc=round(pol_safe_usdc, 6),
-        ),
-        solana_wallet=ChainBalance(
-            chain="solana", chain_logo=CHAIN_LOGOS["solana"],
-            address=solana_addr or "not derived",
-            native=round(sol_native, 6), native_symbol="SOL",
-            usdc=round(sol_usdc, 6),
-        ),
-        base_eoa=ChainBalance(
-            chain="base", chain_logo=CHAIN_LOGOS["base"],
-            address=agent.wallet_address,
-            native=round(base_native, 6), native_symbol="ETH",
-            usdc=round(base_usdc, 6),
-        ),
-        total_usdc=round(total_usdc, 6),
-        flags={
-            "auto_rebalance": agent.auto_rebalance,
-            "auto_freemonies": agent.auto_freemonies,
-        },
-    )
+    agents = await store.list_by_owner(user["sub"])
+    snap = await balances.get_many([k for a in agents for k in _balance_keys(a)])
+    out = [_balance_response(a, snap) for a in agents]
+    return UserBalancesResponse(agents=out, total_usdc=round(sum(b.total_usdc for b in out), 6))
@@ -7,13 +7,13 @@ Bridge API base: https://bridge.polymarket.com
 """
 
 import httpx
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
 import os
 
 from web3 import Web3
-from lib.auth import require_api_key, hash_api_key
+from lib.auth import resolve_agent
 from lib.agent_store import AgentStore
 from lib.contracts import CONTRACTS, PROXY_WALLET_ABI
 
@@ -108,6 +108,7 @@ async def get_supported_assets():
 @router.post("/address")
 async def create_deposit_address(
     req: DepositAddressRequest,
+    request: Request,
     x_api_key: Optional[str] = Header(None, alias="x-api-key"),
 ):
     """Get cross-chain deposit addresses for a Polymarket Safe wallet.
@@ -131,8 +132,7 @@ async def create_deposit_address(
     elif req.agentId:
         if not x_api_key:
             raise HTTPException(status_code=401, detail="API key required when using agentId")
-        key_hash = hash_api_key(x_api_key)
-        agent = await store.get_agent_by_key_hash(key_hash)
+        agent = await resolve_agent(request)
         if not agent or agent.agent_id != req.agentId:
             raise HTTPException(status_code=403, detail="API key does not match agent")
         safe_address = _get_safe_address(agent.wallet_address)
@@ -13,6 +13,7 @@ from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+from lib.agent_store import agent_cache
 from lib.database import get_pool
 from routes.oauth import get_current_user
 
@@ -140,6 +141,7 @@ async def authorize_device(req: AuthorizeRequest, request: Request):
     await pool.execute(
         "UPDATE agents SET owner_id = $1 WHERE agent_id = $2", user_id, agent_id
     )
+    agent_cache.invalidate_agent(agent_id)
 
     # Mark device code as authorized
     await pool.execute(
@@ -204,55 +206,64 @@ async def poll_device(req: PollRequest):
 
 @router.get("/user/agents")
 async def get_user_agents(request: Request):
-    """Get all agents owned by the logged-in user, including last 5 trades each."""
+    """Get all agents owned by the logged-in user, including last 5 trades each.
+
+    One round-trip: each agent is LEFT JOINed LATERAL to its 5 newest trades
+    (an idx_trades_agent_created range scan per agent), giving one row per
+    (agent, trade) — or a single trade-less row for agents without trades.
+    """
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Login required")
 
     pool = get_pool()
     rows = await pool.fetch(
-        "SELECT * FROM agents WHERE owner_id = $1 ORDER BY created_at DESC",
+        """SELECT a.agent_id, a.wallet_address, a.wallet_index, a.scopes, a.created_at,
+                  t.trade_id, t.market_id, t.question, t.side, t.amount_usd, t.entry_price,
+                  t.status, t.clob_filled, t.split_tx, t.created_at AS trade_created_at
+           FROM agents a
+           LEFT JOIN LATERAL (
+               SELECT trade_id, market_id, question, side, amount_usd, entry_price,
+                      status, clob_filled, split_tx, created_at
+               FROM trades
+               WHERE agent_id = a.agent_id
+               ORDER BY created_at DESC, trade_id DESC
+               LIMIT 5
+           ) t ON TRUE
+           WHERE a.owner_id = $1
+           ORDER BY a.created_at DESC, a.agent_id, t.created_at DESC, t.trade_id DESC""",
         user["sub"],
     )
 
     agents = []
+    by_id: dict[str, dict] = {}
     for r in rows:
         agent_id = r["agent_id"]
-
-        # Fetch last 5 trades for this agent
-        trade_rows = await pool.fetch(
-            """SELECT trade_id, market_id, question, side, amount_usd, entry_price,
-                      status, clob_filled, split_tx, created_at
-               FROM trades
-               WHERE agent_id = $1
-               ORDER BY created_at DESC
-               LIMIT 5""",
-            agent_id,
-        )
-
-        recent_trades = [
-            {
-                "trade_id": t["trade_id"],
-                "market_id": t["market_id"],
-                "question": t.get("question") or "",
-                "side": t["side"],
-                "amount_usd": float(t["amount_usd"]),
-                "entry_price": float(t["entry_price"]) if t.get("entry_price") else None,
-                "status": t.get("status", "executed"),
-                "clob_filled": bool(t.get("clob_filled", False)),
-                "split_tx": t.get("split_tx"),
-                "created_at": t["created_at"].isoformat() if t.get("created_at") else "",
+        agent = by_id.get(agent_id)
+        if agent is None:
+            agent = by_id[agent_id] = {
+                "agentId": agent_id,
+                "walletAddress": r["wallet_address"],
+                "walletIndex": r.get("wallet_index", 0) or 0,
+                "scopes": list(r["scopes"]) if r["scopes"] else [],
+                "createdAt": r["created_at"].isoformat() if r["created_at"] else "",
+                "recentTrades": [],
             }
-            for t in trade_rows
-        ]
-
-        agents.append({
-            "agentId": agent_id,
-            "walletAddress": r["wallet_address"],
-            "walletIndex": r.get("wallet_index", 0) or 0,
-            "scopes": list(r["scopes"]) if r["scopes"] else [],
-            "createdAt": r["created_at"].isoformat() if r["created_at"] else "",
-            "recentTrades": recent_trades,
+            agents.append(agent)
+
+        if r["trade_id"] is None:
+            continue
+        agent["recentTrades"].append({
+            "trade_id": r["trade_id"],
+            "market_id": r["market_id"],
+            "question": r.get("question") or "",
+            "side": r["side"],
+            "amount_usd": float(r["amount_usd"]),
+            "entry_price": float(r["entry_price"]) if r.get("entry_price") else None,
+            "status": r.get("status", "executed"),
+            "clob_filled": bool(r.get("clob_filled", False)),
+            "split_tx": r.get("split_tx"),
+            "created_at": r["trade_created_at"].isoformat() if r.get("trade_created_at") else "",
         })
 
     return {"agents": agents}
@@ -8,7 +8,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, Header
 from pydantic import BaseModel
 
-from lib.auth import require_api_key, hash_api_key
+from lib.auth import resolve_agent
 from lib.agent_store import AgentStore
 from lib.tee_wallet import derive_wallet, is_tee_mode
 from routes.oauth import get_current_user
@@ -42,8 +42,7 @@ class ExportSolanaKeyResponse(BaseModel):
 async def _resolve_agent(req_agent_id: str, request: Request, api_key: Optional[str]):
     """Resolve agent from API key or session cookie, verify ownership."""
     if api_key and api_key.startswith("epk_"):
-        key_hash = hash_api_key(api_key)
-        agent = await store.get_agent_by_key_hash(key_hash)
+        agent = await resolve_agent(request)
         if not agent or agent.agent_id != req_agent_id:
             raise HTTPException(status_code=403, detail="API key does not match agent")
         return agent
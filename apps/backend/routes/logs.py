@@ -1,8 +1,14 @@
 """Agent logs routes — view API request history for user's agents."""
 
+from datetime import datetime
+
 from fastapi import APIRouter, Request, HTTPException, Query
 
 from lib.database import get_pool
+from lib.equity import equity_range, fetch_equity
+from lib.log_maintenance import RETENTION_DAYS as LOG_RETENTION_DAYS
+from lib.pagination import decode_cursor, estimate_count, keyset_page
+from lib.pnl_engine import pnl_engine
 from routes.oauth import get_current_user
 
 
@@ -13,12 +19,14 @@ router = APIRouter()
 async def get_user_logs(
     request: Request,
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None),
     agent_id: str | None = Query(None),
 ):
     """Return API request logs for all agents owned by the logged-in user.
 
-    Supports filtering by agent_id and pagination via limit/offset.
+    Supports filtering by agent_id and keyset pagination: pass the previous
+    response's nextCursor as `cursor`. `total` is an estimate from
+    agent_log_rollups (lags by up to a minute), not a row count.
     """
     user = get_current_user(request)
     if not user:
@@ -26,42 +34,38 @@ async def get_user_logs(
 
     pool = get_pool()
     user_id = user["sub"]
+    after = decode_cursor(cursor)
 
     # Build query — filter to only this user's agents
+    args: list = [user_id]
+    where = ["l.agent_id IN (SELECT agent_id FROM agents WHERE owner_id = $1)"]
     if agent_id:
-        rows = await pool.fetch(
-            """SELECT l.log_id, l.agent_id, l.method, l.path, l.status_code,
-                      l.duration_ms, l.ip_address, l.body_snippet, l.created_at
-               FROM agent_logs l
-               JOIN agents a ON l.agent_id = a.agent_id
-               WHERE a.owner_id = $1 AND l.agent_id = $2
-               ORDER BY l.created_at DESC
-               LIMIT $3 OFFSET $4""",
-            user_id, agent_id, limit, offset,
-        )
-        total = await pool.fetchval(
-            """SELECT COUNT(*) FROM agent_logs l
-               JOIN agents a ON l.agent_id = a.agent_id
-               WHERE a.owner_id = $1 AND l.agent_id = $2""",
-            user_id, agent_id,
-        )
-    else:
-        rows = await pool.fetch(
-            """SELECT l.log_id, l.agent_id, l.method, l.path, l.status_code,
-                      l.duration_ms, l.ip_address, l.body_snippet, l.created_at
-               FROM agent_logs l
-               JOIN agents a ON l.agent_id = a.agent_id
-               WHERE a.owner_id = $1
-               ORDER BY l.created_at DESC
-               LIMIT $2 OFFSET $3""",
-            user_id, limit, offset,
-        )
-        total = await pool.fetchval(
-            """SELECT COUNT(*) FROM agent_logs l
-               JOIN agents a ON l.agent_id = a.agent_id
-               WHERE a.owner_id = $1""",
-            user_id,
-        )
+        args.append(agent_id)
+        where.append(f"l.agent_id = ${len(args)}")
+    if after:
+        args += list(after)
+        where.append(f"(l.created_at, l.log_id) < (${len(args) - 1}, ${len(args)})")
+    args.append(limit + 1)
+
+    rows = await pool.fetch(
+        f"""SELECT l.log_id, l.agent_id, l.method, l.path, l.status_code,
+                   l.duration_ms, l.ip_address, l.body_snippet, l.created_at
+            FROM agent_logs l
+            WHERE {" AND ".join(where)}
+            ORDER BY l.created_at DESC, l.log_id DESC
+            LIMIT ${len(args)}""",
+        *args,
+    )
+    rows, next_cursor = keyset_page(rows, limit, "log_id")
+
+    total = await pool.fetchval(
+        """SELECT COALESCE(SUM(r.requests), 0) FROM agent_log_rollups r
+           JOIN agents a ON r.agent_id = a.agent_id
+           WHERE a.owner_id = $1
+             AND ($2::text IS NULL OR r.agent_id = $2)
+             AND r.minute >= NOW() - make_interval(days => $3)""",
+        user_id, agent_id, LOG_RETENTION_DAYS,
+    )
 
     logs = [
         {
@@ -82,33 +86,107 @@ async def get_user_logs(
         "logs": logs,
         "total": int(total or 0),
         "limit": limit,
-        "offset": offset,
+        "nextCursor": next_cursor,
     }
 
 
-@router.get("/user/trades")
-async def get_user_trades(
+@router.get("/user/logs/traffic")
+async def get_user_log_traffic(
     request: Request,
-    limit: int = Query(100, ge=1, le=500),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    agent_id: str | None = Query(None),
 ):
-    """Return all trades for agents owned by the logged-in user (most recent first)."""
+    """Request traffic for the user's agents, bucketed, from agent_log_rollups.
+
+    Reads the per-minute rollups, never raw logs. Buckets wider than a
+    minute merge rollups: p50 is the request-weighted mean of minute
+    medians, p95/p99 the worst minute's value.
+    """
     user = get_current_user(request)
     if not user:
         raise HTTPException(status_code=401, detail="Login required")
 
     pool = get_pool()
     rows = await pool.fetch(
-        """SELECT t.trade_id, t.agent_id, t.market_id, t.question, t.side,
-                  t.amount_usd, t.entry_price, t.status, t.clob_filled,
-                  t.split_tx, t.created_at
-           FROM trades t
-           JOIN agents a ON t.agent_id = a.agent_id
+        """SELECT date_trunc($2, r.minute) AS bucket,
+                  SUM(r.requests) AS requests,
+                  SUM(r.errors) AS errors,
+                  SUM(r.p50_ms * r.requests) / NULLIF(SUM(r.requests), 0) AS p50_ms,
+                  MAX(r.p95_ms) AS p95_ms,
+                  MAX(r.p99_ms) AS p99_ms,
+                  MAX(r.max_ms) AS max_ms
+           FROM agent_log_rollups r
+           JOIN agents a ON r.agent_id = a.agent_id
            WHERE a.owner_id = $1
-           ORDER BY t.created_at DESC
-           LIMIT $2""",
-        user["sub"], limit,
+             AND r.minute >= NOW() - make_interval(hours => $3)
+             AND ($4::text IS NULL OR r.agent_id = $4)
+           GROUP BY 1
+           ORDER BY 1""",
+        user["sub"], bucket, hours, agent_id,
     )
 
+    return {
+        "bucket": bucket,
+        "hours": hours,
+        "series": [
+            {
+                "t": r["bucket"].isoformat(),
+                "requests": int(r["requests"]),
+                "errors": int(r["errors"]),
+                "p50Ms": round(r["p50_ms"], 1) if r["p50_ms"] is not None else None,
+                "p95Ms": round(r["p95_ms"], 1) if r["p95_ms"] is not None else None,
+                "p99Ms": round(r["p99_ms"], 1) if r["p99_ms"] is not None else None,
+                "maxMs": r["max_ms"],
+            }
+            for r in rows
+        ],
+    }
+
+
+@router.get("/user/trades")
+async def get_user_trades(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None),
+):
+    """Return all trades for agents owned by the logged-in user (most recent first).
+
+    Keyset-paginated like /user/logs; `total` is the planner's row estimate.
+    """
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+
+    pool = get_pool()
+    after = decode_cursor(cursor)
+    # created_at is the cursor key — rows without one can't be paged past
+    owned = "t.agent_id IN (SELECT agent_id FROM agents WHERE owner_id = $1) AND t.created_at IS NOT NULL"
+    if after:
+        rows = await pool.fetch(
+            f"""SELECT t.trade_id, t.agent_id, t.market_id, t.question, t.side,
+                       t.amount_usd, t.entry_price, t.status, t.clob_filled,
+                       t.split_tx, t.created_at
+                FROM trades t
+                WHERE {owned} AND (t.created_at, t.trade_id) < ($2, $3)
+                ORDER BY t.created_at DESC, t.trade_id DESC
+                LIMIT $4""",
+            user["sub"], *after, limit + 1,
+        )
+    else:
+        rows = await pool.fetch(
+            f"""SELECT t.trade_id, t.agent_id, t.market_id, t.question, t.side,
+                       t.amount_usd, t.entry_price, t.status, t.clob_filled,
+                       t.split_tx, t.created_at
+                FROM trades t
+                WHERE {owned}
+                ORDER BY t.created_at DESC, t.trade_id DESC
+                LIMIT $2""",
+            user["sub"], limit + 1,
+        )
+    rows, next_cursor = keyset_page(rows, limit, "trade_id")
+    total = await estimate_count(pool, f"SELECT 1 FROM trades t WHERE {owned}", user["sub"])
+
     return {
         "trades": [
             {
@@ -124,5 +202,50 @@ async def get_user_trades(
                 "created_at": r["created_at"].isoformat() if r.get("created_at") else "",
             }
             for r in rows
-        ]
+        ],
+        "total": total,
+        "nextCursor": next_cursor,
+    }
+
+
+@router.get("/user/equity")
+async def get_user_equity(
+    request: Request,
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    resolution: str = Query("auto", pattern="^(auto|1m|1h|1d)$"),
+    agent_id: str | None = Query(None),
+):
+    """Equity history summed over the user's agents (or one of them), from lib/equity.py tiers."""
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+
+    start, end = equity_range(start, end)
+    owned = await get_pool().fetch(
+        "SELECT agent_id FROM agents WHERE owner_id = $1 AND ($2::text IS NULL OR agent_id = $2)",
+        user["sub"], agent_id,
+    )
+    return await fetch_equity([r["agent_id"] for r in owned], start, end, resolution)
+
+
+@router.get("/user/pnl")
+async def get_user_pnl(request: Request):
+    """Return live P&L totals for the logged-in user and each of their agents.
+
+    Read from the in-memory P&L engine (lib/pnl_engine.py), so this costs no
+    database or price round-trips. Returns 503 until the engine's first build.
+    """
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(status_code=401, detail="Login required")
+    if not pnl_engine.ready:
+        raise HTTPException(status_code=503, detail="P&L engine warming up")
+
+    return {
+        **pnl_engine.user_totals(user["sub"]),
+        "agents": [
+            {"agentId": agent_id, **pnl_engine.agent_totals(agent_id)}
+            for agent_id in pnl_engine.user_agents(user["sub"])
+        ],
     }
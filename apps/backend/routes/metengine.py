@@ -13,8 +13,8 @@ from typing import Optional
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query
 
-from lib.auth import require_api_key, hash_api_key
-from lib.agent_store import AgentStore
+from lib.auth import current_agent
+from lib.agent_store import Agent, AgentStore
 
 router = APIRouter(prefix="/metengine", tags=["MetEngine"])
 store = AgentStore()
@@ -141,13 +141,10 @@ async def _pay_x402_solana(privkey_b58: str, payment_info: dict) -> str:
 
 # ── Auth helper ───────────────────────────────────────────────────────────────
 
-async def _get_solana_key(api_key: str) -> str:
+async def _get_solana_key(agent: Optional[Agent]) -> str:
     """Get the Solana private key for the agent making the request."""
-    from lib.auth import hash_api_key
     from lib.tee_wallet import derive_solana_wallet, is_tee_mode
 
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent:
         raise HTTPException(status_code=403, detail="Invalid API key")
 
@@ -202,11 +199,8 @@ async def _get_solana_usdc_balance(address: str) -> dict:
         return {"sol": 0.0, "usdc": 0.0, "address": address, "error": str(e)}
 
 
-async def _get_agent_solana_address(api_key: str) -> str:
+async def _get_agent_solana_address(agent: Optional[Agent]) -> str:
     """Return the Solana vault address for an agent (no private key)."""
-    from lib.auth import hash_api_key
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent:
         raise HTTPException(status_code=403, detail="Invalid API key")
     return agent.solana_wallet or ""
@@ -243,10 +237,10 @@ async def metengine_trending(
     timeframe: str = "24h",
     sort_by: str = "volume_spike",
     limit: int = Query(default=20, le=100),
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Trending markets by volume spike, trade count, or smart money inflow."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/markets/trending", key,
                         params={"timeframe": timeframe, "sort_by": sort_by, "limit": limit})
 
@@ -255,10 +249,10 @@ async def metengine_trending(
 async def metengine_opportunities(
     min_signal_strength: Optional[str] = None,
     min_smart_wallets: Optional[int] = None,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Smart money opportunity scanner."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/markets/opportunities", key,
                         params={"min_signal_strength": min_signal_strength, "min_smart_wallets": min_smart_wallets})
 
@@ -267,10 +261,10 @@ async def metengine_opportunities(
 async def metengine_high_conviction(
     min_smart_wallets: Optional[int] = Query(default=5),
     min_avg_score: Optional[int] = Query(default=65),
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Markets with highest smart money conviction."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/markets/high-conviction", key,
                         params={"min_smart_wallets": min_smart_wallets, "min_avg_score": min_avg_score})
 
@@ -279,10 +273,10 @@ async def metengine_high_conviction(
 async def metengine_intelligence(
     condition_id: str,
     top_n_wallets: int = Query(default=10, le=50),
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Deep smart money intelligence for a market (by condition ID or slug)."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", f"/markets/{condition_id}/intelligence", key,
                         params={"top_n_wallets": top_n_wallets})
 
@@ -292,10 +286,10 @@ async def metengine_trades(
     condition_id: str,
     timeframe: str = "24h",
     smart_money_only: bool = False,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Recent trades for a market, filterable by smart money."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", f"/markets/{condition_id}/trades", key,
                         params={"timeframe": timeframe, "smart_money_only": smart_money_only})
 
@@ -305,10 +299,10 @@ async def metengine_whale_trades(
     min_usdc: Optional[float] = Query(default=10000),
     timeframe: str = "24h",
     market: Optional[str] = None,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Whale trades across all markets (min $10k USDC by default)."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/markets/whale-trades", key,
                         params={"min_usdc": min_usdc, "timeframe": timeframe, "market": market})
 
@@ -318,10 +312,10 @@ async def metengine_whale_trades(
 @router.get("/wallet/{address}")
 async def metengine_wallet_profile(
     address: str,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Full wallet profile — score, stats, positions."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", f"/wallets/{address}/profile", key, params={})
 
 
@@ -329,10 +323,10 @@ async def metengine_wallet_profile(
 async def metengine_wallet_pnl(
     address: str,
     timeframe: str = "90d",
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """PnL breakdown by position for a wallet."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", f"/wallets/{address}/pnl", key, params={"timeframe": timeframe})
 
 
@@ -341,10 +335,10 @@ async def metengine_top_performers(
     timeframe: str = "7d",
     metric: str = "pnl",
     limit: int = Query(default=25, le=100),
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Top performing wallets leaderboard."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/wallets/top-performers", key,
                         params={"timeframe": timeframe, "metric": metric, "limit": limit})
 
@@ -354,10 +348,10 @@ async def metengine_alpha_callers(
     days_back: int = 30,
     min_days_early: int = 7,
     min_bet_usdc: float = 100,
-    api_key: str = Depends(require_api_key),
+    agent: Optional[Agent] = Depends(current_agent),
 ):
     """Wallets that called outcomes early — alpha signal."""
-    key = await _get_solana_key(api_key)
+    key = await _get_solana_key(agent)
     return await _fetch("GET", "/wallets/alpha-callers", key,
                         params={"days_back": days_back, "min_days_early": min_days_early, "min_bet_usdc": min_bet_usdc})
 
@@ -365,14 +359,14 @@ async def metengine_alpha_callers(
 # ── Capacity check ────────────────────────────────────────────────────────────
 
 @router.get("/capacity")
-async def metengine_capacity(api_key: str = Depends(require_api_key)):
+async def metengine_capacity(agent: Optional[Agent] = Depends(current_agent)):
     """
     Check your Solana USDC balance and calculate how many MetEngine calls you can afford.
 
     Always call this before using paid MetEngine endpoints to avoid failed payments.
     The auto_freemonies feature also uses this to gate execution.
     """
-    solana_addr = await _get_agent_solana_address(api_key)
+    solana_addr = await _get_agent_solana_address(agent)
     if not solana_addr:
         raise HTTPException(status_code=503, detail="no solana wallet address on record for this agent — re-register to get one")
 
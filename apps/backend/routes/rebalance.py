@@ -5,8 +5,8 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 
-from lib.agent_store import AgentStore
-from lib.auth import hash_api_key, require_api_key
+from lib.agent_store import Agent, AgentStore
+from lib.auth import current_agent
 from lib.database import get_pool
 from lib.rebalance import (
     _env,
@@ -19,22 +19,20 @@ router = APIRouter(prefix="/rebalance", tags=["Rebalance"])
 store = AgentStore()
 
 
-async def _auth_agent(agent_id: str, api_key: str):
+async def _auth_agent(agent_id: str, agent: Optional[Agent]):
     """Verify the API key belongs to the requested agent_id."""
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != agent_id:
         raise HTTPException(status_code=403, detail="API key does not match agent")
     return agent
 
 
 @router.get("/{agent_id}/position")
-async def get_vault_position(agent_id: str, api_key: str = Depends(require_api_key)):
+async def get_vault_position(agent_id: str, caller: Optional[Agent] = Depends(current_agent)):
     """Current active vault position with live on-chain value and estimated earnings.
 
     Returns where the money is, what APY it's earning, and how much it's made so far.
     """
-    agent = await _auth_agent(agent_id, api_key)
+    agent = await _auth_agent(agent_id, caller)
     position = await _get_active_position(agent_id)
 
     if not position:
@@ -81,13 +79,13 @@ async def get_vault_position(agent_id: str, api_key: str = Depends(require_api_k
 async def get_rebalance_logs(
     agent_id: str,
     limit: int = Query(50, ge=1, le=200),
-    api_key: str = Depends(require_api_key),
+    caller: Optional[Agent] = Depends(current_agent),
 ):
     """Full history of rebalance actions — deposits, withdrawals, skips, errors.
 
     Shows where money was, when it moved, what APY triggered the move.
     """
-    await _auth_agent(agent_id, api_key)
+    await _auth_agent(agent_id, caller)
     db = get_pool()
     rows = await db.fetch(
         "SELECT * FROM vault_logs WHERE agent_id=$1 ORDER BY created_at DESC LIMIT $2",
@@ -98,12 +96,12 @@ async def get_rebalance_logs(
 
 
 @router.get("/{agent_id}/summary")
-async def get_rebalance_summary(agent_id: str, api_key: str = Depends(require_api_key)):
+async def get_rebalance_summary(agent_id: str, caller: Optional[Agent] = Depends(current_agent)):
     """One-line dashboard summary — ideal for the agent page idle money card.
 
     Shows current position, earnings, idle USDC, and next check time.
     """
-    agent = await _auth_agent(agent_id, api_key)
+    agent = await _auth_agent(agent_id, caller)
     position = await _get_active_position(agent_id)
     db = get_pool()
 
@@ -154,12 +152,12 @@ async def get_rebalance_summary(agent_id: str, api_key: str = Depends(require_ap
 
 
 @router.post("/{agent_id}/trigger")
-async def trigger_rebalance(agent_id: str, api_key: str = Depends(require_api_key)):
+async def trigger_rebalance(agent_id: str, caller: Optional[Agent] = Depends(current_agent)):
     """Manually trigger a rebalance check for this agent.
 
     Useful for testing. Runs the full rebalance cycle synchronously and returns the result.
     Warning: may take 30-120 seconds if transactions are submitted.
     """
-    agent = await _auth_agent(agent_id, api_key)
+    agent = await _auth_agent(agent_id, caller)
     result = await run_rebalance_for_agent(agent)
     return result
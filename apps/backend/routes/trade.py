@@ -1,4 +1,4 @@
-"""Trade route — real on-chain trade execution via split + CLOB sell.
+"""Trade routes — real on-chain trade execution via split + CLOB sell, and exits.
 
 Signs transactions with TEE-derived per-agent wallet or falls back
 to server wallet (POLYCLAW_PRIVATE_KEY). Records trades and positions
@@ -12,11 +12,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
-from lib.auth import require_api_key, hash_api_key
-from lib.agent_store import AgentStore
+from lib.auth import current_agent
+from lib.agent_store import Agent, AgentStore
 from lib.wallet_manager import WalletManager
 from lib.gamma_client import GammaClient
 from lib.position_storage import PositionStorage, PositionEntry, TradeStorage
+from lib.order_reconciler import track_order
+from lib.contracts import derive_polymarket_safe
+from lib.exits import EXIT_MAX_POSITIONS, NOT_OPEN, ExitResult, exit_positions
 
 # Import the real trade executor from scripts
 from scripts.trade import TradeExecutor
@@ -39,6 +42,7 @@ class TradeRequest(BaseModel):
     side: str  # YES or NO
     amountUsd: float
     skipClobSell: bool = False
+    dryRun: bool = False
     riskConfig: Optional[RiskConfig] = None
 
 
@@ -56,20 +60,40 @@ class TradeResponse(BaseModel):
     positionId: Optional[str]
     error: Optional[str]
     walletMode: str = "shared"
+    gasEstimate: Optional[int] = None
+    expectedFillPrice: Optional[float] = None
+    realizedFillPrice: Optional[float] = None
+
+
+def _agent_wallet(agent: Agent) -> tuple[WalletManager, str]:
+    """The agent's TEE-derived wallet, or the shared server wallet. Returns (wallet, wallet_mode)."""
+    wallet = WalletManager.from_tee(agent.wallet_index)
+    wallet_mode = "tee" if wallet.address and wallet.address.lower() == agent.wallet_address.lower() else "shared"
+
+    # If TEE wallet doesn't match (e.g. old agent registered before TEE), use shared
+    if not wallet.is_unlocked:
+        wallet = WalletManager()
+        wallet_mode = "shared"
+
+    if not wallet.is_unlocked:
+        raise HTTPException(
+            status_code=503,
+            detail="No wallet available. Set MNEMONIC (TEE) or POLYCLAW_PRIVATE_KEY in .env",
+        )
+    return wallet, wallet_mode
 
 
 @router.post("/trade", response_model=TradeResponse)
-async def execute_trade(req: TradeRequest, api_key: str = Depends(require_api_key)):
+async def execute_trade(req: TradeRequest, agent: Optional[Agent] = Depends(current_agent)):
     """Execute a real on-chain trade: split USDC into YES+NO, sell unwanted via CLOB.
 
     In TEE mode: signs with the agent's own derived wallet (from MNEMONIC + HD path).
     In fallback mode: signs with shared server wallet (POLYCLAW_PRIVATE_KEY).
     Requires a valid agent API key. Records trade + position in PostgreSQL.
+    With dryRun=true the split is eth_call-simulated and nothing is sent or recorded.
     """
 
     # 1. Verify API key ownership
-    key_hash = hash_api_key(api_key)
-    agent = await store.get_agent_by_key_hash(key_hash)
     if not agent or agent.agent_id != req.agentId:
         raise HTTPException(status_code=403, detail="API key does not match agent")
 
@@ -82,19 +106,7 @@ async def execute_trade(req: TradeRequest, api_key: str = Depends(require_api_ke
         raise HTTPException(status_code=400, detail="amountUsd must be positive")
 
     # 3. Initialize wallet — TEE per-agent key or shared fallback
-    wallet = WalletManager.from_tee(agent.wallet_index)
-    wallet_mode = "tee" if wallet.address and wallet.address.lower() == agent.wallet_address.lower() else "shared"
-
-    # If TEE wallet doesn't match (e.g. old agent registered before TEE), use shared
-    if not wallet.is_unlocked:
-        wallet = WalletManager()
-        wallet_mode = "shared"
-
-    if not wallet.is_unlocked:
-        raise HTTPException(
-            status_code=503,
-            detail="No wallet available. Set MNEMONIC (TEE) or POLYCLAW_PRIVATE_KEY in .env",
-        )
+    wallet, wallet_mode = _agent_wallet(agent)
 
     # 4. Pre-flight: check slippage against live market price
     risk = req.riskConfig or RiskConfig()
@@ -123,12 +135,33 @@ async def execute_trade(req: TradeRequest, api_key: str = Depends(require_api_ke
             position=side,
             amount=req.amountUsd,
             skip_clob_sell=req.skipClobSell,
+            dry_run=req.dryRun,
+            max_slippage=req.riskConfig.maxSlippage if req.riskConfig else None,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trade execution failed: {e}")
     finally:
         wallet.lock()
 
+    if result.simulated:
+        return TradeResponse(
+            status="simulated" if result.success else "failed",
+            tradeId="",
+            market=result.question,
+            marketId=req.marketId,
+            side=side,
+            amountUsd=req.amountUsd,
+            entryPrice=result.entry_price,
+            splitTx=None,
+            clobOrderId=None,
+            clobFilled=False,
+            positionId=None,
+            error=result.error,
+            walletMode=wallet_mode,
+            gasEstimate=result.gas_estimate,
+            expectedFillPrice=result.expected_fill_price,
+        )
+
     # 6. Generate trade ID
     trade_id = f"trd_{uuid.uuid4().hex[:16]}"
 
@@ -168,7 +201,21 @@ async def execute_trade(req: TradeRequest, api_key: str = Depends(require_api_ke
         )
         await positions.add(entry)
 
-    # 9. Return result
+    # 9. Hand the CLOB order to the reconciler so real fills update the cost basis
+    if result.clob_order_id:
+        await track_order(
+            order_id=result.clob_order_id,
+            agent_id=req.agentId,
+            signer_address=wallet.address,
+            token_id=result.sold_token_id,
+            side="SELL",
+            price=result.sell_limit_price or 0.0,
+            size=result.amount,
+            order_type="FOK",
+            position_id=position_id,
+        )
+
+    # 10. Return result
     return TradeResponse(
         status="executed" if result.success else "failed",
         tradeId=trade_id,
@@ -183,4 +230,100 @@ async def execute_trade(req: TradeRequest, api_key: str = Depends(require_api_ke
         positionId=position_id,
         error=result.error,
         walletMode=wallet_mode,
+        expectedFillPrice=result.expected_fill_price,
+        realizedFillPrice=result.realized_fill_price,
+    )
+
+
+class ExitRequest(BaseModel):
+    maxSlippage: Optional[float] = None
+
+
+class BatchExitRequest(BaseModel):
+    agentId: str
+    positionIds: list[str]
+    maxSlippage: Optional[float] = None
+
+
+class ExitOut(BaseModel):
+    positionId: str
+    status: str                      # closed / failed
+    route: Optional[str]             # merge / sell
+    shares: float
+    payoutUsd: Optional[float]
+    pnlUsd: Optional[float]
+    closeTx: Optional[str]           # merge tx hash or CLOB order id
+    error: Optional[str]
+
+
+class BatchExitResponse(BaseModel):
+    agentId: str
+    exits: list[ExitOut]
+    closed: int
+    totalPayoutUsd: float
+    totalPnlUsd: float
+
+
+def _exit_out(r: ExitResult) -> ExitOut:
+    return ExitOut(
+        positionId=r.position_id,
+        status=r.status,
+        route=r.route,
+        shares=r.shares,
+        payoutUsd=r.payout_usd,
+        pnlUsd=r.pnl_usd,
+        closeTx=r.close_tx,
+        error=r.error,
+    )
+
+
+async def _exit(agent: Agent, position_ids: list[str], max_slippage: Optional[float]) -> list[ExitResult]:
+    wallet, _ = _agent_wallet(agent)
+    safe = agent.polygon_safe or derive_polymarket_safe(wallet.address)
+    try:
+        return await exit_positions(wallet, safe, agent.agent_id, position_ids, max_slippage)
+    finally:
+        wallet.lock()
+
+
+@router.post("/positions/exit", response_model=BatchExitResponse)
+async def exit_positions_batch(req: BatchExitRequest, agent: Optional[Agent] = Depends(current_agent)):
+    """Exit several open positions at once (see lib/exits.py).
+
+    Merges go out in one Safe transaction and CLOB sells in one order batch.
+    Each position reports its own outcome; failed ones stay open.
+    """
+    if not agent or agent.agent_id != req.agentId:
+        raise HTTPException(status_code=403, detail="API key does not match agent")
+    position_ids = list(dict.fromkeys(req.positionIds))
+    if not position_ids:
+        raise HTTPException(status_code=400, detail="positionIds must not be empty")
+    if len(position_ids) > EXIT_MAX_POSITIONS:
+        raise HTTPException(status_code=400, detail=f"At most {EXIT_MAX_POSITIONS} positions per request")
+
+    results = await _exit(agent, position_ids, req.maxSlippage)
+    closed = [r for r in results if r.status == "closed"]
+    return BatchExitResponse(
+        agentId=agent.agent_id,
+        exits=[_exit_out(r) for r in results],
+        closed=len(closed),
+        totalPayoutUsd=round(sum(r.payout_usd for r in closed), 2),
+        totalPnlUsd=round(sum(r.pnl_usd for r in closed), 2),
     )
+
+
+@router.post("/positions/{position_id}/exit", response_model=ExitOut)
+async def exit_position(
+    position_id: str, req: Optional[ExitRequest] = None, agent: Optional[Agent] = Depends(current_agent)
+):
+    """Close one open position: merge YES+NO into USDC.e when the Safe holds both legs,
+    otherwise FOK-sell on the CLOB at an order-book-checked price.
+
+    Records payout_usd / close_tx on the position; realized P&L is returned as pnlUsd.
+    """
+    if not agent:
+        raise HTTPException(status_code=403, detail="API key required")
+    (result,) = await _exit(agent, [position_id], req.maxSlippage if req else None)
+    if result.error == NOT_OPEN:
+        raise HTTPException(status_code=404, detail=result.error)
+    return _exit_out(result)
@@ -1,28 +1,21 @@
 """Vaults route — USDC yield vault discovery on Base.
 
 Checks Fluid, Aave v3, Compound v3, Euler, and Morpho USDC vaults on Base
-using DeFi Llama yields API. No auth required — public data.
+from the in-memory DeFi Llama yields snapshot (lib/yields.py), refreshed in
+the background. No auth required — public data.
 
 Used by the auto_rebalance cron to find the best place to park idle USDC.
 """
 
-import httpx
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional
 
-router = APIRouter(prefix="/vaults", tags=["Vaults"])
-
-DEFILLAMA_YIELDS = "https://yields.llama.fi/pools"
+from lib.yields import TRACKED_PROTOCOLS, yields
 
-# protocols we track on Base
-TRACKED_PROTOCOLS = {
-    "aave-v3":    "Aave v3",
-    "compound-v3": "Compound v3",
-    "euler":       "Euler",
-    "morpho":      "Morpho",
-    "fluid":       "Fluid",
-}
+router = APIRouter(prefix="/vaults", tags=["Vaults"])
 
 
 class VaultInfo(BaseModel):
@@ -45,6 +38,7 @@ class VaultsResponse(BaseModel):
     best_apy: float
     best_protocol: str
     total_checked: int
+    updated_at: Optional[str] = None    # when the yields snapshot was taken (ISO 8601, UTC)
 
 
 @router.get("/base", response_model=VaultsResponse)
@@ -58,53 +52,31 @@ async def get_base_vaults(
     sorted by total APY descending. used by the auto_rebalance feature to find
     the best yield for idle USDC (giza protocol targets 15%, these range 2-8%).
     """
-    try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            resp = await client.get(DEFILLAMA_YIELDS)
-            if resp.status_code != 200:
-                raise HTTPException(status_code=502, detail="defillama yields api unavailable")
-            all_pools = resp.json().get("data", [])
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="defillama api timed out")
+    pools = await yields.current()
+    if not yields.ready:
+        raise HTTPException(status_code=502, detail="defillama yields api unavailable")
 
     vaults: list[VaultInfo] = []
 
-    for pool in all_pools:
-        chain = (pool.get("chain") or "").lower()
-        project = (pool.get("project") or "").lower()
-        symbol = (pool.get("symbol") or "").upper()
-
-        if chain != "base":
-            continue
-        if project not in TRACKED_PROTOCOLS:
-            continue
-        if "USDC" not in symbol:
-            continue
-
-        tvl = pool.get("tvlUsd") or 0
-        apy = pool.get("apy") or 0
-        apy_base = pool.get("apyBase") or 0
-        apy_reward = pool.get("apyReward") or 0
-
-        if tvl < min_tvl or apy < min_apy:
+    # snapshot pools are already Base USDC pools of tracked protocols, sorted by APY
+    for pool in pools:
+        if pool.tvl_usd < min_tvl or pool.apy < min_apy:
             continue
 
         vaults.append(VaultInfo(
-            protocol=TRACKED_PROTOCOLS[project],
-            protocol_slug=project,
-            pool_id=pool.get("pool", ""),
-            symbol=symbol,
+            protocol=TRACKED_PROTOCOLS[pool.project],
+            protocol_slug=pool.project,
+            pool_id=pool.pool_id,
+            symbol=pool.symbol,
             chain="base",
-            apy=round(apy, 4),
-            apy_base=round(apy_base, 4),
-            apy_reward=round(apy_reward, 4),
-            tvl_usd=round(tvl, 2),
+            apy=round(pool.apy, 4),
+            apy_base=round(pool.apy_base, 4),
+            apy_reward=round(pool.apy_reward, 4),
+            tvl_usd=round(pool.tvl_usd, 2),
             il_risk="none",
-            url=pool.get("url"),
+            url=pool.url,
         ))
 
-    vaults.sort(key=lambda v: v.apy, reverse=True)
-
     best = vaults[0] if vaults else None
 
     return VaultsResponse(
@@ -113,4 +85,5 @@ async def get_base_vaults(
         best_apy=best.apy if best else 0.0,
         best_protocol=best.protocol if best else "none",
         total_checked=len(vaults),
+        updated_at=datetime.fromtimestamp(yields.updated_at, timezone.utc).isoformat(),
     )
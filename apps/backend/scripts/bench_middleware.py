@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for AgentLogMiddleware.
+
+Drives the real FastAPI app in-process over httpx's ASGI transport, once with
+the middleware stack as configured in server.py and once with
+AgentLogMiddleware removed, and reports requests/s and latency percentiles
+for each endpoint.
+
+/health is hit anonymously (the skip path). /markets/trending is hit with an
+agent API key, so the logged path runs end to end: agent resolution, body
+tee, status capture and the buffered log write. Gamma is replaced with a
+canned market list and the agent is pre-seeded into agent_cache, so no
+network or Postgres is needed and the numbers measure the middleware, not
+upstream latency.
+
+Usage:
+    .venv/bin/python scripts/bench_middleware.py
+    .venv/bin/python scripts/bench_middleware.py --requests 5000 --concurrency 50 --json
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Add parent to path for lib imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+import routes.markets as markets_mod
+from lib.agent_store import Agent, agent_cache
+from lib.auth import generate_api_key, hash_api_key
+from lib.gamma_client import Market
+from lib.log_writer import log_writer
+from lib.logging_middleware import AgentLogMiddleware
+from server import app
+
+
+class _BenchGamma:
+    """Serves a fixed trending list in place of the Gamma API."""
+
+    def __init__(self, n: int = 20):
+        self.markets = [
+            Market(
+                id=f"bench-{i}",
+                question=f"Benchmark market {i}?",
+                slug=f"benchmark-market-{i}",
+                condition_id="0x" + f"{i:064x}",
+                yes_token_id=str(10**20 + 2 * i),
+                no_token_id=str(10**20 + 2 * i + 1),
+                yes_price=0.5,
+                no_price=0.5,
+                volume=1e6,
+                volume_24h=1e5,
+                liquidity=5e4,
+                end_date="",
+                active=True,
+                closed=False,
+                resolved=False,
+                outcome=None,
+            )
+            for i in range(n)
+        ]
+
+    async def get_trending_markets(self, limit: int = 20) -> list[Market]:
+        return self.markets[:limit]
+
+
+def _set_logging(enabled: bool, original: list) -> None:
+    """Rebuild the app's middleware stack with or without AgentLogMiddleware."""
+    app.user_middleware = original if enabled else [m for m in original if m.cls is not AgentLogMiddleware]
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def _bench(client: httpx.AsyncClient, path: str, headers: dict, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            resp = await client.get(path, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if resp.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3),
+    }
+
+
+async def run(args) -> list[dict]:
+    markets_mod.gamma = _BenchGamma()
+
+    api_key = generate_api_key()
+    key_hash = hash_api_key(api_key)
+    agent_cache.put(key_hash, Agent(
+        agent_id="bench-agent",
+        wallet_address="0x" + "0" * 40,
+        api_key_hash=key_hash,
+        wallet_index=0,
+        polygon_safe="0x" + "0" * 40,
+        solana_wallet="",
+        scopes=[],
+        created_at="",
+    ))
+
+    cases = [
+        ("/health", {}),
+        ("/markets/trending?limit=20", {"X-API-Key": api_key}),
+    ]
+    original = list(app.user_middleware)
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for enabled in (False, True):
+            _set_logging(enabled, original)
+            for path, headers in cases:
+                # Warm-up, then measure
+                await _bench(client, path, headers, min(200, args.requests), args.concurrency)
+                stats = await _bench(client, path, headers, args.requests, args.concurrency)
+                results.append({"path": path, "logging": enabled, **stats})
+                # Keep the writer's buffer from filling between cases; nothing is flushed to a DB
+                log_writer._buffer.clear()
+    _set_logging(True, original)
+    return results
+
+
+def print_report(results: list[dict]) -> None:
+    print(f"{'path':<30} {'logging':<8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['path']:<30} {'on' if r['logging'] else 'off':<8} {r['rps']:>10} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}")
+
+    by_path: dict[str, dict] = {}
+    for r in results:
+        by_path.setdefault(r["path"], {})[r["logging"]] = r["rps"]
+    print()
+    for path, rps in by_path.items():
+        if rps.get(False):
+            print(f"{path}: throughput with logging {(rps[True] / rps[False] - 1):+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request throughput with and without AgentLogMiddleware")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per case")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
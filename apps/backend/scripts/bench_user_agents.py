@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Regression benchmark for GET /user/agents — query count must not grow with agents.
+
+Creates a throwaway schema in the DATABASE_URL database, migrates it, and
+seeds one user owning --agents agents with --trades trades each. It then
+drives the real FastAPI app in-process with a session cookie. The request
+pool's acquire counter measures DB round-trips per request, which must
+be 1 whether the user owns one agent or many. Each agent must come back
+with its 5 newest trades. Exits non-zero on a regression. The schema is
+dropped afterwards.
+
+Usage:
+    .venv/bin/python scripts/bench_user_agents.py
+    .venv/bin/python scripts/bench_user_agents.py --agents 200 --trades 50 --runs 50 --json
+"""
+
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import os
+import statistics
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+import asyncpg
+import httpx
+
+from lib import database
+from routes.oauth import COOKIE_NAME, _create_session_token
+
+# Round-trips one /user/agents request may make, at any agent count
+EXPECTED_QUERIES = 1
+RECENT_TRADES = 5
+
+
+async def seed(user_id: str, n_agents: int, n_trades: int) -> None:
+    pool = database.get_pool("background")
+    await pool.execute(
+        "INSERT INTO users (user_id, email, name) VALUES ($1, $2, 'bench')",
+        user_id, f"{user_id}@bench.local",
+    )
+    now = datetime.now(timezone.utc)
+    agents = [
+        (f"{user_id}-agent-{i}", "0x" + f"{i:040x}", f"{user_id}-key-{i}", i, user_id, now - timedelta(minutes=i))
+        for i in range(n_agents)
+    ]
+    await pool.executemany(
+        """INSERT INTO agents (agent_id, wallet_address, api_key_hash, wallet_index, owner_id, created_at)
+           VALUES ($1, $2, $3, $4, $5, $6)""",
+        agents,
+    )
+    trades = [
+        (f"{a[0]}-trade-{j}", a[0], f"market-{j}", "YES", 10.0, 0.5, now - timedelta(seconds=j))
+        for a in agents
+        for j in range(n_trades)
+    ]
+    await pool.executemany(
+        """INSERT INTO trades (trade_id, agent_id, market_id, side, amount_usd, entry_price, created_at)
+           VALUES ($1, $2, $3, $4, $5, $6, $7)""",
+        trades,
+    )
+
+
+async def bench_case(client: httpx.AsyncClient, n_agents: int, n_trades: int, runs: int) -> dict:
+    user_id = f"bench-user-{uuid.uuid4().hex[:8]}"
+    await seed(user_id, n_agents, n_trades)
+    client.cookies.set(COOKIE_NAME, _create_session_token(user_id, f"{user_id}@bench.local", "bench"))
+
+    request_pool = database.get_pool("request")
+    latencies, queries, errors = [], [], []
+    for _ in range(runs):
+        before = request_pool.acquires
+        start = time.perf_counter()
+        resp = await client.get("/user/agents")
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(request_pool.acquires - before)
+
+        body = resp.json()
+        if resp.status_code != 200:
+            errors.append(f"HTTP {resp.status_code}: {body}")
+            continue
+        if len(body["agents"]) != n_agents:
+            errors.append(f"expected {n_agents} agents, got {len(body['agents'])}")
+        want = min(RECENT_TRADES, n_trades)
+        short = [a["agentId"] for a in body["agents"] if len(a["recentTrades"]) != want]
+        if short:
+            errors.append(f"{len(short)} agents without exactly {want} recent trades")
+
+    return {
+        "agents": n_agents,
+        "trades_per_agent": n_trades,
+        "runs": runs,
+        "queries_per_request": max(queries),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+        "errors": sorted(set(errors)),
+    }
+
+
+async def run(args) -> list[dict]:
+    base_url = os.environ.get("DATABASE_URL")
+    if not base_url:
+        print("Error: DATABASE_URL not set in .env")
+        sys.exit(1)
+
+    schema = f"bench_{uuid.uuid4().hex[:8]}"
+    admin = await asyncpg.connect(base_url)
+    await admin.execute(f"CREATE SCHEMA {schema}")
+    # asyncpg passes unknown DSN parameters through as server settings
+    os.environ["DATABASE_URL"] = f"{base_url}{'&' if '?' in base_url else '?'}search_path={schema}"
+
+    from server import app  # after DATABASE_URL points at the bench schema
+
+    try:
+        await database.init_db()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return [
+                await bench_case(client, 1, args.trades, args.runs),
+                await bench_case(client, args.agents, args.trades, args.runs),
+            ]
+    finally:
+        await database.close_db()
+        await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert /user/agents makes a constant number of DB round-trips")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    parser.add_argument("--agents", type=int, default=50, help="Agents owned by the seeded user")
+    parser.add_argument("--trades", type=int, default=20, help="Trades per agent")
+    parser.add_argument("--runs", type=int, default=20, help="Requests per case")
+
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'agents':>7} {'trades/agent':>13} {'queries':>8} {'p50 ms':>9} {'max ms':>9}")
+        for r in results:
+            print(f"{r['agents']:>7} {r['trades_per_agent']:>13} {r['queries_per_request']:>8} {r['p50_ms']:>9} {r['max_ms']:>9}")
+
+    failed = False
+    for r in results:
+        if r["queries_per_request"] != EXPECTED_QUERIES:
+            print(f"FAIL: {r['agents']} agents took {r['queries_per_request']} queries (expected {EXPECTED_QUERIES})")
+            failed = True
+        for err in r["errors"]:
+            print(f"FAIL: {r['agents']} agents: {err}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
@@ -5,10 +5,10 @@ Usage:
     # Reset DB (drop + recreate all tables)
     .venv/bin/python scripts/db.py reset
 
-    # Migrate (create tables if not exist, safe to run repeatedly)
+    # Apply pending migrations from lib/migrations/ (same runner as server startup)
     .venv/bin/python scripts/db.py migrate
 
-    # Show current tables and row counts
+    # Show applied migrations, tables and row counts
     .venv/bin/python scripts/db.py status
 """
 
@@ -24,10 +24,23 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 
 import asyncpg
 
-from lib.database import SCHEMA_SQL
+from lib.migrate import applied_migrations, load_migrations, migrate
 
 
 DROP_SQL = """
+DROP TABLE IF EXISTS schema_migrations CASCADE;
+DROP TABLE IF EXISTS agent_equity_1d CASCADE;
+DROP TABLE IF EXISTS agent_equity_1h CASCADE;
+DROP TABLE IF EXISTS agent_equity_1m CASCADE;
+DROP TABLE IF EXISTS platform_stats CASCADE;
+DROP TABLE IF EXISTS agent_log_rollups CASCADE;
+DROP TABLE IF EXISTS agent_logs CASCADE;
+DROP TABLE IF EXISTS agent_logs_legacy CASCADE;
+DROP TABLE IF EXISTS fills CASCADE;
+DROP TABLE IF EXISTS clob_orders CASCADE;
+DROP TABLE IF EXISTS clob_credentials CASCADE;
+DROP TABLE IF EXISTS vault_logs CASCADE;
+DROP TABLE IF EXISTS vault_positions CASCADE;
 DROP TABLE IF EXISTS device_codes CASCADE;
 DROP TABLE IF EXISTS trades CASCADE;
 DROP TABLE IF EXISTS positions CASCADE;
@@ -50,18 +63,20 @@ async def cmd_reset():
     print("Dropping tables...")
     await conn.execute(DROP_SQL)
     print("Creating tables...")
-    await conn.execute(SCHEMA_SQL)
-    print("Done! Tables reset.")
+    applied = await migrate(conn)
+    print(f"Done! Tables reset ({len(applied)} migrations applied).")
     await show_status(conn)
     await conn.close()
 
 
 async def cmd_migrate():
-    """Create tables if they don't exist (safe to run repeatedly)."""
+    """Apply pending migrations (safe to run repeatedly, and alongside running servers)."""
     conn = await get_conn()
     print("Running migrations...")
-    await conn.execute(SCHEMA_SQL)
-    print("Done! Schema up to date.")
+    applied = await migrate(conn)
+    for name in applied:
+        print(f"  applied {name}")
+    print("Done! Schema up to date." if applied else "Schema already up to date.")
     await show_status(conn)
     await conn.close()
 
@@ -81,6 +96,14 @@ async def show_status(conn):
 async def cmd_status():
     """Show current DB status."""
     conn = await get_conn()
+
+    applied = {m["version"]: m for m in await applied_migrations(conn)}
+    print("Migrations:")
+    for m in load_migrations():
+        row = applied.get(m.version)
+        state = row["applied_at"].strftime("%Y-%m-%d %H:%M") if row else "pending"
+        print(f"  {m.version:04d}_{m.name:30s} {state}")
+
     await show_status(conn)
 
     # Show columns for our tables
@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+"""Simulation harness — run the real trade and rebalance code against SimChain.
+
+Starts an in-process EVM stand-in (lib/sim_chain.py) with USDC, CTF, Safe,
+ERC4626, Multicall3 and MultiSend mocks, points CHAINSTACK_NODE / BASE_RPC_URL
+at it, and drives the unmodified TradeExecutor.buy_position,
+run_rebalance_for_agent, lib/redemption.py, lib/exits.py and
+lib/balance_watcher.py code paths.
+Reports per-stage latency, per-transaction gas and RPC call counts.
+
+Gamma, the CLOB and Postgres are replaced with local stand-ins, and a
+throwaway key + mnemonic are generated per run — no real funds or .env keys
+are ever touched.
+
+Usage:
+    .venv/bin/python scripts/simulate.py trade --amount 10 --runs 5
+    .venv/bin/python scripts/simulate.py rebalance --amount 250 --runs 3
+    .venv/bin/python scripts/simulate.py redeem --amount 10 --runs 8
+    .venv/bin/python scripts/simulate.py exit --amount 10 --runs 6
+    .venv/bin/python scripts/simulate.py watch --amount 25 --runs 5
+    .venv/bin/python scripts/simulate.py --json all
+"""
+
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import functools
+import os
+import statistics
+from collections import defaultdict
+from pathlib import Path
+
+# Add parent to path for lib imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from eth_abi import encode as abi_encode
+from eth_account import Account
+from web3 import Web3
+
+from lib import database
+from lib import exits
+from lib import rebalance
+from lib import redemption
+from lib.balance_watcher import TransferWatcher
+from lib.balances import POLYGON, BalanceService
+from lib.agent_store import Agent
+from lib.clob_client import SellFill
+from lib.contracts import CONTRACTS, POLYGON_CHAIN_ID, derive_polymarket_safe
+from lib.gamma_client import Market
+from lib.orderbook import walk_book
+from lib.position_reconciler import read_ctf_balances
+from lib.sim_chain import SimChain, sim_position_id
+from lib.wallet_manager import WalletManager
+import scripts.trade as trade_mod
+
+
+# ── Instrumentation ──────────────────────────────────────────────────────────
+
+
+class StageTimer:
+    """Collects wall-clock samples per named stage."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def wrap(self, name: str, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.samples[name].append(time.perf_counter() - start)
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples[name].append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        out = {}
+        for name, xs in self.samples.items():
+            ms = sorted(x * 1000 for x in xs)
+            out[name] = {
+                "calls": len(ms),
+                "mean_ms": round(statistics.fmean(ms), 2),
+                "p50_ms": round(statistics.median(ms), 2),
+                "max_ms": round(ms[-1], 2),
+            }
+        return out
+
+
+def _gas_report(chain: SimChain, tx_hashes: list[str]) -> list[dict]:
+    txs = []
+    for h in tx_hashes:
+        receipt = chain.receipts.get("0x" + h.lower().removeprefix("0x"), {})
+        txs.append({
+            "tx": receipt.get("transactionHash", h),
+            "calls": " → ".join(receipt.get("trace", [])),
+            "gas": int(receipt.get("gasUsed", "0x0"), 16),
+            "status": int(receipt.get("status", "0x0"), 16),
+        })
+    return txs
+
+
+def _rpc_report(chain: SimChain) -> dict:
+    return {
+        method: {"count": count, "server_ms": round(secs * 1000, 2)}
+        for method, (count, secs) in sorted(chain.rpc_stats.items())
+    }
+
+
+# ── Stand-ins for off-chain services ─────────────────────────────────────────
+
+
+class _SimGamma:
+    """Serves one synthetic market in place of the Gamma API."""
+
+    def __init__(self, market: Market):
+        self.market = market
+
+    async def get_market(self, market_id: str) -> Market:
+        return self.market
+
+
+def _sim_clob_class(chain: SimChain, sink: str):
+    """ClobClientWrapper stand-in: a FOK sell moves the tokens to `sink` and pays the Safe."""
+
+    class SimClobClient:
+        def __init__(self, private_key: str, address: str, safe_address: str = None):
+            self.safe_address = safe_address or address
+
+        async def sell_fok(self, token_id: str, amount: float, price: float, max_slippage: float = None):
+            size = int(amount * 1e6)
+            with chain.locked():
+                ctf = chain.contract(CONTRACTS["CTF"])
+                ctf._debit(self.safe_address, int(token_id), size)
+                ctf._credit(sink, int(token_id), size)
+                chain.contract(CONTRACTS["USDC_E"]).mint(self.safe_address, int(size * price))
+            return f"sim-{uuid.uuid4().hex[:16]}", True, None, SellFill(price, price, price, amount)
+
+        async def quote_sell(self, token_id: str, amount: float, price: float, max_slippage: float = None):
+            return walk_book([(price, amount)], amount, "SELL"), None
+
+        async def sell_many(self, legs: list[tuple[str, float, float]], max_slippage: float = None):
+            return [await self.sell_fok(t, amount, price, max_slippage) for t, amount, price in legs]
+
+    return SimClobClient
+
+
+class _MemoryPool:
+    """Records writes in place of asyncpg; reads return nothing."""
+
+    def __init__(self):
+        self.statements: list[tuple[str, tuple]] = []
+
+    async def execute(self, sql: str, *args):
+        self.statements.append((sql, args))
+        return "INSERT 0 1"
+
+    async def fetchrow(self, sql: str, *args):
+        return None
+
+    async def fetch(self, sql: str, *args):
+        return []
+
+    async def fetchval(self, sql: str, *args):
+        return None
+
+
+# ── Scenarios ────────────────────────────────────────────────────────────────
+
+
+async def simulate_trade(amount: float, runs: int, side: str = "YES") -> dict:
+    """Split → sell through TradeExecutor.buy_position on a simulated Polygon."""
+    chain = SimChain(POLYGON_CHAIN_ID)
+    chain.deploy_erc20(CONTRACTS["USDC_E"], "USDC.e")
+    chain.deploy_ctf(CONTRACTS["CTF"])
+    os.environ["CHAINSTACK_NODE"] = chain.serve()
+
+    acct = Account.create()
+    os.environ["POLYCLAW_PRIVATE_KEY"] = acct.key.hex()
+    wallet = WalletManager()
+    safe = derive_polymarket_safe(wallet.address)
+    chain.deploy_safe(safe, wallet.address)
+    chain.fund(wallet.address, 10 * 10**18)
+    chain.mint(CONTRACTS["USDC_E"], safe, int(amount * runs * 1e6))
+
+    condition_id = Web3.keccak(text=f"sim-market-{uuid.uuid4()}")
+    market = Market(
+        id="sim-1",
+        question="Simulated market?",
+        slug="simulated-market",
+        condition_id="0x" + condition_id.hex().removeprefix("0x"),
+        yes_token_id=str(sim_position_id(CONTRACTS["USDC_E"], condition_id, 1)),
+        no_token_id=str(sim_position_id(CONTRACTS["USDC_E"], condition_id, 2)),
+        yes_price=0.62,
+        no_price=0.38,
+        volume=0.0,
+        volume_24h=0.0,
+        liquidity=0.0,
+        end_date="",
+        active=True,
+        closed=False,
+        resolved=False,
+        outcome=None,
+    )
+
+    timer = StageTimer()
+    tx_hashes: list[str] = []
+    send = wallet.safe_exec
+
+    def recording_safe_exec(*args, **kwargs):
+        tx_hash = send(*args, **kwargs)
+        tx_hashes.append(tx_hash)
+        return tx_hash
+
+    wallet.safe_exec = timer.wrap("safe_exec", recording_safe_exec)
+    trade_mod.SPLIT_CONFIRM_DELAY = 0
+    trade_mod.ClobClientWrapper = _sim_clob_class(chain, "0x" + "ee" * 20)
+
+    executor = trade_mod.TradeExecutor(wallet, safe_address=safe)
+    executor._gamma = _SimGamma(market)
+    executor._get_trading_balance = timer.wrap("balance_check", executor._get_trading_balance)
+    executor._ensure_approvals = timer.wrap("approvals", executor._ensure_approvals)
+    executor._split_position = timer.wrap("split (incl. approvals)", executor._split_position)
+    buy = timer.wrap("buy_position total", executor.buy_position)
+
+    results = []
+    for _ in range(runs):
+        result = await buy(market.id, side, amount)
+        results.append({"success": result.success, "clob_filled": result.clob_filled, "error": result.error})
+
+    # Pre-trade eth_call dry-run — approvals are in place now, so the split itself is simulated
+    chain.mint(CONTRACTS["USDC_E"], safe, int(amount * 1e6))
+    dry = await executor.buy_position(market.id, side, amount, dry_run=True)
+
+    chain.close()
+    return {
+        "scenario": "trade",
+        "runs": runs,
+        "amount": amount,
+        "dry_run": {"success": dry.success, "gas_estimate": dry.gas_estimate, "note": dry.error},
+        "results": results,
+        "stages": timer.summary(),
+        "transactions": _gas_report(chain, tx_hashes),
+        "rpc": _rpc_report(chain),
+    }
+
+
+async def simulate_rebalance(amount: float, runs: int) -> dict:
+    """Deposit via run_rebalance_for_agent, then withdraw, on a simulated Base."""
+    chain = SimChain(rebalance.BASE_CHAIN_ID, gas_price=10**7)
+    usdc_addr = rebalance._env("BASE_USDC_ADDRESS", "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913")
+    chain.deploy_erc20(usdc_addr, "USDC")
+    vault_addr = Account.create().address
+    chain.deploy_vault(vault_addr, usdc_addr)
+    os.environ["BASE_RPC_URL"] = chain.serve()
+
+    # Throwaway mnemonic — never derive from a real MNEMONIC in simulation
+    _, mnemonic = Account.create_with_mnemonic()
+    os.environ["MNEMONIC"] = mnemonic
+    wallet = rebalance.derive_wallet(0)
+    chain.fund(wallet.address, 10**18)
+
+    agent = Agent(
+        agent_id="sim-agent",
+        wallet_address=wallet.address.lower(),
+        api_key_hash="",
+        wallet_index=0,
+        polygon_safe="",
+        solana_wallet="",
+        scopes=[],
+        created_at="",
+        auto_rebalance=True,
+    )
+    database._pools.update(dict.fromkeys(database.POOL_CONFIGS, _MemoryPool()))
+
+    async def sim_best_vault():
+        return {
+            "protocol": "morpho",
+            "protocol_name": "Morpho (sim)",
+            "pool_id": vault_addr,
+            "apy": 5.0,
+            "tvl_usd": 10_000_000.0,
+            "type": "erc4626",
+        }
+
+    timer = StageTimer()
+    tx_hashes: list[str] = []
+    sign_send_wait = rebalance._sign_send_wait
+
+    def recording_sign_send_wait(*args, **kwargs):
+        tx_hash = sign_send_wait(*args, **kwargs)
+        tx_hashes.append(tx_hash)
+        return tx_hash
+
+    rebalance._sign_send_wait = timer.wrap("sign_send_wait", recording_sign_send_wait)
+    rebalance._fetch_best_vault = timer.wrap("fetch_best_vault", sim_best_vault)
+    rebalance._usdc_balance_raw = timer.wrap("usdc_balance", rebalance._usdc_balance_raw)
+    rebalance._deposit_erc4626 = timer.wrap("deposit_erc4626", rebalance._deposit_erc4626)
+    rebalance._withdraw_erc4626 = timer.wrap("withdraw_erc4626", rebalance._withdraw_erc4626)
+    rebalance._log_action = timer.wrap("db_log_action", rebalance._log_action)
+    run = timer.wrap("run_rebalance_for_agent total", rebalance.run_rebalance_for_agent)
+
+    loop = asyncio.get_running_loop()
+    results = []
+    for _ in range(runs):
+        chain.mint(usdc_addr, wallet.address, int(amount * 1e6))
+        result = await run(agent)
+        results.append({k: result.get(k) for k in ("action", "amount_usdc", "reason", "error")})
+
+        with chain.locked():
+            shares = chain.contract(vault_addr).shares.get(wallet.address.lower(), 0)
+        if shares:
+            w3 = rebalance._get_w3()
+            await loop.run_in_executor(
+                None, rebalance._withdraw_erc4626, w3, wallet.private_key, wallet.address, vault_addr, shares
+            )
+
+    chain.close()
+    return {
+        "scenario": "rebalance",
+        "runs": runs,
+        "amount": amount,
+        "results": results,
+        "stages": timer.summary(),
+        "transactions": _gas_report(chain, tx_hashes),
+        "rpc": _rpc_report(chain),
+    }
+
+
+async def simulate_redeem(amount: float, runs: int) -> dict:
+    """Resolve `runs` markets held by one Safe, then redeem them all in one MultiSend transaction."""
+    chain = SimChain(POLYGON_CHAIN_ID)
+    chain.deploy_erc20(CONTRACTS["USDC_E"], "USDC.e")
+    chain.deploy_ctf(CONTRACTS["CTF"])
+    chain.deploy_multicall(CONTRACTS["MULTICALL3"])
+    chain.deploy_multisend(CONTRACTS["MULTISEND_CALL_ONLY"])
+    os.environ["CHAINSTACK_NODE"] = chain.serve()
+
+    acct = Account.create()
+    os.environ["POLYCLAW_PRIVATE_KEY"] = acct.key.hex()
+    wallet = WalletManager()
+    safe = derive_polymarket_safe(wallet.address).lower()
+    chain.deploy_safe(safe, wallet.address)
+    chain.fund(wallet.address, 10 * 10**18)
+
+    # One position per market: the Safe holds `amount` of the bought leg (plus an
+    # unsold half of the other leg on every third market); even markets resolve YES
+    size = int(amount * 1e6)
+    resolved, rows = {}, []
+    with chain.locked():
+        ctf = chain.contract(CONTRACTS["CTF"])
+        for i in range(runs):
+            condition_id = Web3.keccak(text=f"sim-redeem-{uuid.uuid4()}")
+            yes = sim_position_id(CONTRACTS["USDC_E"], condition_id, 1)
+            no = sim_position_id(CONTRACTS["USDC_E"], condition_id, 2)
+            ctf._credit(safe, yes, size)
+            if i % 3 == 0:
+                ctf._credit(safe, no, size // 2)
+            chain.contract(CONTRACTS["USDC_E"]).mint(ctf.address, 2 * size)
+            ctf.report_payouts(condition_id, [1, 0] if i % 2 == 0 else [0, 1])
+            market = Market(
+                id=f"sim-{i}", question=f"Simulated market {i}?", slug=f"sim-{i}",
+                condition_id="0x" + condition_id.hex().removeprefix("0x"),
+                yes_token_id=str(yes), no_token_id=str(no),
+                yes_price=0.0, no_price=0.0, volume=0.0, volume_24h=0.0, liquidity=0.0,
+                end_date="", active=False, closed=True, resolved=True, outcome=None,
+            )
+            resolved[market.id] = market
+            rows.append({
+                "position_id": f"pos-{i}", "market_id": market.id, "token_id": str(yes),
+                "entry_amount": amount / 2, "entry_price": 0.5, "shares": None,
+                "safe": safe, "wallet_index": 0,
+            })
+
+    timer = StageTimer()
+    tx_hashes: list[str] = []
+    w3 = Web3(Web3.HTTPProvider(os.environ["CHAINSTACK_NODE"]))
+    loop = asyncio.get_running_loop()
+
+    read_payouts = timer.wrap("read_payouts (multicall)", redemption.read_payouts)
+    payouts = await loop.run_in_executor(None, read_payouts, w3, [m.condition_id for m in resolved.values()])
+    pairs = sorted({(safe, t) for m in resolved.values() for t in (m.yes_token_id, m.no_token_id)})
+    read_balances = timer.wrap("read_ctf_balances (multicall)", read_ctf_balances)
+    balances = await loop.run_in_executor(None, read_balances, w3, pairs)
+
+    plans, settled = redemption.plan_redemptions(
+        rows, {mid: (m, payouts[m.condition_id]) for mid, m in resolved.items()}, balances
+    )
+    # What redeeming market by market would cost, for comparison
+    one_by_one_gas = sum(
+        wallet.simulate_safe_exec(safe, target, data, gas=redemption._GAS_BASE + redemption._GAS_PER_REDEEM)
+        for plan in plans for target, data in plan.calls
+    )
+
+    usdc = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["USDC_E"]), abi=rebalance.ERC20_ABI)
+    before = usdc.functions.balanceOf(Web3.to_checksum_address(safe)).call()
+    execute = timer.wrap("execute_redemption (multisend)", redemption.execute_redemption)
+    for plan in plans:
+        tx_hashes.append(await loop.run_in_executor(None, execute, wallet, plan.safe, plan.calls))
+    received = (usdc.functions.balanceOf(Web3.to_checksum_address(safe)).call() - before) / 1e6
+
+    chain.close()
+    return {
+        "scenario": "redeem",
+        "runs": runs,
+        "amount": amount,
+        "results": [{
+            "markets": len(resolved),
+            "redeem_calls": sum(len(p.calls) for p in plans),
+            "settled_without_tx": len(settled),
+            "expected_payout": round(sum(p for plan in plans for _, _, p in plan.positions), 6),
+            "usdc_received": received,
+            "one_by_one_gas_estimate": one_by_one_gas,
+        }],
+        "stages": timer.summary(),
+        "transactions": _gas_report(chain, tx_hashes),
+        "rpc": _rpc_report(chain),
+    }
+
+
+async def simulate_exit(amount: float, runs: int) -> dict:
+    """Exit `runs` positions of one Safe: those with an unsold opposite leg merge in one
+    MultiSend transaction, the rest go to the (simulated) CLOB in one batch."""
+    chain = SimChain(POLYGON_CHAIN_ID)
+    chain.deploy_erc20(CONTRACTS["USDC_E"], "USDC.e")
+    chain.deploy_ctf(CONTRACTS["CTF"])
+    chain.deploy_multicall(CONTRACTS["MULTICALL3"])
+    chain.deploy_multisend(CONTRACTS["MULTISEND_CALL_ONLY"])
+    os.environ["CHAINSTACK_NODE"] = chain.serve()
+
+    acct = Account.create()
+    os.environ["POLYCLAW_PRIVATE_KEY"] = acct.key.hex()
+    wallet = WalletManager()
+    safe = derive_polymarket_safe(wallet.address).lower()
+    chain.deploy_safe(safe, wallet.address)
+    chain.fund(wallet.address, 10 * 10**18)
+
+    # One split of `amount` per market; on even markets the CLOB sell of the
+    # other leg "failed", so the Safe still holds both legs
+    size = int(amount * 1e6)
+    markets, rows = {}, []
+    with chain.locked():
+        ctf = chain.contract(CONTRACTS["CTF"])
+        for i in range(runs):
+            condition_id = Web3.keccak(text=f"sim-exit-{uuid.uuid4()}")
+            yes = sim_position_id(CONTRACTS["USDC_E"], condition_id, 1)
+            no = sim_position_id(CONTRACTS["USDC_E"], condition_id, 2)
+            ctf._credit(safe, yes, size)
+            if i % 2 == 0:
+                ctf._credit(safe, no, size)
+            chain.contract(CONTRACTS["USDC_E"]).mint(ctf.address, size)
+            market = Market(
+                id=f"sim-{i}", question=f"Simulated market {i}?", slug=f"sim-{i}",
+                condition_id="0x" + condition_id.hex().removeprefix("0x"),
+                yes_token_id=str(yes), no_token_id=str(no),
+                yes_price=0.6, no_price=0.4, volume=0.0, volume_24h=0.0, liquidity=0.0,
+                end_date="", active=True, closed=False, resolved=False, outcome=None,
+            )
+            markets[market.id] = market
+            rows.append({
+                "position_id": f"pos-{i}", "market_id": market.id, "token_id": str(yes),
+                "entry_amount": amount, "entry_price": 0.5, "shares": None,
+            })
+
+    timer = StageTimer()
+    tx_hashes: list[str] = []
+    w3 = Web3(Web3.HTTPProvider(os.environ["CHAINSTACK_NODE"]))
+    loop = asyncio.get_running_loop()
+
+    pairs = sorted({(safe, t) for m in markets.values() for t in (m.yes_token_id, m.no_token_id)})
+    read_balances = timer.wrap("read_ctf_balances (multicall)", read_ctf_balances)
+    balances = await loop.run_in_executor(None, read_balances, w3, pairs)
+    plans, failed = exits.plan_exits(rows, rows, markets, balances, safe)
+    merges = [p for p in plans if p.route == "merge"]
+    sells = [p for p in plans if p.route == "sell"]
+
+    # What merging position by position would cost, for comparison
+    one_by_one_gas = sum(
+        wallet.simulate_safe_exec(safe, *p.call, gas=exits._GAS_BASE + exits._GAS_PER_MERGE) for p in merges
+    )
+
+    usdc = w3.eth.contract(address=Web3.to_checksum_address(CONTRACTS["USDC_E"]), abi=rebalance.ERC20_ABI)
+    before = usdc.functions.balanceOf(Web3.to_checksum_address(safe)).call()
+    execute = timer.wrap("execute_merges (multisend)", exits.execute_merges)
+    if merges:
+        tx_hashes.append(await loop.run_in_executor(None, execute, wallet, safe, [p.call for p in merges]))
+    merged = (usdc.functions.balanceOf(Web3.to_checksum_address(safe)).call() - before) / 1e6
+
+    clob = _sim_clob_class(chain, "0x" + "ee" * 20)(wallet.get_unlocked_key(), wallet.address, safe_address=safe)
+    sell_many = timer.wrap("sell_many (clob batch)", clob.sell_many)
+    sold = await sell_many([(p.token_id, p.shares, p.price) for p in sells])
+
+    chain.close()
+    return {
+        "scenario": "exit",
+        "runs": runs,
+        "amount": amount,
+        "results": [{
+            "positions": len(rows),
+            "merged": len(merges),
+            "sold": sum(1 for _, filled, _, _ in sold if filled),
+            "failed": len(failed),
+            "merge_usdc_received": merged,
+            "sell_usdc_expected": round(sum(p.shares * p.price for p in sells), 6),
+            "one_by_one_gas_estimate": one_by_one_gas,
+        }],
+        "stages": timer.summary(),
+        "transactions": _gas_report(chain, tx_hashes),
+        "rpc": _rpc_report(chain),
+    }
+
+
+async def simulate_watch(amount: float, runs: int, agents: int = 100) -> dict:
+    """Cache every agent's Polygon balances, move USDC.e for `runs` of them (deposits from
+    outside and a Safe-to-EOA transfer), then let the Transfer watcher invalidate them."""
+    chain = SimChain(POLYGON_CHAIN_ID)
+    chain.deploy_erc20(CONTRACTS["USDC_E"], "USDC.e")
+    chain.deploy_multicall(CONTRACTS["MULTICALL3"])
+    os.environ["CHAINSTACK_NODE"] = chain.serve()
+
+    acct = Account.create()
+    os.environ["POLYCLAW_PRIVATE_KEY"] = acct.key.hex()
+    wallet = WalletManager()
+    safe = derive_polymarket_safe(wallet.address).lower()
+    chain.deploy_safe(safe, wallet.address)
+    chain.fund(wallet.address, 10**18)
+    chain.mint(CONTRACTS["USDC_E"], safe, int(amount * 1e6))
+
+    addresses = [wallet.address.lower(), safe] + [Account.create().address.lower() for _ in range(2 * agents - 2)]
+    keys = [(POLYGON, a) for a in addresses]
+    service = BalanceService(ttl=0, watched_ttl=3600)
+    watcher = TransferWatcher(POLYGON, chain.url, CONTRACTS["USDC_E"], service)
+    watcher.set_addresses(addresses)
+
+    timer = StageTimer()
+    poll = timer.wrap("watcher.poll", watcher.poll)
+    get_many = timer.wrap("balances.get_many", service.get_many)
+    await poll()                 # start at the head, switch to the long TTL
+    await get_many(keys)         # cold: every address fetched
+
+    # Funds move: external deposits to `runs` EOAs, and the Safe pays its owner
+    movers = addresses[2:2 + runs]
+    for address in movers:
+        chain.mint(CONTRACTS["USDC_E"], address, int(amount * 1e6))
+    transfer = Web3.keccak(text="transfer(address,uint256)")[:4] + abi_encode(
+        ["address", "uint256"], [Web3.to_checksum_address(wallet.address), int(amount * 1e6)]
+    )
+    loop = asyncio.get_running_loop()
+    tx_hash = await loop.run_in_executor(None, functools.partial(wallet.safe_exec, safe, CONTRACTS["USDC_E"], transfer))
+
+    before = chain.rpc_stats.get("eth_call", [0])[0]
+    invalidated, _ = await poll()
+    snap = await get_many(keys)
+    refetch_calls = chain.rpc_stats.get("eth_call", [0])[0] - before
+    with chain.locked():
+        onchain = chain.contract(CONTRACTS["USDC_E"]).balances
+        stale = sum(1 for (_, a), b in snap.items() if round(b.usdc * 1e6) != onchain.get(a, 0))
+
+    chain.close()
+    return {
+        "scenario": "watch",
+        "runs": runs,
+        "amount": amount,
+        "results": [{
+            "addresses": len(addresses),
+            "moved": len(movers) + 2,
+            "invalidated": invalidated,
+            "refetch_eth_calls": refetch_calls,
+            "stale_after_poll": stale,
+        }],
+        "stages": timer.summary(),
+        "transactions": _gas_report(chain, [tx_hash]),
+        "rpc": _rpc_report(chain),
+    }
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+
+def print_report(report: dict) -> None:
+    print("=" * 60)
+    print(f"Scenario: {report['scenario']}  runs={report['runs']}  amount=${report['amount']:.2f}")
+    if "dry_run" in report:
+        d = report["dry_run"]
+        print(f"Dry run: ok={d['success']} gas_estimate={d['gas_estimate']} {d['note'] or ''}")
+    for r in report["results"]:
+        print(f"  result: {r}")
+
+    print("\nStages:")
+    for name, s in report["stages"].items():
+        print(f"  {name:32s} calls={s['calls']:<3d} mean={s['mean_ms']:>8.2f}ms p50={s['p50_ms']:>8.2f}ms max={s['max_ms']:>8.2f}ms")
+
+    print("\nTransactions:")
+    total = 0
+    for t in report["transactions"]:
+        total += t["gas"]
+        status = "ok" if t["status"] else "REVERTED"
+        print(f"  gas={t['gas']:>8d} {status:8s} {t['calls']}")
+    print(f"  total gas: {total}")
+
+    print("\nRPC calls:")
+    for method, s in report["rpc"].items():
+        print(f"  {method:28s} {s['count']:>5d} calls  {s['server_ms']:>8.2f}ms server time")
+
+
+async def run(args) -> list[dict]:
+    reports = []
+    if args.command in ("trade", "all"):
+        reports.append(await simulate_trade(args.amount, args.runs, args.side.upper()))
+    if args.command in ("rebalance", "all"):
+        reports.append(await simulate_rebalance(args.amount, args.runs))
+    if args.command in ("redeem", "all"):
+        reports.append(await simulate_redeem(args.amount, args.runs))
+    if args.command in ("exit", "all"):
+        reports.append(await simulate_exit(args.amount, args.runs))
+    if args.command in ("watch", "all"):
+        reports.append(await simulate_watch(args.amount, args.runs))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate trade / rebalance / redeem / exit / watch against an in-process EVM")
+    parser.add_argument("--json", action="store_true", help="JSON output")
+    parser.add_argument("command", choices=["trade", "rebalance", "redeem", "exit", "watch", "all"])
+    parser.add_argument("--amount", type=float, default=10.0, help="USDC per run")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per scenario")
+    parser.add_argument("--side", choices=["YES", "NO", "yes", "no"], default="YES")
+
+    args = parser.parse_args()
+    reports = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 """Trade execution - split + CLOB sell."""
 
+import os
 import sys
 import json
-import time
 import uuid
 import asyncio
 import argparse
@@ -27,6 +27,9 @@ from lib.clob_client import ClobClientWrapper
 from lib.contracts import CONTRACTS, CTF_ABI, ERC20_ABI, POLYGON_CHAIN_ID, derive_polymarket_safe
 from lib.position_storage import PositionStorage, PositionEntry
 
+# Pause between the split landing and the CLOB sell so Polymarket indexes the new tokens
+SPLIT_CONFIRM_DELAY = float(os.environ.get("SPLIT_CONFIRM_DELAY", "2"))
+
 
 @dataclass
 class TradeResult:
@@ -43,6 +46,12 @@ class TradeResult:
     question: str = ""
     wanted_token_id: str = ""
     entry_price: float = 0.0
+    simulated: bool = False
+    gas_estimate: Optional[int] = None
+    expected_fill_price: Optional[float] = None  # order-book VWAP for the unwanted-leg sell
+    realized_fill_price: Optional[float] = None  # matched price reported by the CLOB
+    sold_token_id: str = ""                      # unwanted leg sent to the CLOB
+    sell_limit_price: Optional[float] = None
 
 
 class TradeExecutor:
@@ -68,8 +77,8 @@ class TradeExecutor:
         """Return USDC.e balance of the Safe (the actual trading wallet)."""
         return self.wallet.get_safe_usdc_balance(self.safe_address)
 
-    def _ensure_approvals(self):
-        """Check and set Polymarket approvals on the Safe if needed."""
+    def _missing_approvals(self) -> list[tuple[str, str, bytes]]:
+        """Return (label, target, calldata) for each Polymarket approval the Safe still lacks."""
         w3 = self._get_web3()
         safe = Web3.to_checksum_address(self.safe_address)
         MAX_UINT256 = 2**256 - 1
@@ -81,34 +90,32 @@ class TradeExecutor:
             address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI
         )
 
+        missing = []
+
         # USDC.e allowances from Safe → Polymarket contracts
         for contract_key in ("CTF", "CTF_EXCHANGE", "NEG_RISK_CTF_EXCHANGE"):
             spender = Web3.to_checksum_address(CONTRACTS[contract_key])
             if usdc.functions.allowance(safe, spender).call() == 0:
-                print(f"Approving USDC.e → {contract_key} via Safe...")
                 data = usdc.encode_abi("approve", args=[spender, MAX_UINT256])
-                self.wallet.safe_exec(self.safe_address, CONTRACTS["USDC_E"], bytes.fromhex(data[2:]))
+                missing.append((f"USDC.e → {contract_key}", CONTRACTS["USDC_E"], bytes.fromhex(data[2:])))
 
         # CTF token approvals from Safe → exchange contracts
         for contract_key in ("CTF_EXCHANGE", "NEG_RISK_CTF_EXCHANGE", "NEG_RISK_ADAPTER"):
             spender = Web3.to_checksum_address(CONTRACTS[contract_key])
             if not ctf.functions.isApprovedForAll(safe, spender).call():
-                print(f"Approving CTF → {contract_key} via Safe...")
                 data = ctf.encode_abi("setApprovalForAll", args=[spender, True])
-                self.wallet.safe_exec(self.safe_address, CONTRACTS["CTF"], bytes.fromhex(data[2:]))
+                missing.append((f"CTF → {contract_key}", CONTRACTS["CTF"], bytes.fromhex(data[2:])))
 
-    def _split_position(
-        self,
-        condition_id: str,
-        amount_usd: float,
-    ) -> str:
-        """Split Safe's USDC.e into YES + NO tokens via Safe.execTransaction.
+        return missing
 
-        The Safe is msg.sender — USDC.e leaves the Safe, YES+NO tokens arrive at Safe.
-        EOA only pays Polygon gas for the execTransaction call.
-        """
-        self._ensure_approvals()
+    def _ensure_approvals(self):
+        """Check and set Polymarket approvals on the Safe if needed."""
+        for label, target, data in self._missing_approvals():
+            print(f"Approving {label} via Safe...")
+            self.wallet.safe_exec(self.safe_address, target, data)
 
+    def _split_calldata(self, condition_id: str, amount_usd: float) -> bytes:
+        """Encode CTF.splitPosition for a binary market (partition YES, NO)."""
         w3 = self._get_web3()
         ctf = w3.eth.contract(
             address=Web3.to_checksum_address(CONTRACTS["CTF"]), abi=CTF_ABI
@@ -129,21 +136,60 @@ class TradeExecutor:
                 amount_wei,
             ],
         )
+        return bytes.fromhex(data[2:])
+
+    def _split_position(
+        self,
+        condition_id: str,
+        amount_usd: float,
+    ) -> str:
+        """Split Safe's USDC.e into YES + NO tokens via Safe.execTransaction.
+
+        The Safe is msg.sender — USDC.e leaves the Safe, YES+NO tokens arrive at Safe.
+        EOA only pays Polygon gas for the execTransaction call.
+        """
+        self._ensure_approvals()
 
         tx_hash = self.wallet.safe_exec(
-            self.safe_address, CONTRACTS["CTF"], bytes.fromhex(data[2:]), gas=400000
+            self.safe_address, CONTRACTS["CTF"], self._split_calldata(condition_id, amount_usd), gas=400000
         )
         print(f"Split TX (via Safe): {tx_hash}")
         return tx_hash
 
+    def _simulate_split(self, condition_id: str, amount_usd: float) -> tuple[int, Optional[str]]:
+        """eth_call dry-run of approvals + split. Returns (gas_estimate, note).
+
+        If approvals are still missing the split itself cannot be simulated
+        (it would revert on allowance) — only the approval txs are estimated.
+        """
+        gas = 0
+        missing = self._missing_approvals()
+        for _, target, data in missing:
+            gas += self.wallet.simulate_safe_exec(self.safe_address, target, data)
+        if missing:
+            return gas, f"{len(missing)} approval tx(s) pending — split not simulated until they land"
+
+        gas += self.wallet.simulate_safe_exec(
+            self.safe_address, CONTRACTS["CTF"], self._split_calldata(condition_id, amount_usd), gas=400000
+        )
+        return gas, None
+
     async def buy_position(
         self,
         market_id: str,
         position: str,  # "YES" or "NO"
         amount: float,
         skip_clob_sell: bool = False,
+        dry_run: bool = False,
+        max_slippage: Optional[float] = None,
     ) -> TradeResult:
-        """Buy a position on a market."""
+        """Buy a position on a market.
+
+        With dry_run=True the split is only eth_call-simulated against the
+        current chain state and the CLOB sell is only quoted against the
+        order book — nothing is sent. max_slippage caps how far below the
+        Gamma price the unwanted leg may sell (default CLOB_MAX_SLIPPAGE).
+        """
         position = position.upper()
         if position not in ["YES", "NO"]:
             return TradeResult(
@@ -209,6 +255,50 @@ class TradeExecutor:
         print(f"Buying: {position} @ {wanted_price:.2f}")
         print(f"Will sell: {'NO' if position == 'YES' else 'YES'} @ ~{unwanted_price:.2f}")
 
+        if dry_run:
+            expected_fill_price = None
+            if not skip_clob_sell and unwanted_token:
+                try:
+                    estimate, _ = await ClobClientWrapper(
+                        self.wallet.get_unlocked_key(), self.wallet.address, safe_address=self.safe_address
+                    ).quote_sell(unwanted_token, amount, unwanted_price, max_slippage)
+                    expected_fill_price = estimate.vwap
+                except Exception as e:
+                    print(f"Order book quote failed: {e}")
+            try:
+                gas_estimate, note = self._simulate_split(market.condition_id, amount)
+            except Exception as e:
+                return TradeResult(
+                    success=False,
+                    market_id=market_id,
+                    position=position,
+                    amount=amount,
+                    split_tx=None,
+                    clob_order_id=None,
+                    clob_filled=False,
+                    error=f"Split simulation failed: {e}",
+                    question=market.question,
+                    wanted_token_id=wanted_token,
+                    entry_price=wanted_price,
+                    simulated=True,
+                )
+            return TradeResult(
+                success=True,
+                market_id=market_id,
+                position=position,
+                amount=amount,
+                split_tx=None,
+                clob_order_id=None,
+                clob_filled=False,
+                error=note,
+                question=market.question,
+                wanted_token_id=wanted_token,
+                entry_price=wanted_price,
+                simulated=True,
+                gas_estimate=gas_estimate,
+                expected_fill_price=expected_fill_price,
+            )
+
         # Execute split
         try:
             split_tx = self._split_position(market.condition_id, amount)
@@ -224,12 +314,13 @@ class TradeExecutor:
                 error=f"Split failed: {e}",
             )
 
-        time.sleep(2)  # Wait for chain confirmation
+        await asyncio.sleep(SPLIT_CONFIRM_DELAY)  # Wait for chain confirmation
 
         # Sell unwanted side via CLOB
         clob_order_id = None
         clob_filled = False
         clob_error = None
+        fill = None
 
         if not skip_clob_sell and unwanted_token:
             print("Selling unwanted tokens via CLOB...")
@@ -239,13 +330,16 @@ class TradeExecutor:
                     self.wallet.address,
                     safe_address=self.safe_address,
                 )
-                clob_order_id, clob_filled, clob_error = clob.sell_fok(
+                clob_order_id, clob_filled, clob_error, fill = await clob.sell_fok(
                     unwanted_token,
                     amount,  # Same number of tokens as USDC spent
                     unwanted_price,
+                    max_slippage=max_slippage,
                 )
                 if clob_filled:
                     print(f"CLOB sell filled: {clob_order_id}")
+                    if fill.realized_price is not None:
+                        print(f"  Fill: expected {fill.expected_price:.4f}, realized {fill.realized_price:.4f}")
                 else:
                     print(f"CLOB sell failed: {clob_error}")
             except Exception as e:
@@ -264,6 +358,10 @@ class TradeExecutor:
             question=market.question,
             wanted_token_id=wanted_token,
             entry_price=wanted_price,
+            expected_fill_price=fill.expected_price if fill else None,
+            realized_fill_price=fill.realized_price if fill else None,
+            sold_token_id=unwanted_token or "",
+            sell_limit_price=fill.limit_price if fill else None,
         )
 
 
@@ -283,10 +381,24 @@ async def cmd_buy(args):
             args.position,
             args.amount,
             skip_clob_sell=args.skip_sell,
+            dry_run=args.dry_run,
         )
 
         print("\n" + "=" * 50)
-        if result.success:
+        if result.simulated:
+            if result.success:
+                print("Dry run OK — nothing was sent")
+                print(f"  Market: {result.question[:50]}...")
+                print(f"  Position: {result.position} @ {result.entry_price:.2f}")
+                print(f"  Estimated gas: {result.gas_estimate}")
+                if result.expected_fill_price is not None:
+                    print(f"  Expected sell fill: {result.expected_fill_price:.4f}")
+                if result.error:
+                    print(f"  Note: {result.error}")
+            else:
+                print(f"Dry run failed: {result.error}")
+                return 1
+        elif result.success:
             print("Trade executed successfully!")
             print(f"  Market: {result.question[:50]}...")
             print(f"  Position: {result.position}")
@@ -294,6 +406,8 @@ async def cmd_buy(args):
             print(f"  Split TX: {result.split_tx}")
             if result.clob_filled:
                 print(f"  CLOB Order: {result.clob_order_id} (FILLED)")
+                if result.realized_fill_price is not None:
+                    print(f"  Sell fill: {result.realized_fill_price:.4f} (expected {result.expected_fill_price:.4f})")
             elif result.clob_order_id:
                 print(f"  CLOB Order: {result.clob_order_id} (pending)")
             elif args.skip_sell:
@@ -350,6 +464,10 @@ def main():
         "--skip-sell", action="store_true",
         help="Skip selling unwanted side (keep both YES and NO)"
     )
+    buy_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Simulate the split with eth_call and report gas; send nothing"
+    )
 
     args = parser.parse_args()
 
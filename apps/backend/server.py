@@ -8,7 +8,9 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from lib.database import init_db, close_db
+from lib.database import init_db, close_db, pool_metrics
+from lib.clob_client import CLOB_HOST, close_transport
+from lib.proxy_pool import proxy_pool
 from routes.register import router as register_router
 from routes.balance import router as balance_router
 from routes.trade import router as trade_router
@@ -26,7 +28,17 @@ from routes.vaults import router as vaults_router
 from routes.rebalance import router as rebalance_router
 from lib.rebalance import start_rebalance_cron
 from lib.freemonies import start_freemonies_cron
+from lib.order_reconciler import start_order_reconciler, RECONCILE_INTERVAL
+from lib.position_reconciler import start_position_reconciler, RECONCILE_INTERVAL as POSITION_RECONCILE_INTERVAL
+from lib.redemption import start_resolution_watcher, RESOLUTION_INTERVAL
+from lib.platform_stats import start_platform_stats_reconciler, STATS_RECONCILE_INTERVAL
+from lib.pnl_engine import start_pnl_engine, PNL_ENGINE_INTERVAL
+from lib.equity import start_equity_snapshotter, SNAPSHOT_INTERVAL as EQUITY_SNAPSHOT_INTERVAL
+from lib.balance_watcher import start_balance_watcher, WATCH_INTERVAL as BALANCE_WATCH_INTERVAL
+from lib.yields import start_yields_refresher, YIELDS_REFRESH
 from lib.logging_middleware import AgentLogMiddleware
+from lib.log_writer import log_writer
+from lib.log_maintenance import RETENTION_DAYS as LOG_RETENTION_DAYS, start_log_maintenance
 
 
 @asynccontextmanager
@@ -56,13 +68,41 @@ async def lifespan(app: FastAPI):
         print(f"[STARTUP] FAILED TO CONNECT TO DB: {e}")
         print("[STARTUP] Application continuing to start (unhealthy).")
 
+    log_writer.start()
+    asyncio.create_task(start_log_maintenance())
+    print(f"[STARTUP] agent_logs partitions + rollups scheduled (retention {LOG_RETENTION_DAYS}d)")
+
     # ── Start auto-rebalance background cron ──────────────────────────────────
+    asyncio.create_task(start_yields_refresher())
+    print(f"[STARTUP] DefiLlama yields snapshot refreshed every {YIELDS_REFRESH}s")
     asyncio.create_task(start_rebalance_cron())
     print(f"[STARTUP] Rebalance cron scheduled every {os.environ.get('REBALANCE_INTERVAL_HOURS', '3')}h")
     asyncio.create_task(start_freemonies_cron())
     print(f"[STARTUP] Freemonies cron scheduled every {os.environ.get('FREEMONIES_INTERVAL_HOURS', os.environ.get('REBALANCE_INTERVAL_HOURS', '3'))}h")
 
+    asyncio.create_task(start_order_reconciler())
+    print(f"[STARTUP] CLOB order reconciler scheduled every {RECONCILE_INTERVAL}s")
+    asyncio.create_task(start_position_reconciler())
+    print(f"[STARTUP] On-chain position reconciler scheduled every {POSITION_RECONCILE_INTERVAL}s")
+    asyncio.create_task(start_resolution_watcher())
+    print(f"[STARTUP] Resolution watcher + redemption scheduled every {RESOLUTION_INTERVAL}s")
+    asyncio.create_task(start_platform_stats_reconciler())
+    print(f"[STARTUP] platform_stats reconcile scheduled every {STATS_RECONCILE_INTERVAL}s")
+    asyncio.create_task(start_pnl_engine())
+    print(f"[STARTUP] P&L engine re-marking every {PNL_ENGINE_INTERVAL:.0f}s")
+    asyncio.create_task(start_equity_snapshotter())
+    print(f"[STARTUP] Equity snapshots every {EQUITY_SNAPSHOT_INTERVAL}s (1m → 1h → 1d)")
+    asyncio.create_task(start_balance_watcher())
+    print(f"[STARTUP] USDC Transfer watcher invalidating balances every {BALANCE_WATCH_INTERVAL:.0f}s")
+
+    # ── Pre-dial CLOB proxy exits so the first order skips the TLS handshake ──
+    if proxy_pool.proxied:
+        asyncio.create_task(proxy_pool.warm(f"{CLOB_HOST}/time"))
+        print(f"[STARTUP] CLOB proxy pool: {len(proxy_pool.exits)} exit(s)")
+
     yield
+    await log_writer.stop()
+    await close_transport()
     await close_db()
 
 
@@ -81,6 +121,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Mount route modules
@@ -108,3 +149,21 @@ app.add_middleware(AgentLogMiddleware)
 @app.get("/health")
 def health() -> dict:
     return {"ok": True, "service": "eigenpoly-backend", "version": "0.2.0"}
+
+
+@app.get("/health/proxies")
+def proxy_health() -> dict:
+    """CLOB egress pool: per-exit score, success rate, latency and quarantine state."""
+    return proxy_pool.metrics()
+
+
+@app.get("/health/db")
+def db_health() -> dict:
+    """Per-pool size, utilization and connection-acquire wait times."""
+    return pool_metrics()
+
+
+@app.get("/health/logs")
+def log_writer_health() -> dict:
+    """agent_logs writer: buffered / written / dropped / failed row counts."""
+    return log_writer.stats()
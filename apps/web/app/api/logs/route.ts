@@ -10,10 +10,10 @@ export async function GET(req: NextRequest) {
     const cookie = req.headers.get("cookie") || "";
     const { searchParams } = new URL(req.url);
 
-    // Forward query params (limit, offset, agent_id)
+    // Forward query params (limit, cursor, agent_id)
     const params = new URLSearchParams();
     if (searchParams.get("limit")) params.set("limit", searchParams.get("limit")!);
-    if (searchParams.get("offset")) params.set("offset", searchParams.get("offset")!);
+    if (searchParams.get("cursor")) params.set("cursor", searchParams.get("cursor")!);
     if (searchParams.get("agent_id")) params.set("agent_id", searchParams.get("agent_id")!);
 
     const qs = params.toString() ? `?${params}` : "";
@@ -0,0 +1,26 @@
+import { NextRequest, NextResponse } from "next/server";
+
+const BACKEND_URL =
+  process.env.EIGENPOLY_API_URL ||
+  process.env.NEXT_PUBLIC_API_URL ||
+  "http://localhost:8000";
+
+export async function GET(req: NextRequest) {
+  try {
+    const cookie = req.headers.get("cookie") || "";
+    const res = await fetch(`${BACKEND_URL}/user/pnl`, {
+      headers: { cookie },
+      cache: "no-store",
+    });
+
+    if (!res.ok) {
+      return NextResponse.json({ agents: [] }, { status: res.status });
+    }
+
+    const data = await res.json();
+    return NextResponse.json(data);
+  } catch (err) {
+    console.error("Failed to fetch user pnl:", err);
+    return NextResponse.json({ agents: [] });
+  }
+}
@@ -57,6 +57,22 @@ interface Stats {
   open_positions: number;
 }
 
+interface PnLTotals {
+  total_invested: number;
+  total_current_value: number;
+  total_pnl_usd: number;
+  total_pnl_pct: number;
+}
+
+interface AgentPnL extends PnLTotals {
+  agentId: string;
+  open_positions: number;
+}
+
+interface UserPnL extends PnLTotals {
+  agents: AgentPnL[];
+}
+
 interface AgentRecord {
   agentId: string;
   walletAddress: string;
@@ -245,7 +261,23 @@ function buildVolumeBuckets(trades: TradeRecord[], timeframe: TimeFrame): { labe
 }
 
 // ─── Overview Tab ───────────────────────────────────────────────────────────────
-function OverviewTab({ stats, trades }: { stats: Stats | null; trades: TradeRecord[] }) {
+// One /api/pnl request (read from the backend P&L engine) serves the overview and every agent card
+let userPnl: Promise<UserPnL | null> | null = null;
+
+function loadUserPnl(): Promise<UserPnL | null> {
+  if (!userPnl) {
+    userPnl = fetch("/api/pnl")
+      .then(res => (res.ok ? (res.json() as Promise<UserPnL>) : null))
+      .catch(() => null);
+    // 503 while the engine warms up — retry on the next load
+    setTimeout(() => { userPnl = null; }, 15_000);
+  }
+  return userPnl;
+}
+
+const fmtPnl = (n: number) => `${n < 0 ? "-" : "+"}$${Math.abs(n).toFixed(2)}`;
+
+function OverviewTab({ stats, trades, pnl }: { stats: Stats | null; trades: TradeRecord[]; pnl: UserPnL | null }) {
   const [timeframe, setTimeframe] = useState<TimeFrame>("7d");
   const [recentFilter, setRecentFilter] = useState<TradeFilter>("success");
   const [perfFilter, setPerfFilter] = useState<TradeFilter>("success");
@@ -277,7 +309,7 @@ function OverviewTab({ stats, trades }: { stats: Stats | null; trades: TradeReco
   return (
     <div className="space-y-5 w-full">
       {/* Stat Cards */}
-      <div className="grid grid-cols-2 lg:grid-cols-4 gap-4 w-full">
+      <div className="grid grid-cols-2 lg:grid-cols-5 gap-4 w-full">
         <StatCard
           label="Total Agents"
           value={stats ? String(stats.agents) : "0"}
@@ -301,6 +333,12 @@ function OverviewTab({ stats, trades }: { stats: Stats | null; trades: TradeReco
           sub="Live"
           delta={stats && stats.open_positions > 0 ? { text: "Live", up: true } : undefined}
         />
+        <StatCard
+          label="Your P&L"
+          value={pnl ? fmtPnl(pnl.total_pnl_usd) : "—"}
+          sub={pnl ? `on ${fmtUSD(pnl.total_invested)} open` : "Unavailable"}
+          delta={pnl && pnl.total_invested > 0 ? { text: `${Math.abs(pnl.total_pnl_pct).toFixed(1)}%`, up: pnl.total_pnl_usd >= 0 } : undefined}
+        />
       </div>
 
       {/* Middle row: volume chart + recent trades */}
@@ -538,20 +576,23 @@ function LogsTab() {
   const [logs, setLogs] = useState<LogRecord[]>([]);
   const [total, setTotal] = useState(0);
   const [page, setPage] = useState(1);
+  // cursors[i] fetches page i + 1; the backend paginates by keyset, not offset
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
   const [agentFilter, setAgentFilter] = useState<string>("all");
   const [agentIds, setAgentIds] = useState<string[]>([]);
   const [loading, setLoading] = useState(true);
   const [lastRefresh, setLastRefresh] = useState(Date.now());
 
   const offset = (page - 1) * LOGS_PAGE_SIZE;
-  const totalPages = Math.max(1, Math.ceil(total / LOGS_PAGE_SIZE));
+  const totalPages = cursors.length;
+
+  const resetPages = () => { setPage(1); setCursors([null]); };
 
   useEffect(() => {
     setLoading(true);
-    const params = new URLSearchParams({
-      limit: String(LOGS_PAGE_SIZE),
-      offset: String(offset),
-    });
+    const params = new URLSearchParams({ limit: String(LOGS_PAGE_SIZE) });
+    const cursor = cursors[page - 1];
+    if (cursor) params.set("cursor", cursor);
     if (agentFilter !== "all") params.set("agent_id", agentFilter);
 
     fetch(`/api/logs?${params}`)
@@ -559,6 +600,7 @@ function LogsTab() {
       .then(data => {
         setLogs(data.logs || []);
         setTotal(data.total || 0);
+        setCursors(prev => data.nextCursor ? [...prev.slice(0, page), data.nextCursor] : prev.slice(0, page));
         // Collect unique agent IDs for filter
         const ids = Array.from(new Set((data.logs || []).map((l: LogRecord) => l.agentId))) as string[];
         setAgentIds(prev => Array.from(new Set([...prev, ...ids])));
@@ -581,7 +623,7 @@ function LogsTab() {
               Agent API Logs
             </p>
             {total > 0 && (
-              <span className="text-[10px] text-neutral-600 font-mono">({total} entries)</span>
+              <span className="text-[10px] text-neutral-600 font-mono">(~{total} entries)</span>
             )}
           </div>
           <div className="flex items-center gap-2">
@@ -590,7 +632,7 @@ function LogsTab() {
               <div className="flex gap-1 items-center">
                 <Filter size={11} className="text-neutral-600" />
                 <button
-                  onClick={() => { setAgentFilter("all"); setPage(1); }}
+                  onClick={() => { setAgentFilter("all"); resetPages(); }}
                   className={`px-2 py-0.5 rounded text-[10px] font-mono font-bold uppercase transition-all ${
                     agentFilter === "all" ? "text-black" : "text-neutral-500 border border-neutral-700 hover:border-[#CC5A38] hover:text-[#CC5A38]"
                   }`}
@@ -601,7 +643,7 @@ function LogsTab() {
                 {agentIds.map(id => (
                   <button
                     key={id}
-                    onClick={() => { setAgentFilter(id); setPage(1); }}
+                    onClick={() => { setAgentFilter(id); resetPages(); }}
                     className={`px-2 py-0.5 rounded text-[10px] font-mono font-bold uppercase transition-all ${
                       agentFilter === id ? "text-black" : "text-neutral-500 border border-neutral-700 hover:border-[#CC5A38] hover:text-[#CC5A38]"
                     }`}
@@ -614,7 +656,7 @@ function LogsTab() {
             )}
             {/* Refresh */}
             <button
-              onClick={() => { setPage(1); setLastRefresh(Date.now()); }}
+              onClick={() => { resetPages(); setLastRefresh(Date.now()); }}
               className="p-1.5 rounded hover:bg-neutral-800 transition-colors"
               title="Refresh"
             >
@@ -681,7 +723,7 @@ function LogsTab() {
         {totalPages > 1 && (
           <div className="flex items-center justify-between mt-5 pt-4 border-t border-neutral-800">
             <p className="text-[10px] text-neutral-500 font-mono">
-              {offset + 1}–{Math.min(offset + LOGS_PAGE_SIZE, total)} of {total}
+              {offset + 1}–{offset + logs.length} of ~{Math.max(total, offset + logs.length)}
             </p>
             <div className="flex items-center gap-1">
               <button
@@ -691,7 +733,7 @@ function LogsTab() {
               >
                 <ChevronLeft size={14} className="text-neutral-400" />
               </button>
-              {Array.from({ length: Math.min(totalPages, 7) }, (_, i) => i + 1).map(p => (
+              {Array.from({ length: totalPages }, (_, i) => i + 1).slice(-7).map(p => (
                 <button
                   key={p}
                   onClick={() => setPage(p)}
@@ -1125,6 +1167,7 @@ function ExportKeyModal({
 // ─── Agents Tab ───────────────────────────────────────────────────────────────
 function AgentsTab() {
   const [agents, setAgents] = useState<AgentRecord[]>([]);
+  const [pnl, setPnl] = useState<UserPnL | null>(null);
   const [loading, setLoading] = useState(true);
   const [exportAgent, setExportAgent] = useState<AgentRecord | null>(null);
   const [exportKeyType, setExportKeyType] = useState<"evm" | "solana">("evm");
@@ -1140,6 +1183,7 @@ function AgentsTab() {
       } catch {}
       finally { setLoading(false); }
     })();
+    loadUserPnl().then(setPnl);
   }, []);
 
   if (loading) {
@@ -1190,6 +1234,7 @@ function AgentsTab() {
             <AgentCard
               key={agent.agentId}
               agent={agent}
+              pnl={pnl?.agents.find(p => p.agentId === agent.agentId)}
               onExportEvm={() => { setExportKeyType("evm"); setExportAgent(agent); }}
               onExportSolana={() => { setExportKeyType("solana"); setExportAgent(agent); }}
             />
@@ -1219,6 +1264,25 @@ interface BalanceData {
   total_usdc: number;
 }
 
+interface AgentBalanceData extends BalanceData {
+  agentId: string;
+}
+
+// One /api/balances request (all of the user's agents) serves every card on the page
+let userBalances: Promise<AgentBalanceData[]> | null = null;
+
+function loadUserBalances(): Promise<AgentBalanceData[]> {
+  if (!userBalances) {
+    userBalances = fetch("/api/balances")
+      .then(res => (res.ok ? res.json() : { agents: [] }))
+      .then(data => data.agents as AgentBalanceData[])
+      .catch(() => []);
+    // later expands refetch once the backend snapshot may have moved
+    setTimeout(() => { userBalances = null; }, 15_000);
+  }
+  return userBalances;
+}
+
 function WalletBalances({ agentId }: { agentId: string }) {
   const [bal, setBal] = useState<BalanceData | null>(null);
   const [loading, setLoading] = useState(false);
@@ -1227,8 +1291,12 @@ function WalletBalances({ agentId }: { agentId: string }) {
   const fetch_ = async () => {
     setLoading(true);
     try {
-      // balance route requires api key — we call via session (dashboard owns the agent)
-      // The backend /balance/{id} requires x-api-key, so we expose it via a Next proxy
+      const mine = (await loadUserBalances()).find(b => b.agentId === agentId);
+      if (mine) {
+        setBal(mine);
+        return;
+      }
+      // Fall back to the per-agent route (session-authenticated via the Next proxy)
       const res = await fetch(`/api/balance/${agentId}`);
       if (res.ok) setBal(await res.json());
     } catch {}
@@ -1348,7 +1416,7 @@ function WalletBalances({ agentId }: { agentId: string }) {
 }
 
 // ─── Agent Card ───────────────────────────────────────────────────────────────
-function AgentCard({ agent, onExportEvm, onExportSolana }: { agent: AgentRecord; onExportEvm: () => void; onExportSolana: () => void }) {
+function AgentCard({ agent, pnl, onExportEvm, onExportSolana }: { agent: AgentRecord; pnl?: AgentPnL; onExportEvm: () => void; onExportSolana: () => void }) {
   const trades = agent.recentTrades || [];
   const loadingTrades = false;
 
@@ -1400,7 +1468,7 @@ function AgentCard({ agent, onExportEvm, onExportSolana }: { agent: AgentRecord;
       </div>
 
       {/* Agent Details */}
-      <div className="grid grid-cols-1 sm:grid-cols-3 gap-3 mb-5">
+      <div className="grid grid-cols-1 sm:grid-cols-4 gap-3 mb-5">
         <div className="rounded-lg border border-neutral-800 p-3">
           <p className="text-[9px] uppercase tracking-widest text-neutral-600 font-mono mb-1">Wallet Address</p>
           <div className="flex items-center gap-1.5">
@@ -1435,6 +1503,17 @@ function AgentCard({ agent, onExportEvm, onExportSolana }: { agent: AgentRecord;
             ))}
           </div>
         </div>
+        <div className="rounded-lg border border-neutral-800 p-3">
+          <p className="text-[9px] uppercase tracking-widest text-neutral-600 font-mono mb-1">P&amp;L</p>
+          {pnl ? (
+            <p className={`text-xs font-mono font-bold ${pnl.total_pnl_usd >= 0 ? "text-green-400" : "text-red-400"}`}>
+              {fmtPnl(pnl.total_pnl_usd)}
+              <span className="text-neutral-500 font-normal ml-1.5">{pnl.open_positions} open</span>
+            </p>
+          ) : (
+            <p className="text-xs text-neutral-600 font-mono">—</p>
+          )}
+        </div>
       </div>
 
       {/* Balances */}
@@ -1481,6 +1560,7 @@ export default function DashboardPage() {
   const [activeTab, setActiveTab] = useState<Tab>("overview");
   const [stats, setStats] = useState<Stats | null>(null);
   const [trades, setTrades] = useState<TradeRecord[]>([]);
+  const [pnl, setPnl] = useState<UserPnL | null>(null);
 
   const loginUrl = `${API_URL}/oauth/google?redirect=/dashboard`;
 
@@ -1504,6 +1584,10 @@ export default function DashboardPage() {
       .catch(() => null);
   }, []);
 
+  useEffect(() => {
+    loadUserPnl().then(setPnl);
+  }, []);
+
 
   const handleLogout = async () => {
     await fetch(`${API_URL}/oauth/logout`, { method: "POST", credentials: "include" });
@@ -1625,7 +1709,7 @@ export default function DashboardPage() {
 
         {/* Page Content */}
         <div className="flex-1 overflow-y-auto p-8 w-full">
-          {activeTab === "overview" && <OverviewTab stats={stats} trades={trades} />}
+          {activeTab === "overview" && <OverviewTab stats={stats} trades={trades} pnl={pnl} />}
           {activeTab === "logs" && <LogsTab />}
           {activeTab === "trades" && <TradesTab trades={trades} />}
           {activeTab === "markets" && <MarketsTab />}